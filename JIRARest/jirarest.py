@@ -5,22 +5,122 @@ import string
 
 __author__ = 'iterroso'
 
+import base64
+import collections
+import hashlib
+import itertools
 import jira
+import json
 import logging
-import base64
+import math
+import operator
+import os
+import threading
+import time
+from multiprocessing.pool import ThreadPool
 
 logger = logging.getLogger('QCRest')
 
 from requests.packages import urllib3
 urllib3.disable_warnings()
 
+# Non printable ascii characters removed from text fields
+_nonPrintable = ''.join([chr(c) for c in range(128) if chr(c) not in string.printable])
+
+
+def _convertUser(value):
+    return {
+        'displayName': value.displayName,
+        'emailAddress': value.emailAddress,
+        'name': value.name
+    }
+
+
+def _convertUnicode(value):
+    return value.encode('ascii', 'ignore').translate(None, _nonPrintable)
+
+
+def _convertName(value):
+    return str(value.name)
+
+
+def _convertNone(value):
+    return ''
+
+# Field value converters by type of value
+_fieldConverters = {
+    jira.resources.User: _convertUser,
+    unicode: _convertUnicode,
+    jira.resources.Status: _convertName,
+    jira.resources.Resolution: _convertName,
+    type(None): _convertNone,
+}
+
+
+def _convertRawName(value):
+    if value is None:
+        return ''
+    return str(value['name'])
+
+
+def _convertRawDict(value):
+    # Users are the only objects converted, the remaining are returned as raw json
+    if 'emailAddress' in value:
+        return {
+            'displayName': value.get('displayName'),
+            'emailAddress': value.get('emailAddress'),
+            'name': value.get('name')
+        }
+    return value
+
+# Raw json field value converters by field name
+_rawFieldConverters = {
+    'status': _convertRawName,
+    'resolution': _convertRawName,
+}
+
+# Raw json field value converters by type of value
+_rawTypeConverters = {
+    dict: _convertRawDict,
+    unicode: _convertUnicode,
+    type(None): _convertNone,
+}
+
+class _RateLimiter(object):
+    '''
+    Thread safe limiter of requests per second - the rate is given on each wait, so it can be changed at any time
+    '''
+
+    def __init__(self):
+
+        self._lock = threading.Lock()
+
+        self._nextTime = 0.0
+
+    def wait(self, maxRequestsPerSecond):
+        '''
+        Wait until the next request can be done
+        :param maxRequestsPerSecond: max number of requests per second
+        :return:
+        '''
+
+        with self._lock:
+            now = time.time()
+            waitTime = self._nextTime - now
+            self._nextTime = max(now, self._nextTime) + 1.0 / maxRequestsPerSecond
+
+        if waitTime > 0:
+            time.sleep(waitTime)
+
+
 class JIRARest(object):
     '''
     Class that
     '''
 
     # Initialize connection
-    def __init__(self, server=None):
+    def __init__(self, server=None, snapshotDir='.jira_snapshot', metadataCacheDir='.jira_cache',
+                 maxRequestsPerSecond=10):
 
         if server is None:
             # self.url_server = 'http://ptlisljira-dev.co-int.net:8080/'
@@ -31,6 +131,44 @@ class JIRARest(object):
 
         self.maxResults = 200
 
+        # Max number of concurrent requests to Jira
+        self.maxWorkers = 4
+
+        # Max number of write requests per second done by flushJiraIssueUpdates - read on each request, can be
+        # changed at any time
+        self.maxRequestsPerSecond = maxRequestsPerSecond
+
+        self._rateLimiter = _RateLimiter()
+
+        # Queue of issue updates / transitions - see flushJiraIssueUpdates
+        self._issueUpdateQueue = []
+
+        # Folder where metadata (fields, issue types, versions, transitions) is cached per server
+        self.metadataCacheDir = metadataCacheDir
+
+        # Seconds the cached metadata is valid
+        self.metadataTTL = 24 * 3600
+
+        # Metadata cache - loaded when first needed
+        self._metadataCache = None
+        self._metadataLock = threading.RLock()
+
+        # Folder where the issue snapshots of the incremental mode are saved
+        self.snapshotDir = snapshotDir
+
+        # Minutes added to the period requested by the incremental mode (requests done while the last search ran)
+        self.snapshotOverlap = 5
+
+        # Seconds between the key-only searches of the incremental mode that drop the issues that no longer match
+        # the query (moved, deleted, fix version changed, ...)
+        self.snapshotEvictionInterval = 3600
+
+        # Snapshots already read / written by this object - signature -> snapshot
+        self._snapshotMemo = {}
+
+        # Field accessors cache - see _getFieldAccessor
+        self._fieldAccessors = {}
+
         # Jira object that will be used to do everything. It is initialized in the login
         self.jira_obj = None
 
@@ -58,9 +196,36 @@ class JIRARest(object):
 
     def getIssueDataFromIssueTypeProjectVersionKey(
             self, issueTypeList, projectList, fixVersionList, affectsVersionList, keyList,
-            fieldNameList, changelog=False):
+            fieldNameList, changelog=False, incremental=False):
+        '''
+        Get issue data from the issues matching issue types, projects, versions or keys
+        :param issueTypeList: list of issue types
+        :param projectList: list of projects
+        :param fixVersionList: list of fix versions
+        :param affectsVersionList: list of affected versions
+        :param keyList: list of issue keys - if not empty it replaces the remaining filters
+        :param fieldNameList: list of fields to be retrieved - key and summary are always retrieved
+        :param changelog: retrieve changelog of each issue
+        :param incremental: only retrieve issues updated since the last call with the same query and merge them into
+        the local snapshot of the query (see _getIssueDataIncremental)
+        :return: list of dicts with issue data
+        '''
 
         fieldNameList = ['key', 'summary'] + fieldNameList
+
+        searchString = self._getSearchString(issueTypeList, projectList, fixVersionList, affectsVersionList, keyList)
+
+        if incremental:
+            return self._getIssueDataIncremental(searchString, fieldNameList, changelog)
+
+        return self._getIssueData(searchString, fieldNameList, changelog)
+
+    def _getSearchString(self, issueTypeList, projectList, fixVersionList, affectsVersionList, keyList):
+        '''
+        Build JQL search string
+        :return: JQL string
+        '''
+
         searchString = ''
 
         if len(issueTypeList) > 0:
@@ -108,79 +273,270 @@ class JIRARest(object):
 
             searchString = searchString[:-4] + '\')'
 
+        return searchString
+
+    def _getIssueDataIncremental(self, searchString, fieldNameList, changelog=False):
+        '''
+        Change data capture version of _getIssueData. A snapshot with the issues and the time of the last search is
+        saved per query signature (server, JQL, fields, changelog) in snapshotDir. Following calls only request the
+        issues updated since the last search and merge them into the snapshot.
+        The period is requested with a relative JQL date (updated >= "-<minutes>m"), evaluated with the Jira clock
+        and timezone, so clock or timezone differences between this host and Jira do not drop updates.
+        Every snapshotEvictionInterval seconds the keys matching the query are requested and the issues that no
+        longer match it (moved, deleted, fix version changed, ...) are dropped from the snapshot
+        :param searchString: JQL string
+        :param fieldNameList: list of fields to be retrieved
+        :param changelog: retrieve changelog of each issue
+        :return: list of dicts with issue data
+        '''
+
+        signature = hashlib.sha1(json.dumps([self.url_server, searchString, sorted(fieldNameList), changelog])).hexdigest()
+
+        snapshotFile = os.path.join(self.snapshotDir, signature + '.json')
+
+        # Snapshot kept in memory by a previous call (e.g. sync daemon)
+        snapshot = self._snapshotMemo.get(signature)
+
+        if snapshot is None and os.path.isfile(snapshotFile):
+            try:
+                with open(snapshotFile) as filen:
+                    snapshot = json.load(filen, object_hook=self._snapshotDecode)
+            except ValueError:
+                logger.warning('_getIssueDataIncremental: Snapshot %s is corrupted - getting all issues' % snapshotFile)
+
+        # Snapshots of older versions have an absolute mark in the local timezone - not reliable
+        if snapshot is not None and 'markTime' not in snapshot:
+            snapshot = None
+
+        # Mark is taken before searching - only elapsed times of the local clock are used
+        markTime = time.time()
+
+        if snapshot is None:
+
+            logger.info('_getIssueDataIncremental: No snapshot for \'%s\' - getting all issues' % searchString)
+
+            issueList = self._getIssueData(searchString, fieldNameList, changelog)
+
+            evictTime = markTime
+
+        else:
+
+            minutes = int(math.ceil((markTime - snapshot['markTime']) / 60.0)) + self.snapshotOverlap
+
+            deltaSearchString = 'updated >= "-%dm"' % minutes
+
+            if searchString:
+                deltaSearchString = '(' + searchString + ') and ' + deltaSearchString
+
+            deltaList = self._getIssueData(deltaSearchString, fieldNameList, changelog)
+
+            logger.info('_getIssueDataIncremental: %d issues updated in the last %d minutes' % (len(deltaList),
+                                                                                               minutes))
+
+            # Merge delta - updated issues keep their position, new ones are added at the end
+            issueList = snapshot['issues']
+
+            issueIdx = dict((issueData['key'], idx) for idx, issueData in enumerate(issueList))
+
+            for issueData in deltaList:
+
+                if issueData['key'] in issueIdx:
+                    issueList[issueIdx[issueData['key']]] = issueData
+                else:
+                    issueIdx[issueData['key']] = len(issueList)
+                    issueList.append(issueData)
+
+            evictTime = snapshot['evictTime']
+
+            # Drop issues that no longer match the query
+            if markTime - evictTime >= self.snapshotEvictionInterval:
+
+                keySet = set([issue.key for issue in self._searchIssues(searchString, fields='key')])
+
+                evictedCount = len(issueList)
+
+                issueList = [issueData for issueData in issueList if issueData['key'] in keySet]
+
+                logger.info('_getIssueDataIncremental: %d issues no longer match \'%s\'' % (
+                    evictedCount - len(issueList), searchString))
+
+                evictTime = markTime
+
+        # Save snapshot
+        if not os.path.isdir(self.snapshotDir):
+            os.makedirs(self.snapshotDir)
+
+        snapshot = {'markTime': markTime, 'evictTime': evictTime, 'query': searchString, 'issues': issueList}
+
+        with open(snapshotFile + '.tmp', 'w') as filen:
+            json.dump(snapshot, filen, default=self._snapshotEncode)
+
+        if os.path.isfile(snapshotFile):
+            os.remove(snapshotFile)
+
+        os.rename(snapshotFile + '.tmp', snapshotFile)
+
+        self._snapshotMemo[signature] = snapshot
+
+        # Callers may change the issue data so the snapshot is not returned directly
+        return [dict(issueData) for issueData in issueList]
+
+    @staticmethod
+    def _snapshotEncode(value):
+        '''
+        Encode values that are not plain data to be saved in the snapshot - jira resources keep their raw json
+        :param value: value to be encoded
+        :return: json serializable value
+        '''
+
+        if isinstance(value, jira.resources.Resource):
+            return {'__jira_resource__': type(value).__name__, 'raw': value.raw}
+
+        return str(value)
+
+    def _snapshotDecode(self, value):
+        '''
+        Rebuild the jira resources saved in the snapshot by _snapshotEncode
+        :param value: dict read from snapshot
+        :return: decoded value
+        '''
+
+        if '__jira_resource__' in value:
+            resourceClass = getattr(jira.resources, value['__jira_resource__'], jira.resources.Resource)
+            return resourceClass(self.jira_obj._options, self.jira_obj._session, value['raw'])
+
+        return value
+
+    def _getFieldAccessor(self, fieldName):
+        '''
+        Get (and cache) the accessor function of a field - key and id are issue properties, the remaining are fields
+        :param fieldName: field name e.g. 'summary', 'customfield_20691'
+        :return: function that returns the field value of an issue
+        '''
+
+        accessor = self._fieldAccessors.get(fieldName)
+
+        if accessor is None:
+
+            if fieldName in ['key', 'id']:
+                accessor = operator.attrgetter(fieldName)
+            else:
+                accessor = operator.attrgetter('fields.' + fieldName)
+
+            self._fieldAccessors[fieldName] = accessor
+
+        return accessor
+
+    def _searchIssues(self, searchString, fields=None, expand=None):
+        '''
+        Search all issues matching the JQL. The first page gives the total number of issues and the remaining pages
+        are requested concurrently (maxWorkers) - issues are returned in the same order as a serial search
+        :param searchString: JQL string
+        :param fields: comma separated list of fields to be requested (None for all)
+        :param expand: expand parameter e.g. 'changelog'
+        :return: list of jira issues
+        '''
+
         options = {'maxResults': self.maxResults}
 
-        if changelog:
-            options['expand'] = 'changelog'
+        if fields:
+            options['fields'] = fields
 
-        issueListTemp = self.jira_obj.search_issues(searchString, **options)
+        if expand:
+            options['expand'] = expand
+
+        issueListTemp = self.jira_obj.search_issues(searchString, startAt=0, **options)
 
         issueList = issueListTemp[:]
 
-        idx = self.maxResults + 1
+        total = getattr(issueListTemp, 'total', None)
 
-        while len(issueListTemp) != 0:
-            options['startAt'] = idx
+        # Server may limit the page size below maxResults
+        pageSize = getattr(issueListTemp, 'maxResults', None) or len(issueListTemp)
 
-            issueListTemp = self.jira_obj.search_issues(searchString, **options)
+        if total is None or pageSize == 0:
 
-            issueList += issueListTemp
+            # Total unknown - get pages one after the other until an empty page
+            while len(issueListTemp) != 0:
 
-            idx += self.maxResults
+                issueListTemp = self.jira_obj.search_issues(searchString, startAt=len(issueList), **options)
 
-        # Get issue data
-        issueProperties = ['key', 'id']
-        fieldValueList = []
+                issueList += issueListTemp
 
-        for issue in issueList:
+            return issueList
 
-            issueData = {}
+        startAtList = range(pageSize, total, pageSize)
 
-            for fieldName in fieldNameList:
+        if len(startAtList) == 0:
+            return issueList
 
-                if fieldName in issueProperties:
-                    exec 'issueData[fieldName] = issue.%s' % fieldName
+        logger.debug('_searchIssues: %d issues - getting %d remaining pages' % (total, len(startAtList)))
 
-                else:
+        pool = ThreadPool(max(1, min(self.maxWorkers, len(startAtList))))
 
-                    issueData[fieldName] = None
+        try:
+            pageList = pool.map(lambda startAt: self.jira_obj.search_issues(searchString, startAt=startAt, **options),
+                                startAtList)
+        finally:
+            pool.close()
+            pool.join()
 
-                    try:
-                        exec 'issueData[fieldName] = issue.fields.%s' % fieldName
+        for page in pageList:
+            issueList += page
 
-                    except:
+        return issueList
 
-                        logger.error(
-                            'getIssueDataFromIssueTypeProjectVersionKey: Field \'%s\' does not exist in issue: %s - %s' % (
-                            fieldName, issueData['key'], issueData['summary']))
+    def _getIssueData(self, searchString, fieldNameList, changelog=False):
+        '''
+        Search issues and convert them to dicts
+        :param searchString: JQL string
+        :param fieldNameList: list of fields to be retrieved
+        :param changelog: retrieve changelog of each issue
+        :return: list of dicts with issue data
+        '''
 
-                    if type(issueData[fieldName]) == jira.resources.User:
+        issueProperties = ['key', 'id']
 
-                        userData = issueData[fieldName]
+        # Only request the fields that are needed
+        fields = ','.join([fieldName for fieldName in fieldNameList if fieldName not in issueProperties])
 
-                        issueData[fieldName] = {
-                            'displayName': userData.displayName,
-                            'emailAddress': userData.emailAddress,
-                            'name': userData.name
-                        }
+        issueList = self._searchIssues(searchString, fields, 'changelog' if changelog else None)
+
+        # Accessors are compiled once per field
+        accessorList = [(fieldName, self._getFieldAccessor(fieldName), fieldName in issueProperties)
+                        for fieldName in fieldNameList]
+
+        # Get issue data
+        fieldValueList = []
+
+        for issue in issueList:
+
+            issueData = {}
 
-                    elif type(issueData[fieldName]) == unicode:
+            for fieldName, accessor, isProperty in accessorList:
 
-                        issueData[fieldName] = str(issueData[fieldName].encode('ascii', 'ignore'))
-                        non_printable = string.translate(str(issueData[fieldName]), None, string.printable)
-                        issueData[fieldName] = string.translate(str(issueData[fieldName]), None, non_printable)
+                if isProperty:
+                    issueData[fieldName] = accessor(issue)
+                    continue
 
-                    elif type(issueData[fieldName]) == jira.resources.Status:
+                try:
+                    value = accessor(issue)
 
-                        issueData[fieldName] = str(issueData[fieldName].name)
+                except AttributeError:
 
-                    elif type(issueData[fieldName]) == jira.resources.Resolution:
+                    value = None
 
-                        issueData[fieldName] = str(issueData[fieldName].name)
+                    logger.error(
+                        'getIssueDataFromIssueTypeProjectVersionKey: Field \'%s\' does not exist in issue: %s - %s' % (
+                        fieldName, issueData['key'], issueData['summary']))
 
-                    elif type(issueData[fieldName]) == type(None):
+                # Convert value according to its type
+                converter = _fieldConverters.get(type(value))
 
-                        issueData[fieldName] = ''
+                if converter is not None:
+                    value = converter(value)
+
+                issueData[fieldName] = value
 
             if changelog:
 
@@ -204,7 +560,122 @@ class JIRARest(object):
 
         return fieldValueList
 
-    def faultReportsLinkedToRequiredFunctionality(self, requiredFunctionality, faultReportList):
+    def iterIssueDataFromIssueTypeProjectVersionKey(
+            self, issueTypeList, projectList, fixVersionList, affectsVersionList, keyList,
+            fieldNameList, changelog=False):
+        '''
+        Lean version of getIssueDataFromIssueTypeProjectVersionKey. Issues are requested from /rest/api/2/search and
+        yielded as dicts built from the raw json without creating jira resources. Fields that are objects in Jira
+        (e.g. priority, fixVersions) are returned as raw json dicts, users as in getIssueDataFromIssueTypeProjectVersionKey
+        :param issueTypeList: list of issue types
+        :param projectList: list of projects
+        :param fixVersionList: list of fix versions
+        :param affectsVersionList: list of affected versions
+        :param keyList: list of issue keys - if not empty it replaces the remaining filters
+        :param fieldNameList: list of fields to be retrieved - key and summary are always retrieved
+        :param changelog: retrieve changelog of each issue
+        :return: generator of dicts with issue data
+        '''
+
+        fieldNameList = ['key', 'summary'] + fieldNameList
+
+        searchString = self._getSearchString(issueTypeList, projectList, fixVersionList, affectsVersionList, keyList)
+
+        issueProperties = ['key', 'id']
+
+        fieldList = [fieldName for fieldName in fieldNameList if fieldName not in issueProperties]
+
+        for rawIssue in self._searchIssuesRaw(searchString, fieldList, ['changelog'] if changelog else []):
+
+            issueData = {}
+
+            for fieldName in fieldNameList:
+
+                if fieldName in issueProperties:
+                    issueData[fieldName] = rawIssue[fieldName]
+                    continue
+
+                value = rawIssue['fields'].get(fieldName)
+
+                converter = _rawFieldConverters.get(fieldName) or _rawTypeConverters.get(type(value))
+
+                if converter is not None:
+                    value = converter(value)
+
+                issueData[fieldName] = value
+
+            if changelog:
+
+                issueData['changelog'] = []
+
+                for entry in rawIssue['changelog']['histories']:
+                    for item in entry['items']:
+                        # Same format as getIssueDataFromIssueTypeProjectVersionKey
+                        data = {
+                            'field': item.get('field'),
+                            'from': item.get('fromString'),
+                            'fromKey': item.get('fromString'),
+                            'to': item.get('toString'),
+                            'toKey': item.get('to')
+                        }
+                        issueData['changelog'].append(data)
+
+            yield issueData
+
+    def _searchIssuesRaw(self, searchString, fieldList, expandList=None, validateQuery=True):
+        '''
+        Search issues using /rest/api/2/search through the session of the jira object (connection pool) and yield the
+        raw json of each issue. Pages are parsed from the response stream one at a time
+        :param searchString: JQL string
+        :param fieldList: list of fields to be requested
+        :param expandList: list of expand parameters e.g. ['changelog']
+        :param validateQuery: if False invalid JQL values (e.g. unknown issue keys) are ignored by Jira
+        :return: generator of raw json issues
+        '''
+
+        url = self.url_server.rstrip('/') + '/rest/api/2/search'
+
+        session = self.jira_obj._session
+
+        startAt = 0
+        total = None
+
+        while total is None or startAt < total:
+
+            payload = {
+                'jql': searchString,
+                'startAt': startAt,
+                'maxResults': self.maxResults,
+                'fields': fieldList,
+                'expand': expandList or [],
+                'validateQuery': validateQuery
+            }
+
+            r = session.post(url, data=json.dumps(payload), headers={'Content-Type': 'application/json'},
+                             stream=True)
+
+            if r.status_code != 200:
+                raise jira.JIRAError(r.status_code, r.text, url)
+
+            # Parse directly from the (decompressed) stream
+            r.raw.decode_content = True
+            page = json.load(r.raw)
+            r.close()
+
+            total = page['total']
+
+            issueList = page['issues']
+
+            # Nothing else to get
+            if len(issueList) == 0:
+                break
+
+            startAt += len(issueList)
+
+            for rawIssue in issueList:
+                yield rawIssue
+
+    def faultReportsLinkedToRequiredFunctionality(self, requiredFunctionality, faultReportList, incremental=False):
 
         alreadyLinked = False
 
@@ -212,7 +683,7 @@ class JIRARest(object):
 
         # First get links present in the RF
         jiraIssueData = self.getIssueDataFromIssueTypeProjectVersionKey(
-            ['Required Functionality', 'Test Exec'], ['hiT 7300 Program'], [], [], [requiredFunctionality], [], True)[0]
+            ['Required Functionality', 'Test Exec'], ['hiT 7300 Program'], [], [], [requiredFunctionality], [], True, incremental)[0]
 
         # Now get the comments of RF
         for faultReport in faultReportList:
@@ -237,6 +708,92 @@ class JIRARest(object):
         # Now check which FR is present in the above
         return linkedFaultReports
 
+    def reconcileLinks(self, relationList, linkType='Relates', keyChunkSize=200):
+        '''
+        Create the missing links between issues. Current links and changelogs of all target issues are retrieved with
+        a few searches, links that exist or existed in the past (removed by someone) are not created again. Missing
+        links are created concurrently (maxWorkers / maxRequestsPerSecond)
+        :param relationList: list of (target issue key, list of source issue keys) e.g. (RF, [FR, ...])
+        :param linkType: link type used in addLink
+        :param keyChunkSize: max number of issue keys per search
+        :return: (list of created (source, target) links, dict (source, target) -> exception of failed links)
+        '''
+
+        logger.info('reconcileLinks: Start...')
+
+        targetKeyList = list(set([targetKey for targetKey, sourceKeyList in relationList]))
+
+        # Target issue key -> set of issue keys linked now or in the past
+        linkedKeyDict = dict([(targetKey, set()) for targetKey in targetKeyList])
+
+        for idx in range(0, len(targetKeyList), keyChunkSize):
+
+            searchString = self._getSearchString([], [], [], [], targetKeyList[idx:idx + keyChunkSize])
+
+            for rawIssue in self._searchIssuesRaw(searchString, ['issuelinks'], ['changelog'], validateQuery=False):
+
+                linkedKeySet = linkedKeyDict.setdefault(rawIssue['key'], set())
+
+                # Current links
+                for issueLink in rawIssue['fields'].get('issuelinks') or []:
+                    for direction in ['inwardIssue', 'outwardIssue']:
+                        if direction in issueLink:
+                            linkedKeySet.add(issueLink[direction]['key'])
+
+                # Links added / removed in the past - 'to' / 'from' have the key of the linked issue
+                for entry in rawIssue.get('changelog', {}).get('histories', []):
+                    for item in entry['items']:
+                        if item.get('field') == 'Link':
+                            for linkedKey in [item.get('to'), item.get('from')]:
+                                if linkedKey:
+                                    linkedKeySet.add(linkedKey)
+
+        # Links to be created
+        missingLinkList = []
+        missingLinkSet = set()
+
+        for targetKey, sourceKeyList in relationList:
+            for sourceKey in sourceKeyList:
+
+                if sourceKey in linkedKeyDict[targetKey] or (sourceKey, targetKey) in missingLinkSet:
+                    logger.debug('reconcileLinks: Link from %s to %s exists or existed in the past' % (
+                        sourceKey, targetKey))
+                    continue
+
+                missingLinkList.append((sourceKey, targetKey))
+                missingLinkSet.add((sourceKey, targetKey))
+
+        def _createLink(link):
+            try:
+                self._rateLimiter.wait(self.maxRequestsPerSecond)
+                self.addLink(link[0], linkType, link[1])
+            except Exception as e:
+                logger.error('reconcileLinks: Link from %s to %s failed: %s' % (link[0], link[1], e))
+                return e
+            return None
+
+        errorDict = {}
+
+        if len(missingLinkList) > 0:
+
+            pool = ThreadPool(max(1, min(self.maxWorkers, len(missingLinkList))))
+
+            try:
+                resultList = pool.map(_createLink, missingLinkList)
+            finally:
+                pool.close()
+                pool.join()
+
+            errorDict = dict([(link, error) for link, error in itertools.izip(missingLinkList, resultList)
+                              if error is not None])
+
+        createdLinkList = [link for link in missingLinkList if link not in errorDict]
+
+        logger.info('reconcileLinks: %d links created - %d failed' % (len(createdLinkList), len(errorDict)))
+        logger.info('reconcileLinks: ...done!')
+
+        return createdLinkList, errorDict
+
     def addLink(self, srcIssue, linkType, targetIssue):
 
         logger.info('Adding link \'%s\' from \'%s\' to \'%s\'' % (linkType, srcIssue, targetIssue))
@@ -254,18 +811,361 @@ class JIRARest(object):
 
     def updateJiraIssueField(self, issueKey, dataDict):
 
-        issue = self.jira_obj.issue(issueKey)
-
-        issue.update(**dataDict)
+        # Direct put - no need to get the issue before (and after) updating it
+        self._putIssueFields(issueKey, dataDict)
 
-    def transitionJiraIssue(self, issueKey, transition, comment = None):
+    def transitionJiraIssue(self, issueKey, transition, comment = None, issueType=None, status=None):
 
-        self.jira_obj.transition_issue(issueKey, transition)
+        # Transition name is resolved with the metadata cache if the issue type and status are known
+        self._postIssueTransition(issueKey, transition, issueType, status)
 
         # Add comment
         if comment:
             self.jira_obj.add_comment(issueKey, comment)
 
+    def queueJiraIssueFieldUpdate(self, issueKey, dataDict):
+        '''
+        Queue a field update to be done by flushJiraIssueUpdates
+        :param issueKey: issue key
+        :param dataDict: dict field name -> value
+        '''
+
+        self._issueUpdateQueue.append((issueKey, 'fields', dataDict))
+
+    def queueJiraIssueTransition(self, issueKey, transition, comment=None, issueType=None, status=None):
+        '''
+        Queue a transition to be done by flushJiraIssueUpdates
+        :param issueKey: issue key
+        :param transition: transition name or id
+        :param comment: comment added after the transition (optional)
+        :param issueType: issue type name - with status the transition id is cached (optional)
+        :param status: status of the issue when the transition is done (optional)
+        '''
+
+        self._issueUpdateQueue.append((issueKey, 'transition', (transition, comment, issueType, status)))
+
+    def getIssueUpdateQueueSize(self):
+        '''
+        Number of queued field updates and transitions not flushed yet
+        :return: int
+        '''
+
+        return len(self._issueUpdateQueue)
+
+    def flushJiraIssueUpdates(self):
+        '''
+        Execute all queued field updates and transitions. Issues are processed concurrently (maxWorkers) and requests
+        are limited to maxRequestsPerSecond - operations of the same issue are done in the order they were queued.
+        If an operation fails the remaining operations of that issue are skipped
+        :return: dict issue key -> exception of the issues that failed
+        '''
+
+        logger.info('flushJiraIssueUpdates: Start...')
+
+        issueQueue = self._issueUpdateQueue
+        self._issueUpdateQueue = []
+
+        # Group operations by issue keeping the order
+        issueOperations = collections.OrderedDict()
+
+        for issueKey, operation, data in issueQueue:
+            issueOperations.setdefault(issueKey, []).append((operation, data))
+
+        if len(issueOperations) == 0:
+            return {}
+
+        pool = ThreadPool(max(1, min(self.maxWorkers, len(issueOperations))))
+
+        try:
+            resultList = pool.map(self._processIssueOperations, issueOperations.items())
+        finally:
+            pool.close()
+            pool.join()
+
+        errorDict = dict([(issueKey, error) for issueKey, error in resultList if error is not None])
+
+        logger.info('flushJiraIssueUpdates: %d operations in %d issues - %d issues failed' % (
+            len(issueQueue), len(issueOperations), len(errorDict)))
+        logger.info('flushJiraIssueUpdates: ...done!')
+
+        return errorDict
+
+    def _processIssueOperations(self, issueItem):
+        '''
+        Execute queued operations of an issue
+        :param issueItem: (issue key, list of (operation, data))
+        :return: (issue key, exception or None)
+        '''
+
+        issueKey, operationList = issueItem
+
+        try:
+            for operation, data in operationList:
+
+                if operation == 'fields':
+                    self._putIssueFields(issueKey, data)
+
+                else:
+                    transition, comment, issueType, status = data
+
+                    self._postIssueTransition(issueKey, transition, issueType, status)
+
+                    if comment:
+                        self._rateLimiter.wait(self.maxRequestsPerSecond)
+                        self._checkResponse(self.jira_obj._session.post(
+                            self._getIssueUrl(issueKey) + '/comment', data=json.dumps({'body': comment}),
+                            headers={'Content-Type': 'application/json'}))
+
+        except Exception as e:
+            logger.error('_processIssueOperations: Update of issue %s failed: %s' % (issueKey, e))
+            return issueKey, e
+
+        return issueKey, None
+
+    def _putIssueFields(self, issueKey, dataDict):
+        '''
+        Update issue fields without getting the issue first
+        :param issueKey: issue key
+        :param dataDict: dict field name -> value
+        '''
+
+        self._rateLimiter.wait(self.maxRequestsPerSecond)
+
+        self._checkResponse(self.jira_obj._session.put(
+            self._getIssueUrl(issueKey), data=json.dumps({'fields': dataDict}),
+            headers={'Content-Type': 'application/json'}))
+
+    def _postIssueTransition(self, issueKey, transition, issueType=None, status=None):
+        '''
+        Transition issue - transition can be the transition name or its id. Names are resolved with the metadata
+        cache when the issue type and status are known (see getTransitionId), if the cached id is not valid for the
+        issue the transitions of the issue are requested again
+        :param issueKey: issue key
+        :param transition: transition name or id
+        :param issueType: issue type name (optional)
+        :param status: current status of the issue (optional)
+        '''
+
+        transitionId = str(transition)
+
+        if transitionId.isdigit():
+
+            self._rateLimiter.wait(self.maxRequestsPerSecond)
+
+            self._checkResponse(self._postTransitionId(issueKey, transitionId))
+
+            return
+
+        # Resolve transition name
+        transitionId = self.getTransitionId(issueKey, transition, issueType=issueType, status=status)
+
+        self._rateLimiter.wait(self.maxRequestsPerSecond)
+
+        r = self._postTransitionId(issueKey, transitionId)
+
+        # Cached id not valid in the current status / workflow of the issue
+        if r.status_code == 400 and issueType and status:
+
+            logger.debug('_postIssueTransition: Transition id %s of \'%s\' not valid for %s - updating cache' % (
+                transitionId, transition, issueKey))
+
+            transitionId = self.getTransitionId(issueKey, transition, True, issueType, status)
+
+            self._rateLimiter.wait(self.maxRequestsPerSecond)
+
+            r = self._postTransitionId(issueKey, transitionId)
+
+        self._checkResponse(r)
+
+    def _postTransitionId(self, issueKey, transitionId):
+
+        return self.jira_obj._session.post(
+            self._getIssueUrl(issueKey) + '/transitions', data=json.dumps({'transition': {'id': transitionId}}),
+            headers={'Content-Type': 'application/json'})
+
+    def getTransitionId(self, issueKey, transitionName, forceUpdate=False, issueType=None, status=None):
+        '''
+        Get transition id from its name. Transition ids depend on the workflow and on the status of the issue, so they
+        are only cached per project + issue type (workflow) + status when the issue type and status are given. In that
+        case they are requested from the issue when the name is unknown or forceUpdate is used - otherwise they are
+        always requested from the issue
+        :param issueKey: issue key
+        :param transitionName: transition name
+        :param forceUpdate: request the transitions of the issue even if cached
+        :param issueType: issue type name (optional)
+        :param status: current status of the issue (optional)
+        :return: transition id
+        '''
+
+        metadataName = None
+        transitionIdDict = {}
+
+        if issueType and status:
+            metadataName = 'transitions:%s:%s:%s' % (issueKey.split('-')[0], issueType, status)
+            transitionIdDict = self._getMetadata(metadataName, dict)
+
+        if forceUpdate or transitionName not in transitionIdDict:
+
+            self._rateLimiter.wait(self.maxRequestsPerSecond)
+
+            r = self._checkResponse(self.jira_obj._session.get(self._getIssueUrl(issueKey) + '/transitions'))
+
+            # Transitions available in the current status of the issue
+            transitionIdDict = dict([(t['name'], t['id']) for t in r.json()['transitions']])
+
+            if transitionName not in transitionIdDict:
+                raise jira.JIRAError(None, 'Transition \'%s\' not available for issue %s (available: %s)' % (
+                    transitionName, issueKey, transitionIdDict.keys()))
+
+            if metadataName is not None:
+                self._setMetadata(metadataName, transitionIdDict)
+
+        return transitionIdDict[transitionName]
+
+    def getFields(self):
+        '''
+        Get (cached) fields
+        :return: dict field name -> field id
+        '''
+
+        def _loadFields():
+            r = self._checkResponse(self.jira_obj._session.get(self.url_server.rstrip('/') + '/rest/api/2/field'))
+            return dict([(field['name'], field['id']) for field in r.json()])
+
+        return self._getMetadata('fields', _loadFields)
+
+    def getFieldId(self, fieldName):
+        '''
+        Get field id from field name e.g. 'Fix Version/s' -> 'fixVersions'. Ids are returned unchanged
+        :param fieldName: field name or id
+        :return: field id
+        '''
+
+        fieldDict = self.getFields()
+
+        if fieldName in fieldDict:
+            return fieldDict[fieldName]
+
+        if fieldName in fieldDict.values():
+            return fieldName
+
+        raise KeyError('Field \'%s\' does not exist in %s' % (fieldName, self.url_server))
+
+    def getIssueTypes(self):
+        '''
+        Get (cached) issue types
+        :return: dict issue type name -> issue type id
+        '''
+
+        def _loadIssueTypes():
+            return dict([(issueType.name, issueType.id) for issueType in self.jira_obj.issue_types()])
+
+        return self._getMetadata('issuetypes', _loadIssueTypes)
+
+    def getProjectVersions(self, project):
+        '''
+        Get (cached) versions of a project
+        :param project: project key
+        :return: dict version name -> version id
+        '''
+
+        def _loadVersions():
+            return dict([(version.name, version.id) for version in self.jira_obj.project_versions(project)])
+
+        return self._getMetadata('versions:' + project, _loadVersions)
+
+    def clearMetadataCache(self):
+        '''
+        Remove all cached metadata of the server
+        '''
+
+        with self._metadataLock:
+            self._metadataCache = {}
+            self._saveMetadataCache()
+
+    def _getMetadata(self, name, loader):
+        '''
+        Get metadata from the cache or from loader if not cached / expired (metadataTTL)
+        :param name: metadata name
+        :param loader: function that returns the metadata
+        :return: metadata
+        '''
+
+        with self._metadataLock:
+
+            self._loadMetadataCache()
+
+            entry = self._metadataCache.get(name)
+
+            if entry is not None and time.time() - entry['time'] < self.metadataTTL:
+                return entry['data']
+
+        logger.debug('_getMetadata: Getting \'%s\' from %s' % (name, self.url_server))
+
+        data = loader()
+
+        self._setMetadata(name, data)
+
+        return data
+
+    def _setMetadata(self, name, data):
+
+        with self._metadataLock:
+
+            self._loadMetadataCache()
+
+            self._metadataCache[name] = {'time': time.time(), 'data': data}
+
+            self._saveMetadataCache()
+
+    def _getMetadataCacheFile(self):
+
+        return os.path.join(self.metadataCacheDir, hashlib.sha1(self.url_server).hexdigest() + '.json')
+
+    def _loadMetadataCache(self):
+
+        # Already loaded
+        if self._metadataCache is not None:
+            return
+
+        self._metadataCache = {}
+
+        cacheFile = self._getMetadataCacheFile()
+
+        if os.path.isfile(cacheFile):
+            try:
+                with open(cacheFile) as filen:
+                    self._metadataCache = json.load(filen)
+            except ValueError:
+                logger.warning('_loadMetadataCache: Cache %s is corrupted - ignoring it' % cacheFile)
+
+    def _saveMetadataCache(self):
+
+        if not os.path.isdir(self.metadataCacheDir):
+            os.makedirs(self.metadataCacheDir)
+
+        cacheFile = self._getMetadataCacheFile()
+
+        with open(cacheFile + '.tmp', 'w') as filen:
+            json.dump(self._metadataCache, filen)
+
+        if os.path.isfile(cacheFile):
+            os.remove(cacheFile)
+
+        os.rename(cacheFile + '.tmp', cacheFile)
+
+    def _getIssueUrl(self, issueKey):
+
+        return self.url_server.rstrip('/') + '/rest/api/2/issue/' + issueKey
+
+    @staticmethod
+    def _checkResponse(r):
+
+        if r.status_code >= 300:
+            raise jira.JIRAError(r.status_code, r.text, r.url)
+
+        return r
+
     def saveToFile(self, info, fileName='saveToFile.info'):
         '''
         Save to file the info content of a specific request or a dictionary
@@ -287,15 +1187,18 @@ class JIRARest(object):
         info = ''
 
         # Get issue types and format them info and save it
-        issueTypeList = self.jira_obj.issue_types()
-
         info += 'Issue types:\n\n'
 
-        for issueType in issueTypeList:
+        for issueTypeName, issueTypeId in sorted(self.getIssueTypes().iteritems()):
+
+            info += issueTypeName + ': ' + issueTypeId + '\n'
+
+        # Get fields and format them info and save it
+        info += '\nFields:\n\n'
 
-            info += issueType.name + ': ' + issueType.id + '\n'
+        for fieldName, fieldId in sorted(self.getFields().iteritems()):
 
-        # Todo Add this info also http://jira-sandbox.intra.coriant.com:8080/rest/api/latest/field
+            info += fieldName + ': ' + fieldId + '\n'
 
         # Save to file
         self.saveToFile(info, path + '\\issue_info.txt')
\ No newline at end of file
@@ -0,0 +1,5 @@
+# Import session that replays the QC requests in-process
+from replay import ReplaySession, ReplayResponse
+
+# Import synthetic ALM data generators
+import synthetic
@@ -0,0 +1,369 @@
+'''
+    bench.py - Benchmarks of the QC client code paths (paging, merge of the pages, field extraction, sxml parsing and
+    the hiT7300_QC import / sync routines) against synthetic ALM data served in-process (see ReplaySession).
+
+    Each case runs in its own process so that the peak RSS belongs to the case. Results are written as json and can
+    be compared with the results of another commit:
+
+        python -m QCRest_hiT7300.Benchmark.bench -s 1000,10000 -o new.json
+        python -m QCRest_hiT7300.Benchmark.bench -s 1000,10000 -o new.json --compare old.json
+'''
+
+__author__ = 'Rodolfo Andrade'
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+import traceback
+from collections import OrderedDict
+
+try:
+    import resource
+except ImportError:
+    # Not available in windows - peak RSS is not measured
+    resource = None
+
+try:
+    from QCRest_hiT7300 import hiT7300_QC
+    from QCRest_hiT7300.QCRest.qc import SXml
+    from QCRest_hiT7300.QCRest.fakealm import FakeALMApp, FakeALMStore
+
+except ImportError:
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+    from QCRest_hiT7300 import hiT7300_QC
+    from QCRest_hiT7300.QCRest.qc import SXml
+    from QCRest_hiT7300.QCRest.fakealm import FakeALMApp, FakeALMStore
+
+from replay import ReplaySession
+import synthetic
+
+logger = logging.getLogger('QCRest')
+
+# QC field with the Jira key used in the syncDefects case
+jiraKey = 'user-50'
+
+
+def _getQC(store):
+
+    session = ReplaySession(FakeALMApp(store, pageSize=500))
+
+    qc_con = hiT7300_QC('http://fake-alm', 'BENCHMARK', 'BENCHMARK', session=session)
+    qc_con.login('benchmark', 'benchmark')
+
+    return qc_con, session
+
+
+# Cases: each has a setup (not measured) and a run (measured)
+
+def _setupPaging(size):
+
+    store = FakeALMStore()
+    synthetic.fillStore(store, 'test', size)
+
+    qc_con, session = _getQC(store)
+
+    return {'qc_con': qc_con, 'session': session}
+
+
+def _runPaging(context):
+
+    r = context['qc_con'].TestPlanTests.getEntity('id,name,parent-id,user-01')
+
+    return {'pages': len(r)}
+
+
+def _setupMergePages(size):
+
+    context = _setupPaging(size)
+
+    context['r'] = context['qc_con'].TestPlanTests.getEntity('id,name,parent-id,user-01')
+
+    return context
+
+
+def _runMergePages(context):
+
+    xml = context['qc_con']._getXmlFromRequestQueryList(context['r'])
+
+    return {'xmlBytes': len(xml)}
+
+
+def _setupFieldValues(size):
+
+    context = _setupMergePages(size)
+
+    context['xml'] = context['qc_con']._getXmlFromRequestQueryList(context['r'])
+
+    return context
+
+
+def _runFieldValues(context):
+
+    listValueList = context['qc_con'].TestPlanTests.getEntityDataCollectionFieldValueList(
+        ['id', 'name', 'parent-id', 'user-01'], context['xml'])
+
+    return {'values': sum([len(valueList) for valueList in listValueList])}
+
+
+def _setupSxml(size):
+
+    return {'sxml': synthetic.getSyntheticSxml(size)}
+
+
+def _runSxml(context):
+
+    sxml = SXml(context['sxml'])
+
+    sxml.getTestData()
+    sxml.getTestSetData()
+    sxml.getTestInstancesData()
+    sxml.getTestInstancesRunData()
+
+    return {'sxmlBytes': len(context['sxml'])}
+
+
+def _setupImport(size):
+
+    context = _setupSxml(size)
+
+    context['qc_con'], context['session'] = _getQC(FakeALMStore())
+
+    return context
+
+
+def _runImport(context):
+
+    qc_con = context['qc_con']
+
+    qc_con.addTestToTestPlan(context['sxml'], True, False)
+    qc_con.addTestSet(context['sxml'])
+    qc_con.addTestInstanceToTestLab(context['sxml'])
+    qc_con.addTestRunToTestLab(context['sxml'])
+
+    return {}
+
+
+def _setupSyncDefects(size):
+
+    store = FakeALMStore()
+
+    # Half of the defects already exist
+    existingCount = size / 2
+
+    for idx, defectId in enumerate(synthetic.fillStore(store, 'defect', existingCount)):
+        store.updateEntity('defect', defectId, {jiraKey: 'JIRA-%d' % idx})
+
+    qc_con, session = _getQC(store)
+
+    return {'qc_con': qc_con, 'session': session,
+            'fieldDataList': synthetic.getSyntheticDefectFieldDataList(size, jiraKey, existingCount)}
+
+
+def _runSyncDefects(context):
+
+    context['qc_con'].syncDefects(context['fieldDataList'], jiraKey)
+
+    return {}
+
+
+# name -> (setup, run, description, max size run by default - the slowest cases take too long with large sizes)
+caseInfo = OrderedDict([
+    ('paging', (_setupPaging, _runPaging, 'QC_Entity.getEntity over all pages', None)),
+    ('mergePages', (_setupMergePages, _runMergePages, 'QC._getXmlFromRequestQueryList of all pages', None)),
+    ('fieldValues', (_setupFieldValues, _runFieldValues, 'getEntityDataCollectionFieldValueList of 4 fields',
+                     None)),
+    ('sxml', (_setupSxml, _runSxml, 'SXml parsing and data lists', None)),
+    ('import', (_setupImport, _runImport,
+                'addTestToTestPlan/addTestSet/addTestInstanceToTestLab/addTestRunToTestLab', 200)),
+    ('syncDefects', (_setupSyncDefects, _runSyncDefects, 'hiT7300_QC.syncDefects - half new, half updated', 1000)),
+])
+
+
+def _getPeakRss():
+
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Linux returns KB, mac os bytes
+    if sys.platform == 'darwin':
+        peak /= 1024
+
+    return peak
+
+
+def runCase(name, size):
+    '''
+    Run a case in the current process
+    :param name: case name - see caseInfo
+    :param size: number of entities / test cases
+    :return: dict with the results
+    '''
+
+    setup, run, description, maxSize = caseInfo[name]
+
+    context = setup(size)
+
+    session = context.get('session')
+
+    if session is not None:
+        session.resetStats()
+
+    setupRss = _getPeakRss()
+
+    start_time = time.time()
+    start_clock = time.clock()
+
+    result = run(context)
+
+    result.update({
+        'case': name,
+        'size': size,
+        'wallTime': time.time() - start_time,
+        'cpuTime': time.clock() - start_clock,
+        'setupPeakRssKb': setupRss,
+        'peakRssKb': _getPeakRss(),
+    })
+
+    if session is not None:
+        result.update(session.getStats())
+
+    return result
+
+
+def _runCaseQueue(queue, name, size, logLevel):
+
+    logger.setLevel(logLevel)
+
+    try:
+        queue.put(runCase(name, size))
+
+    except Exception as e:
+        queue.put({'case': name, 'size': size, 'error': '%s\n%s' % (e, traceback.format_exc())})
+
+
+def runCaseProcess(name, size, logLevel=logging.WARNING):
+    '''
+    Run a case in a new process
+    :return: dict with the results
+    '''
+
+    queue = multiprocessing.Queue()
+
+    process = multiprocessing.Process(target=_runCaseQueue, args=(queue, name, size, logLevel))
+    process.start()
+
+    result = queue.get()
+
+    process.join()
+
+    return result
+
+
+def _getCommit():
+
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.STDOUT).strip()
+
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compareResults(oldResults, newResults, keyList=('wallTime', 'peakRssKb', 'requests')):
+    '''
+    Compare two benchmark results
+    :return: text table with the old value, new value and ratio new / old of each case and size
+    '''
+
+    oldDict = dict(((result['case'], result['size']), result) for result in oldResults['results'])
+
+    lines = ['%-12s %8s %-12s %12s %12s %8s' % ('case', 'size', 'metric', 'old', 'new', 'ratio')]
+
+    for result in newResults['results']:
+
+        old = oldDict.get((result['case'], result['size']))
+
+        if old is None:
+            continue
+
+        for key in keyList:
+
+            if not old.get(key) or result.get(key) is None:
+                continue
+
+            lines.append('%-12s %8d %-12s %12.3f %12.3f %8.2f' % (result['case'], result['size'], key, old[key],
+                                                                  result[key], float(result[key]) / old[key]))
+
+    return '\n'.join(lines)
+
+
+def main(argv):
+
+    args = getArgsParser().parse_args(argv[1:])
+
+    caseList = args.case or caseInfo.keys()
+    sizeList = [int(size) for size in args.sizes.split(',')]
+
+    results = {
+        'commit': _getCommit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'results': [],
+    }
+
+    for name in caseList:
+
+        for size in sizeList:
+
+            maxSize = caseInfo[name][3]
+
+            if maxSize is not None and size > maxSize and not args.all_sizes:
+                print '%-12s %8d skipped (size > %d, see --all-sizes)' % (name, size, maxSize)
+                continue
+
+            result = runCaseProcess(name, size, getattr(logging, args.log_level))
+
+            results['results'].append(result)
+
+            if 'error' in result:
+                print '%-12s %8d ERROR %s' % (name, size, result['error'])
+            else:
+                print '%-12s %8d %10.3f s %10s KB %8s requests' % (name, size, result['wallTime'],
+                                                                   result['peakRssKb'], result.get('requests', '-'))
+
+    if args.output:
+        with open(args.output, 'w') as filen:
+            json.dump(results, filen, indent=1)
+
+    if args.compare:
+        with open(args.compare, 'r') as filen:
+            print '\n' + compareResults(json.load(filen), results)
+
+
+def getArgsParser():
+    parser = argparse.ArgumentParser(description='Benchmark the QC client against synthetic ALM data.')
+    parser.add_argument('-c', '--case', action='append', choices=caseInfo.keys(),
+                        help="Case to run (can be repeated). Default: all.")
+    parser.add_argument('-s', '--sizes', default='200,1000,10000',
+                        help="Comma separated number of entities / test cases e.g. 1000,10000,100000,500000.")
+    parser.add_argument('--all-sizes', action='store_true',
+                        help="Also run the slowest cases (import, syncDefects) with sizes above their default limit.")
+    parser.add_argument('-o', '--output', help="Json file with the results.")
+    parser.add_argument('--compare', help="Json file with previous results to compare with.")
+    parser.add_argument('--log-level', default='WARNING', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help="Level of the QCRest logger while the cases run.")
+    return parser
+
+
+if __name__ == '__main__':
+    main(sys.argv)
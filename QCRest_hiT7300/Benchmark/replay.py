@@ -0,0 +1,133 @@
+'''
+    replay.py - Contains the ReplaySession class, a replacement of requests.Session that serves the QC requests
+    in-process from a FakeALMApp (no network, no sockets) so that only the client side cost is measured.
+
+    >>> session = ReplaySession(FakeALMApp(store))
+    >>> qc_con = hiT7300_QC('http://fake-alm', 'project', 'domain', session=session)
+    >>> session.getStats()
+'''
+
+__author__ = 'Rodolfo Andrade'
+
+import base64
+import threading
+import urllib
+import urlparse
+
+import logging
+
+# Get logger
+logger = logging.getLogger('QCRest')
+
+
+class ReplayResponse(object):
+    '''
+    Minimal requests.Response used by the QC classes
+    '''
+
+    def __init__(self, url, status_code, content, headers):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+
+    @property
+    def text(self):
+        return self.content
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def __repr__(self):
+        return '<Response [%d]>' % self.status_code
+
+
+class ReplaySession(object):
+    '''
+    Session that sends the requests to an app with a handle(method, url, headerDict, content) method
+    (see QCRest.fakealm.FakeALMApp) and keeps the request counters
+    '''
+
+    def __init__(self, app):
+        '''
+        :param app: app that handles the requests
+        :return:
+        '''
+
+        self.app = app
+
+        # Cookie name -> value (set by the app on login)
+        self.cookies = {}
+
+        self._lock = threading.Lock()
+
+        self._stats = {}
+
+    def resetStats(self):
+
+        with self._lock:
+            self._stats = {}
+
+    def getStats(self):
+        '''
+        Request counters
+        :return: {'requests': n, 'GET': n, ..., 'bytesSent': n, 'bytesReceived': n}
+        '''
+
+        with self._lock:
+            stats = {'requests': 0, 'bytesSent': 0, 'bytesReceived': 0}
+            stats.update(self._stats)
+
+        return stats
+
+    def request(self, method, url, data=None, headers=None, auth=None, params=None, **kwargs):
+
+        urlSplit = urlparse.urlsplit(url)
+
+        path = urlSplit.path
+        if urlSplit.query:
+            path += '?' + urlSplit.query
+
+        if params:
+            path += ('&' if '?' in path else '?') + urllib.urlencode(params)
+
+        headerDict = dict((key.lower(), value) for key, value in (headers or {}).iteritems())
+
+        # HTTPBasicAuth
+        if auth is not None:
+            headerDict['authorization'] = 'Basic ' + base64.b64encode('%s:%s' % (auth.username, auth.password))
+
+        with self._lock:
+            if self.cookies:
+                headerDict['cookie'] = '; '.join(['%s=%s' % cookie for cookie in self.cookies.iteritems()])
+
+        content = data or ''
+
+        status, body, responseHeaders = self.app.handle(method, path, headerDict, content)
+
+        with self._lock:
+
+            cookie = responseHeaders.get('Set-Cookie')
+            if cookie:
+                key, _, value = cookie.split(';')[0].partition('=')
+                self.cookies[key] = value
+
+            self._stats['requests'] = self._stats.get('requests', 0) + 1
+            self._stats[method] = self._stats.get(method, 0) + 1
+            self._stats['bytesSent'] = self._stats.get('bytesSent', 0) + len(content)
+            self._stats['bytesReceived'] = self._stats.get('bytesReceived', 0) + len(body)
+
+        return ReplayResponse(url, status, body, responseHeaders)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
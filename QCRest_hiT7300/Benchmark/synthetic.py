@@ -0,0 +1,131 @@
+'''
+    synthetic.py - Generators of synthetic ALM entities and sxml files used by the benchmarks
+'''
+
+__author__ = 'Rodolfo Andrade'
+
+from xml.sax.saxutils import escape
+
+
+def fillStore(store, entity, count, parentId='2', fieldCount=8, prefix=None):
+    '''
+    Add synthetic entities to a FakeALMStore
+    :param store: FakeALMStore
+    :param entity: entity type e.g. 'test'
+    :param count: number of entities
+    :param parentId: parent-id of all entities
+    :param fieldCount: number of user fields (user-01, user-02, ...)
+    :param prefix: entity name prefix (default entity type)
+    :return: list of ids
+    '''
+
+    prefix = prefix or entity
+
+    idList = []
+
+    for idx in xrange(count):
+
+        fieldDict = {'name': '%s_%07d' % (prefix, idx), 'parent-id': parentId, 'status': 'Passed'}
+
+        for field in xrange(1, fieldCount + 1):
+            fieldDict['user-%02d' % field] = 'value %d of %s %d' % (field, entity, idx)
+
+        idList.append(store.addEntity(entity, fieldDict)['id'])
+
+    return idList
+
+
+def _getTagXml(tag, attribs, value):
+
+    if type(value) is list:
+        value = ''.join(['<value>%s</value>' % escape(val) for val in value])
+    else:
+        value = escape(value)
+
+    return '<%s %s>%s</%s>' % (tag, ' '.join(['%s="%s"' % attrib for attrib in attribs]), value, tag)
+
+
+def getSyntheticSxml(testCount, testsPerSet=100, stepsPerTest=3, folder='Benchmark'):
+    '''
+    Generate a sxml file with testCount test cases, each with a run
+    :param testCount: number of test cases
+    :param testsPerSet: number of test cases in each test set
+    :param stepsPerTest: number of design / run steps of each test
+    :param folder: test plan and test lab folder
+    :return: sxml string
+    '''
+
+    lines = ['<report>', '<test_sets>']
+
+    for setIdx, start in enumerate(xrange(0, testCount, testsPerSet)):
+
+        lines.append('<test_set path="Root\\%s\\Folder_%04d">' % (folder, setIdx / 10))
+        lines.append(_getTagXml('test_set_name', [('tl_name', 'name')], 'TestSet_%05d' % setIdx))
+        lines.append(_getTagXml('test_set_release', [('tl_name', 'user-01')], '5.50 00'))
+        lines.append('<test_cases>')
+
+        for testIdx in xrange(start, min(testCount, start + testsPerSet)):
+
+            lines.append('<test_case path="Subject\\%s\\Folder_%04d">' % (folder, testIdx / 1000))
+            lines.append(_getTagXml('test_case_name', [('tp_name', 'name')], 'Test_%07d' % testIdx))
+            lines.append(_getTagXml('test_case_automation_level', [('tp_name', 'user-12')], 'Fully automated'))
+            lines.append(_getTagXml('test_case_products_concerned', [('tp_name', 'user-19')], ['SON', 'OLR']))
+            lines.append(_getTagXml('test_case_release', [('tl_name', 'user-02')], '5.50 00'))
+            lines.append(_getTagXml('test_case_responsible_tester', [('tl_name', 'owner')], 'benchmark'))
+
+            lines.append('<test_case_steps>')
+
+            for stepIdx in xrange(stepsPerTest):
+                lines.append('<test_case_step>')
+                lines.append(_getTagXml('step_name', [('tp_name', 'name'), ('tl_name', 'name')],
+                                        'Step %d' % (stepIdx + 1)))
+                lines.append(_getTagXml('step_description', [('tp_name', 'description'), ('tl_name', 'description')],
+                                        'Description of step %d' % (stepIdx + 1)))
+                lines.append(_getTagXml('step_expected', [('tp_name', 'expected'), ('tl_name', 'expected')],
+                                        'Expected result of step %d' % (stepIdx + 1)))
+                lines.append(_getTagXml('step_status', [('tl_name', 'status')], 'Passed'))
+                lines.append('</test_case_step>')
+
+            lines.append('</test_case_steps>')
+
+            lines.append('<test_case_run>')
+            lines.append(_getTagXml('test_case_run_name', [('tl_name', 'name')], 'Run %07d' % testIdx))
+            lines.append(_getTagXml('test_case_run_status', [('tl_name', 'status')], 'Passed'))
+            lines.append(_getTagXml('test_case_run_tester', [('tl_name', 'owner')], 'benchmark'))
+            lines.append('</test_case_run>')
+
+            lines.append('</test_case>')
+
+        lines.append('</test_cases>')
+        lines.append('</test_set>')
+
+    lines.append('</test_sets>')
+    lines.append('</report>')
+
+    return '\n'.join(lines)
+
+
+def getSyntheticDefectFieldDataList(count, jiraKey, existingCount=0):
+    '''
+    Generate the fieldDataList used by hiT7300_QC.syncDefects - the first existingCount defects match the ones added
+    by fillStore(store, 'defect', existingCount)
+    :param count: number of defects
+    :param jiraKey: QC field with the Jira key
+    :param existingCount: number of defects that already exist in QC
+    :return: list of dicts
+    '''
+
+    fieldDataList = []
+
+    for idx in xrange(count):
+
+        fieldDataList.append({
+            'name': 'defect_%07d' % idx,
+            jiraKey: 'JIRA-%d' % idx,
+            'status': 'Open',
+            'description': 'Synthetic defect %d' % idx,
+            'attachmentUrl': {'fileName': 'defect_%07d.txt' % idx, 'description': 'Jira issue',
+                              'data': 'Synthetic attachment of defect %d' % idx, 'create': idx >= existingCount},
+        })
+
+    return fieldDataList
@@ -1,6 +1,27 @@
 # Import main class to handle QC
 from qc import QC
 
+# Import checkpoint journal used to resume interrupted jobs
+from journal import QCJournal
+
+# Import plan used in dry runs
+from plan import QCPlan
+
+# Import metrics of the phases of the imports
+from metrics import QCMetrics
+
+# Import fake ALM server used to run offline
+from fakealm import FakeALMServer, FakeALMStore, FakeALMApp
+
+# Import cassette used to record / replay the requests
+from cassette import Cassette, CassetteSession, openCassette
+
+# Import profiler used by the --profile option of the scripts
+from profiler import QCProfiler, profileMain, addProfileArguments
+
+# Import Prometheus exporter used by the long running syncs
+from exporter import MetricsExporter
+
 # Import main Exception Classes for QC
 from qc import QCError
 from connect import ConnectionError
\ No newline at end of file
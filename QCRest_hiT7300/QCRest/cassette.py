@@ -0,0 +1,335 @@
+'''
+    cassette.py - Contains the Cassette and CassetteSession classes used to record the requests done by Connect (QC)
+    and to replay them later without network, e.g. to profile a slow sync offline and deterministically.
+
+    CassetteSession replaces the requests session passed to Connect / QC (all QC entities share it):
+
+    >>> cassette = Cassette('sync.cassette', 'record')
+    >>> qc_con = hiT7300_QC(server, project, domain, session=CassetteSession(cassette))
+    >>> ...
+    >>> cassette.save()
+
+    >>> cassette = Cassette('sync.cassette', 'replay', speed=None)
+    >>> qc_con = hiT7300_QC(server, project, domain, session=CassetteSession(cassette))
+
+    The cassette is a gzip json file. Credentials are never written: the auth parameter, Authorization and Cookie
+    headers and the response cookies are dropped, password like url parameters are masked and request bodies are
+    only kept as a sha1 (used to match the requests on replay). Urls are saved without server, so a cassette can be
+    replayed against any server name. Response bodies are saved once even if they are returned several times.
+'''
+
+__author__ = 'Rodolfo Andrade'
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import urlparse
+
+from connect import ConnectionError
+
+# Get logger
+logger = logging.getLogger('QCRest')
+
+# Url parameters masked in the cassette
+_secretParamRegex = re.compile(r'((?:^|[?&;])(?:[^=&]*pass(?:wd|word)?|[^=&]*token|apikey|j_password)=)[^&;]*',
+                               re.IGNORECASE)
+
+
+def sanitizeUrl(url):
+    '''
+    Remove server and credentials from an url
+    :param url: url
+    :return: path + query string with secrets masked
+    '''
+
+    urlSplit = urlparse.urlsplit(url)
+
+    path = urlSplit.path
+    if urlSplit.query:
+        path += '?' + urlSplit.query
+
+    return _secretParamRegex.sub(r'\1***', path)
+
+
+def _getBodyHash(data):
+
+    if data is None or data == '':
+        return None
+
+    if isinstance(data, unicode):
+        data = data.encode('utf-8')
+
+    elif not isinstance(data, str):
+        # e.g. dict of form fields
+        data = json.dumps(data, sort_keys=True)
+
+    return hashlib.sha1(data).hexdigest()
+
+
+def openCassette(recordFile=None, replayFile=None, speed=None):
+    '''
+    Open a cassette from the script options
+    :param recordFile: cassette file to record
+    :param replayFile: cassette file to replay
+    :param speed: replay speed (see Cassette)
+    :return: Cassette or None if no file is given
+    '''
+
+    if recordFile and replayFile:
+        raise ValueError('Cassette: Record and replay cannot be used at the same time')
+
+    if recordFile:
+        return Cassette(recordFile, 'record')
+
+    if replayFile:
+        return Cassette(replayFile, 'replay', speed)
+
+    return None
+
+
+class CassetteResponse(object):
+    '''
+    Response replayed from a cassette - same attributes as requests.Response used by the QC classes
+    '''
+
+    def __init__(self, url, status_code, content, headers):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+
+    @property
+    def text(self):
+        return self.content
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def __repr__(self):
+        return '<Response [%d]>' % self.status_code
+
+
+class Cassette(object):
+    '''
+    Recorded requests / responses
+    '''
+
+    modeList = ['record', 'replay']
+
+    def __init__(self, fileName, mode='replay', speed=None, matchBody=True):
+        '''
+        :param fileName: cassette file
+        :param mode: 'record' or 'replay'
+        :param speed: replay only - None replays without delays (infinite bandwidth), 1.0 waits the recorded time
+                      of each request, 2.0 half of it, ...
+        :param matchBody: replay only - requests are matched by method, url and body (False ignores the body)
+        :return:
+        '''
+
+        if mode not in self.modeList:
+            raise ValueError('Cassette: Invalid mode \'%s\'' % mode)
+
+        self.fileName = fileName
+        self.mode = mode
+        self.speed = speed
+        self.matchBody = matchBody
+
+        self._lock = threading.Lock()
+
+        # List of interactions: {'method', 'url', 'body': sha1, 'status', 'contentType', 'response': index in
+        # _bodyList, 'elapsed': seconds}
+        self._interactionList = []
+
+        # Response bodies and body -> index
+        self._bodyList = []
+        self._bodyIndexDict = {}
+
+        # Replay: request key -> [list of interactions, next position]
+        self._replayDict = {}
+
+        if mode == 'replay':
+            self.load()
+
+    def load(self):
+        '''
+        Load cassette from file
+        :return:
+        '''
+
+        if not os.path.isfile(self.fileName):
+            raise ConnectionError('Cassette', 'Cassette %s does not exist!' % self.fileName)
+
+        with gzip.open(self.fileName, 'rb') as filen:
+            data = json.load(filen)
+
+        with self._lock:
+
+            self._bodyList = [body.encode('latin-1') for body in data['bodies']]
+            self._bodyIndexDict = dict((body, idx) for idx, body in enumerate(self._bodyList))
+            self._interactionList = data['interactions']
+
+            self._replayDict = {}
+
+            for interaction in self._interactionList:
+                key = self._getKey(interaction['method'], interaction['url'], interaction['body'])
+                self._replayDict.setdefault(key, [[], 0])[0].append(interaction)
+
+        logger.info('Cassette: Loaded %d interactions from %s' % (len(self._interactionList), self.fileName))
+
+    def save(self):
+        '''
+        Save cassette to file
+        :return:
+        '''
+
+        with self._lock:
+            data = {'version': 1, 'interactions': self._interactionList,
+                    'bodies': [body.decode('latin-1') for body in self._bodyList]}
+
+        # Write to temporary file first so an interruption does not corrupt the cassette
+        tmpFileName = self.fileName + '.tmp'
+
+        with gzip.open(tmpFileName, 'wb') as filen:
+            json.dump(data, filen, separators=(',', ':'))
+
+        if os.path.isfile(self.fileName):
+            os.remove(self.fileName)
+
+        os.rename(tmpFileName, self.fileName)
+
+        logger.info('Cassette: Saved %d interactions to %s' % (len(data['interactions']), self.fileName))
+
+    def getTotals(self):
+        '''
+        Number of interactions and recorded time
+        :return: {'requests': n, 'elapsed': seconds}
+        '''
+
+        with self._lock:
+            return {'requests': len(self._interactionList),
+                    'elapsed': sum([interaction['elapsed'] for interaction in self._interactionList])}
+
+    def _getKey(self, method, url, bodyHash):
+
+        if self.matchBody:
+            return method, url, bodyHash
+
+        return method, url
+
+    def record(self, method, url, data, response, elapsed):
+        '''
+        Add a request / response to the cassette
+        :param method: http method
+        :param url: request url
+        :param data: request body
+        :param response: requests.Response
+        :param elapsed: seconds the request took
+        :return:
+        '''
+
+        content = response.content or ''
+
+        with self._lock:
+
+            bodyIndex = self._bodyIndexDict.get(content)
+
+            if bodyIndex is None:
+                bodyIndex = len(self._bodyList)
+                self._bodyList.append(content)
+                self._bodyIndexDict[content] = bodyIndex
+
+            self._interactionList.append({
+                'method': method,
+                'url': sanitizeUrl(url),
+                'body': _getBodyHash(data),
+                'status': response.status_code,
+                'contentType': response.headers.get('Content-Type'),
+                'response': bodyIndex,
+                'elapsed': round(elapsed, 4),
+            })
+
+    def play(self, method, url, data):
+        '''
+        Get the recorded response of a request - the same request done several times gets the recorded responses in
+        order (the last one is repeated)
+        :param method: http method
+        :param url: request url
+        :param data: request body
+        :return: CassetteResponse
+        '''
+
+        key = self._getKey(method, sanitizeUrl(url), _getBodyHash(data))
+
+        with self._lock:
+
+            entry = self._replayDict.get(key)
+
+            if entry is None:
+                raise ConnectionError('Cassette', 'No recorded response for %s %s' % (method, sanitizeUrl(url)))
+
+            interactionList, position = entry
+
+            interaction = interactionList[min(position, len(interactionList) - 1)]
+
+            entry[1] = position + 1
+
+        if self.speed:
+            time.sleep(interaction['elapsed'] / self.speed)
+
+        headers = {}
+        if interaction['contentType']:
+            headers['Content-Type'] = interaction['contentType']
+
+        return CassetteResponse(url, interaction['status'], self._bodyList[interaction['response']], headers)
+
+
+class CassetteSession(object):
+    '''
+    Session that records the requests of a requests session to a cassette or replays them from it
+    '''
+
+    def __init__(self, cassette, session=None):
+        '''
+        :param cassette: Cassette
+        :param session: requests session used in record mode (a new one is created if not given)
+        :return:
+        '''
+
+        self.cassette = cassette
+
+        if session is None and cassette.mode == 'record':
+            import requests
+            session = requests.Session()
+
+        self.session = session
+
+    def request(self, method, url, **kwargs):
+
+        if self.cassette.mode == 'replay':
+            return self.cassette.play(method, url, kwargs.get('data'))
+
+        start_time = time.time()
+
+        r = self.session.request(method, url, **kwargs)
+
+        self.cassette.record(method, url, kwargs.get('data'), r, time.time() - start_time)
+
+        return r
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
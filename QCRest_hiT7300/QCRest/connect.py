@@ -10,6 +10,7 @@
 __author__ = 'Rodolfo Andrade'
 
 import sys
+import time
 
 import requests
 from requests.auth import HTTPBasicAuth
@@ -20,6 +21,10 @@ logger = logging.getLogger('QCRest')
 
 debug = False
 
+# Observers notified of every request done by any Connect (e.g. MetricsExporter) - objects with a method
+# observeRequest(connection, method, url, response, elapsed) - response is None if the request raised an exception
+requestObserverList = []
+
 # Class that abstracts some of the configurations needed to connect to rest API namely the login, logout and
 # other configurations such as the proxy
 class Connect(object):
@@ -52,6 +57,9 @@ class Connect(object):
         else:
             self.url_logout = url_logout
 
+        # Metrics the requests are added to (see QCMetrics) - None does not count them
+        self.metrics = None
+
     # Login function that uses HTTPBasicAuth
     def login(self, user=None, passwd=None, **kwargs):
 
@@ -108,31 +116,48 @@ class Connect(object):
     # Get a specific url
     def get(self, url, **kwargs):
 
-        req = self.session.get(url, proxies=self.proxies, **kwargs)
-
-        return req
+        return self._request('GET', self.session.get, url, **kwargs)
 
     # Post a specific url
     def post(self, url, **kwargs):
 
-        req = self.session.post(url, proxies=self.proxies, **kwargs)
-
-        return req
+        return self._request('POST', self.session.post, url, **kwargs)
 
     # Put a specific url
     def put(self, url, **kwargs):
 
-        req = self.session.put(url, proxies=self.proxies, **kwargs)
-
-        return req
+        return self._request('PUT', self.session.put, url, **kwargs)
 
     # Delete a specific url
     def delete(self, url, **kwargs):
 
-        req = self.session.delete(url, proxies=self.proxies, **kwargs)
+        return self._request('DELETE', self.session.delete, url, **kwargs)
+
+    # Do a request with a session function and add it to the metrics and observers
+    def _request(self, method, function, url, **kwargs):
+
+        start_time = time.time()
+
+        try:
+            req = function(url, proxies=self.proxies, **kwargs)
+
+        except Exception:
+            self._addRequestMetrics(method, url, kwargs, None, time.time() - start_time)
+            raise
+
+        self._addRequestMetrics(method, url, kwargs, req, time.time() - start_time)
 
         return req
 
+    # Add request to the metrics
+    def _addRequestMetrics(self, method, url, kwargs, response, elapsed):
+
+        if self.metrics is not None and response is not None:
+            self.metrics.addRequest(getattr(self, 'entity', None), method, url, kwargs.get('data'), response)
+
+        for observer in requestObserverList:
+            observer.observeRequest(self, method, url, response, elapsed)
+
     # Auxiliar function to print debug info
     @staticmethod
     def debuginfo(message, value):
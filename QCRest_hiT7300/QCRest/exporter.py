@@ -0,0 +1,369 @@
+'''
+    exporter.py - Contains the MetricsExporter class that keeps Prometheus / OpenMetrics metrics of long running jobs
+    (e.g. the scheduled Jira <-> QC syncs) and exports them in the Prometheus text format to a file (node exporter
+    textfile collector) and / or to a localhost port (http://127.0.0.1:<port>/metrics).
+
+    Once installed the exporter is notified of every request done by Connect (QC and all its entities):
+
+        qcrest_request_duration_seconds{entity, method}     histogram of the request latency
+        qcrest_requests_total{entity, method, code}         requests done
+        qcrest_request_errors_total{entity, method, code}   requests failed (http status >= 400 or exception)
+
+    Other metrics (entities synced, queue depths, cycle durations, ...) are fed by the sync engines with inc, set,
+    observe and setFunction.
+
+    >>> exporter = MetricsExporter(fileName='qc_jira_sync.prom')
+    >>> exporter.install()
+    >>> exporter.startHttpServer(9105)
+    >>> ...
+    >>> exporter.writeTextFile()
+'''
+
+__author__ = 'Rodolfo Andrade'
+
+import BaseHTTPServer
+import SocketServer
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import connect
+
+# Get logger
+logger = logging.getLogger('QCRest')
+
+# Content type of the Prometheus text format
+contentType = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Request latency buckets (seconds)
+defaultBuckets = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escapeLabelValue(value):
+
+    return unicode(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _getLabelText(labels, extraLabels=()):
+
+    labelList = list(labels) + list(extraLabels)
+
+    if not labelList:
+        return ''
+
+    return '{' + ','.join(['%s="%s"' % (key, _escapeLabelValue(value)) for key, value in labelList]) + '}'
+
+
+def _getValueText(value):
+
+    if value == float('inf'):
+        return '+Inf'
+
+    return repr(float(value))
+
+
+class MetricsExporter(object):
+    '''
+    Registry of counters, gauges and histograms exported in the Prometheus text format
+    '''
+
+    typeList = ['counter', 'gauge', 'histogram']
+
+    def __init__(self, fileName=None):
+        '''
+        :param fileName: default file written by writeTextFile (optional)
+        :return:
+        '''
+
+        self.fileName = fileName
+
+        # Name -> {'type': type, 'help': text, 'buckets': tuple, 'values': {labels: value}}
+        # Labels are a sorted tuple of (key, value). Histogram values are [bucket counts, sum, count]
+        self._metricDict = OrderedDict()
+
+        # Name -> {labels: function} - gauges read when exported (e.g. queue depths)
+        self._functionDict = {}
+
+        self._lock = threading.Lock()
+
+        self._httpd = None
+        self._thread = None
+
+        self.describe('qcrest_request_duration_seconds', 'histogram', 'Latency of the QC requests.')
+        self.describe('qcrest_requests_total', 'counter', 'QC requests done.')
+        self.describe('qcrest_request_errors_total', 'counter', 'QC requests failed (status >= 400 or exception).')
+
+    def describe(self, name, metricType, help, buckets=defaultBuckets):
+        '''
+        Declare a metric - metrics not declared are created as untyped gauges / counters when first used
+        :param name: metric name
+        :param metricType: 'counter', 'gauge' or 'histogram'
+        :param help: help text
+        :param buckets: histogram buckets (upper bounds)
+        :return:
+        '''
+
+        if metricType not in self.typeList:
+            raise ValueError('MetricsExporter: Invalid metric type \'%s\'' % metricType)
+
+        with self._lock:
+            if name not in self._metricDict:
+                self._metricDict[name] = {'type': metricType, 'help': help, 'buckets': tuple(sorted(buckets)),
+                                          'values': OrderedDict()}
+
+    def _getMetric(self, name, metricType):
+
+        if name not in self._metricDict:
+            self._metricDict[name] = {'type': metricType, 'help': name, 'buckets': defaultBuckets,
+                                      'values': OrderedDict()}
+
+        return self._metricDict[name]
+
+    def inc(self, name, value=1, **labels):
+        '''
+        Increment a counter
+        :param name: metric name
+        :param value: increment
+        :param labels: metric labels
+        :return:
+        '''
+
+        key = tuple(sorted(labels.iteritems()))
+
+        with self._lock:
+            values = self._getMetric(name, 'counter')['values']
+            values[key] = values.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        '''
+        Set a gauge
+        :param name: metric name
+        :param value: value
+        :param labels: metric labels
+        :return:
+        '''
+
+        key = tuple(sorted(labels.iteritems()))
+
+        with self._lock:
+            self._getMetric(name, 'gauge')['values'][key] = value
+
+    def setFunction(self, name, function, **labels):
+        '''
+        Set a gauge whose value is read from a function when the metrics are exported
+        :param name: metric name
+        :param function: function without arguments that returns the value
+        :param labels: metric labels
+        :return:
+        '''
+
+        key = tuple(sorted(labels.iteritems()))
+
+        with self._lock:
+            self._getMetric(name, 'gauge')
+            self._functionDict.setdefault(name, {})[key] = function
+
+    def observe(self, name, value, **labels):
+        '''
+        Add an observation to a histogram
+        :param name: metric name
+        :param value: observed value (e.g. seconds)
+        :param labels: metric labels
+        :return:
+        '''
+
+        key = tuple(sorted(labels.iteritems()))
+
+        with self._lock:
+            metric = self._getMetric(name, 'histogram')
+
+            data = metric['values'].get(key)
+
+            if data is None:
+                data = metric['values'][key] = [[0] * len(metric['buckets']), 0.0, 0]
+
+            for idx, bucket in enumerate(metric['buckets']):
+                if value <= bucket:
+                    data[0][idx] += 1
+
+            data[1] += value
+            data[2] += 1
+
+    def observeRequest(self, connection, method, url, response, elapsed):
+        '''
+        Connect request observer (see install)
+        :param connection: Connect that did the request
+        :param method: http method
+        :param url: request url
+        :param response: response or None if the request raised an exception
+        :param elapsed: seconds
+        :return:
+        '''
+
+        entity = getattr(connection, 'entity', None) or 'connection'
+
+        code = str(response.status_code) if response is not None else 'exception'
+
+        self.observe('qcrest_request_duration_seconds', elapsed, entity=entity, method=method)
+        self.inc('qcrest_requests_total', entity=entity, method=method, code=code)
+
+        if response is None or response.status_code >= 400:
+            self.inc('qcrest_request_errors_total', entity=entity, method=method, code=code)
+
+    def install(self):
+        '''
+        Observe all the requests done by Connect
+        :return:
+        '''
+
+        if self not in connect.requestObserverList:
+            connect.requestObserverList.append(self)
+
+    def uninstall(self):
+        '''
+        Stop observing the requests done by Connect
+        :return:
+        '''
+
+        if self in connect.requestObserverList:
+            connect.requestObserverList.remove(self)
+
+    def getText(self):
+        '''
+        Metrics in the Prometheus text format
+        :return: string
+        '''
+
+        # Functions are called without the lock - they can take some time
+        with self._lock:
+            functionList = [(name, key, function) for name, functionDict in self._functionDict.iteritems()
+                            for key, function in functionDict.iteritems()]
+
+        functionValueList = []
+
+        for name, key, function in functionList:
+            try:
+                functionValueList.append((name, key, function()))
+
+            except Exception as e:
+                logger.warning('MetricsExporter: Could not get \'%s\': %s' % (name, e))
+
+        lines = []
+
+        with self._lock:
+
+            for name, key, value in functionValueList:
+                self._metricDict[name]['values'][key] = value
+
+            for name, metric in self._metricDict.iteritems():
+
+                if not metric['values']:
+                    continue
+
+                lines.append('# HELP %s %s' % (name, metric['help']))
+                lines.append('# TYPE %s %s' % (name, metric['type']))
+
+                for key, value in metric['values'].iteritems():
+
+                    if metric['type'] != 'histogram':
+                        lines.append('%s%s %s' % (name, _getLabelText(key), _getValueText(value)))
+                        continue
+
+                    bucketCounts, total, count = value
+
+                    for bucket, bucketCount in zip(metric['buckets'], bucketCounts):
+                        lines.append('%s_bucket%s %d' % (name, _getLabelText(key, [('le', _getValueText(bucket))]),
+                                                         bucketCount))
+
+                    lines.append('%s_bucket%s %d' % (name, _getLabelText(key, [('le', '+Inf')]), count))
+                    lines.append('%s_sum%s %s' % (name, _getLabelText(key), _getValueText(total)))
+                    lines.append('%s_count%s %d' % (name, _getLabelText(key), count))
+
+        return '\n'.join(lines) + '\n'
+
+    def writeTextFile(self, fileName=None):
+        '''
+        Write the metrics to a file - written to a temporary file first so that the collector never reads a
+        partial file
+        :param fileName: file name (default: fileName given in the constructor)
+        :return:
+        '''
+
+        fileName = fileName or self.fileName
+
+        if not fileName:
+            raise ValueError('MetricsExporter: No file name')
+
+        tmpFileName = fileName + '.tmp'
+
+        with open(tmpFileName, 'w') as filen:
+            filen.write(self.getText().encode('utf-8'))
+
+        if os.path.isfile(fileName):
+            os.remove(fileName)
+
+        os.rename(tmpFileName, fileName)
+
+    def startHttpServer(self, port, host='127.0.0.1'):
+        '''
+        Serve the metrics in a background thread on http://host:port/metrics
+        :param port: port to bind (0 for any free port)
+        :param host: host to bind
+        :return: metrics url
+        '''
+
+        self._httpd = _ThreadingHTTPServer((host, port), _MetricsHandler)
+        self._httpd.exporter = self
+
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='MetricsExporter')
+        self._thread.daemon = True
+        self._thread.start()
+
+        url = 'http://%s:%d/metrics' % self._httpd.server_address[:2]
+
+        logger.info('MetricsExporter: Serving on %s' % url)
+
+        return url
+
+    def stopHttpServer(self):
+        '''
+        Stop serving the metrics
+        :return:
+        '''
+
+        if self._httpd is None:
+            return
+
+        self._httpd.shutdown()
+        self._thread.join()
+        self._httpd.server_close()
+
+        self._httpd = None
+        self._thread = None
+
+
+class _MetricsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        logger.debug('MetricsExporter: ' + format % args)
+
+    def do_GET(self):
+
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+
+        body = self.server.exporter.getText().encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', contentType)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _ThreadingHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
@@ -0,0 +1,986 @@
+'''
+    fakealm.py - Contains a local fake ALM (Quality Center) REST server backed by an in-memory store. It can be used to
+    run the QC imports and sync processes offline (e.g. to test or to benchmark them).
+
+    Supported end points (same urls as the QC classes use):
+        - /qcbin/authentication-point/authenticate and /logout (basic auth)
+        - /qcbin/rest/is-authenticated and /qcbin/rest/site-session (POST, GET and DELETE)
+        - /qcbin/rest/domains/{domain}/projects/{project}/{entity}s with query, page-size, start-index and fields
+        - POST / PUT of single entities and of collections, DELETE of ids-to-delete and of single entities
+        - {entity}s/{id}/attachments (octet-stream and multipart)
+        - runs/{id}/run-steps - run steps are created from the test design steps when a run is created
+        - customization/entities/{entity}/fields|lists|relations and customization/used-lists
+
+    The query support is the subset used by the QC classes: field[value or value ...]; field[...] with quoted or
+    unquoted values, 'not', comparison operators (>, <, >=, <=, <>) and '*' wildcards. String comparisons are case
+    insensitive as in ALM. Cross entity fields (e.g. 'test.id') are not supported and match nothing.
+
+    The requests are handled by FakeALMApp, which can also be called in-process without the http server (see
+    Benchmark.ReplaySession).
+
+    >>> server = FakeALMServer(port=8090, latency=0.05)
+    >>> server.start()
+    >>> qc_con = hiT7300_QC(server.url, 'project', 'domain')
+    >>> server.stop()
+'''
+
+__author__ = 'Rodolfo Andrade'
+
+import BaseHTTPServer
+import SocketServer
+import base64
+import fnmatch
+import itertools
+import logging
+import re
+import socket
+import threading
+import time
+import urllib
+import uuid
+from collections import OrderedDict
+
+import xml.etree.ElementTree as ET
+
+# Get logger
+logger = logging.getLogger('QCRest')
+
+# Required fields of each entity (customization/entities/{entity}/fields?required=true)
+defaultRequiredFieldDict = {
+    'test-folder': ['name', 'parent-id'],
+    'test': ['name', 'parent-id', 'subtype-id'],
+    'design-step': ['name', 'parent-id'],
+    'test-set-folder': ['name', 'parent-id'],
+    'test-set': ['name', 'parent-id', 'subtype-id'],
+    'test-instance': ['cycle-id', 'test-id', 'test-order', 'subtype-id'],
+    'run': ['name', 'test-id', 'testcycl-id', 'cycle-id', 'owner', 'subtype-id', 'status'],
+    'run-step': ['name', 'parent-id'],
+    'requirement': ['name', 'parent-id', 'type-id'],
+    'defect': ['name', 'detected-by', 'creation-time', 'severity'],
+}
+
+# Cookie set on login
+sessionCookie = 'LWSSO_COOKIE_KEY'
+
+
+class FakeALMStore(object):
+    '''
+    In-memory store of the fake ALM server: entity -> id -> OrderedDict field -> value (string or list of strings)
+    '''
+
+    def __init__(self, requiredFieldDict=None, listDict=None, relationDict=None):
+        '''
+        :param requiredFieldDict: entity -> list of required fields (default defaultRequiredFieldDict)
+        :param listDict: list name -> list of values (customization lists)
+        :param relationDict: entity -> list of related entities (customization relations)
+        :return:
+        '''
+
+        self.requiredFieldDict = requiredFieldDict or dict(defaultRequiredFieldDict)
+        self.listDict = listDict or {}
+        self.relationDict = relationDict or {}
+
+        self._lock = threading.RLock()
+
+        # Entity -> OrderedDict id -> fields
+        self.entityDict = {}
+
+        # (entity, id) -> list of attachments (fields + 'data')
+        self.attachmentDict = {}
+
+        self._nextId = itertools.count(1001)
+
+        # Incremented on every change of the entities
+        self.version = 0
+
+        # Test plan root folder - test lab root folder has id 0 and is not an entity
+        self.addEntity('test-folder', {'id': '2', 'name': 'Subject', 'parent-id': '0'})
+
+    def getEntityList(self, entity):
+        '''
+        Get all entities of a type
+        :param entity: entity type
+        :return: list of field dicts
+        '''
+
+        with self._lock:
+            return list(self.entityDict.get(entity, {}).values())
+
+    def getEntity(self, entity, entityId):
+        '''
+        Get an entity by id
+        :param entity: entity type
+        :param entityId: id
+        :return: field dict or None
+        '''
+
+        with self._lock:
+            return self.entityDict.get(entity, {}).get(str(entityId))
+
+    def addEntity(self, entity, fieldDict):
+        '''
+        Add an entity - a new id is generated if not given
+        :param entity: entity type
+        :param fieldDict: fields
+        :return: field dict of the created entity
+        '''
+
+        with self._lock:
+
+            fields = OrderedDict([('id', str(fieldDict.get('id') or self._nextId.next()))])
+            fields.update((field, value) for field, value in fieldDict.iteritems() if field != 'id')
+
+            self.entityDict.setdefault(entity, OrderedDict())[fields['id']] = fields
+            self.version += 1
+
+            # ALM creates the run steps of a new run from the design steps of the test
+            if entity == 'run' and fields.get('test-id'):
+
+                designStepList = [step for step in self.getEntityList('design-step')
+                                  if step.get('parent-id') == fields['test-id']]
+
+                for step in designStepList:
+                    self.addEntity('run-step', OrderedDict([('name', step.get('name')),
+                                                            ('parent-id', fields['id']),
+                                                            ('desc-id', step['id']),
+                                                            ('status', 'No Run')]))
+
+            return fields
+
+    def updateEntity(self, entity, entityId, fieldDict):
+        '''
+        Update fields of an entity
+        :param entity: entity type
+        :param entityId: id
+        :param fieldDict: fields
+        :return: field dict of the updated entity or None if it does not exist
+        '''
+
+        with self._lock:
+
+            fields = self.getEntity(entity, entityId)
+
+            if fields is not None:
+                fields.update((field, value) for field, value in fieldDict.iteritems() if field != 'id')
+                self.version += 1
+
+            return fields
+
+    def deleteEntity(self, entity, entityId):
+        '''
+        Delete an entity and its attachments
+        :param entity: entity type
+        :param entityId: id
+        :return: field dict of the deleted entity or None if it does not exist
+        '''
+
+        with self._lock:
+
+            self.attachmentDict.pop((entity, str(entityId)), None)
+            self.version += 1
+
+            return self.entityDict.get(entity, {}).pop(str(entityId), None)
+
+    def addAttachment(self, entity, entityId, fileName, description, data):
+        '''
+        Add an attachment to an entity - an attachment with the same name is overwritten
+        :return: field dict of the attachment
+        '''
+
+        with self._lock:
+
+            attachmentList = self.attachmentDict.setdefault((entity, str(entityId)), [])
+
+            attachmentList[:] = [attachment for attachment in attachmentList if attachment['name'] != fileName]
+
+            attachment = OrderedDict([('id', str(self._nextId.next())), ('name', fileName),
+                                      ('description', description), ('parent-id', str(entityId)),
+                                      ('parent-type', entity), ('file-size', str(len(data))), ('data', data)])
+
+            attachmentList.append(attachment)
+
+            return attachment
+
+    def getAttachmentList(self, entity, entityId):
+
+        with self._lock:
+            return list(self.attachmentDict.get((entity, str(entityId)), []))
+
+    def getFieldList(self, entity):
+        '''
+        Get all fields of an entity - required fields and the fields used by the entities in the store
+        :param entity: entity type
+        :return: list of field names
+        '''
+
+        fieldList = ['id'] + [field for field in self.requiredFieldDict.get(entity, []) if field != 'id']
+
+        for fields in self.getEntityList(entity):
+            fieldList += [field for field in fields if field not in fieldList]
+
+        return fieldList
+
+
+def _splitTopLevel(expr, separator):
+    '''
+    Split expression by separator ignoring separators inside quotes and brackets
+    '''
+
+    partList = []
+    part = ''
+    quote = None
+    depth = 0
+    idx = 0
+
+    while idx < len(expr):
+
+        char = expr[idx]
+
+        if quote:
+            if char == quote:
+                quote = None
+
+        elif char in '"\'':
+            quote = char
+
+        elif char == '[':
+            depth += 1
+
+        elif char == ']':
+            depth -= 1
+
+        elif depth == 0 and expr[idx:idx + len(separator)].lower() == separator:
+            partList.append(part)
+            part = ''
+            idx += len(separator)
+            continue
+
+        part += char
+        idx += 1
+
+    partList.append(part)
+
+    return partList
+
+
+def _matchTerm(term, value):
+    '''
+    Check if a field value matches a single query term e.g. '"name"', 'not "a*"', '>= 10'
+    '''
+
+    term = term.strip()
+
+    negate = False
+    if term.lower().startswith('not '):
+        negate = True
+        term = term[4:].strip()
+
+    operator = '='
+    for op in ['>=', '<=', '<>', '>', '<', '=']:
+        if term.startswith(op):
+            operator = op
+            term = term[len(op):].strip()
+            break
+
+    if len(term) > 1 and term[0] == term[-1] and term[0] in '"\'':
+        term = term[1:-1]
+
+    valueList = value if type(value) is list else [value or '']
+
+    match = False
+    for val in valueList:
+
+        val = val or ''
+
+        if operator in ['=', '<>']:
+            if '*' in term:
+                result = fnmatch.fnmatchcase(val.lower(), term.lower())
+            else:
+                result = val.lower() == term.lower()
+
+            if operator == '<>':
+                result = not result
+
+        else:
+            try:
+                left, right = float(val), float(term)
+            except ValueError:
+                left, right = val.lower(), term.lower()
+
+            result = {'>': left > right, '<': left < right, '>=': left >= right, '<=': left <= right}[operator]
+
+        if result:
+            match = True
+            break
+
+    return match != negate
+
+
+def parseQuery(query):
+    '''
+    Parse an ALM query e.g. {name["a" or "b"];parent-id[2]}
+    :param query: query string (with or without brackets)
+    :return: list of (field, list of terms joined by or, joined by and)
+    '''
+
+    query = query.strip()
+
+    if query.startswith('{') and query.endswith('}'):
+        query = query[1:-1]
+
+    conditionList = []
+
+    for condition in _splitTopLevel(query, ';'):
+
+        condition = condition.strip()
+
+        if condition == '':
+            continue
+
+        result = re.match(r'^([^\[]+)\[(.*)\]$', condition, re.DOTALL)
+
+        if result is None:
+            raise ValueError('Invalid query condition: %s' % condition)
+
+        # Or has lower precedence than and
+        termList = [_splitTopLevel(orTerm, ' and ') for orTerm in _splitTopLevel(result.group(2), ' or ')]
+
+        conditionList.append((result.group(1).strip(), termList))
+
+    return conditionList
+
+
+def matchQuery(conditionList, fields):
+    '''
+    Check if entity fields match a parsed query
+    :param conditionList: see parseQuery
+    :param fields: entity fields
+    :return: True if match
+    '''
+
+    for field, termList in conditionList:
+
+        # Cross entity fields are not supported
+        if '.' in field:
+            return False
+
+        value = fields.get(field)
+
+        if not any([all([_matchTerm(term, value) for term in andList]) for andList in termList]):
+            return False
+
+    return True
+
+
+def getEntityXml(entity, fields, fieldFilter=None):
+    '''
+    Get entity xml element
+    :param entity: entity type
+    :param fields: entity fields
+    :param fieldFilter: list of fields to be returned (None for all)
+    :return: Element
+    '''
+
+    entityElem = ET.Element('Entity', {'Type': entity})
+    fieldsElem = ET.SubElement(entityElem, 'Fields')
+
+    for field, value in fields.iteritems():
+
+        if field == 'data' or fieldFilter is not None and field not in fieldFilter:
+            continue
+
+        fieldElem = ET.SubElement(fieldsElem, 'Field', {'Name': field})
+
+        for val in value if type(value) is list else [value]:
+            ET.SubElement(fieldElem, 'Value').text = val
+
+    ET.SubElement(entityElem, 'RelatedEntities')
+
+    return entityElem
+
+
+def parseEntityXml(content):
+    '''
+    Get list of (entity, fields) from an entity or entity collection xml
+    '''
+
+    root = ET.fromstring(content)
+
+    entityElemList = [root] if root.tag == 'Entity' else root.findall('Entity')
+
+    entityList = []
+
+    for entityElem in entityElemList:
+
+        fields = OrderedDict()
+
+        for fieldElem in entityElem.findall('./Fields/Field'):
+
+            valueList = [valueElem.text or '' for valueElem in fieldElem.findall('Value')]
+
+            if len(valueList) == 0:
+                fields[fieldElem.get('Name')] = ''
+            elif len(valueList) == 1:
+                fields[fieldElem.get('Name')] = valueList[0]
+            else:
+                fields[fieldElem.get('Name')] = valueList
+
+        entityList.append((entityElem.get('Type'), fields))
+
+    return entityList
+
+
+class FakeALMApp(object):
+    '''
+    Request handling of the fake ALM server - independent of the transport so that it can also be called in-process
+    (see handle)
+    '''
+
+    # Project url e.g. /qcbin/rest/domains/DOMAIN/projects/PROJECT/tests/1/attachments
+    projectUrlRegex = re.compile(r'^/qcbin/rest/domains/[^/]+/projects/[^/]+/(.*)$')
+
+    def __init__(self, store=None, latency=0.0, users=None, requireLogin=True, pageSize=100):
+        '''
+        :param store: FakeALMStore (a new one is created if not given)
+        :param latency: seconds added to each request
+        :param users: dict user -> password accepted on login (None accepts any user)
+        :param requireLogin: if True requests without a login session are refused (401)
+        :param pageSize: page size used when the request does not define one
+        :return:
+        '''
+
+        self.store = store or FakeALMStore()
+        self.latency = latency
+        self.users = users
+        self.requireLogin = requireLogin
+        self.pageSize = pageSize
+
+        self._sessionSet = set()
+
+        self._statsLock = threading.Lock()
+        self._requestCount = 0
+        self._methodCount = {}
+
+        # Last filtered entity list - consecutive pages of the same query are not filtered again
+        self._filterCache = (None, None)
+
+    def getStats(self):
+        '''
+        Number of requests served
+        :return: {'requests': n, 'GET': n, 'POST': n, ...}
+        '''
+
+        with self._statsLock:
+            stats = dict(self._methodCount)
+            stats['requests'] = self._requestCount
+
+        return stats
+
+    def handle(self, method, url, headerDict, content=''):
+        '''
+        Handle a request
+        :param method: 'GET', 'POST', 'PUT' or 'DELETE'
+        :param url: url path with query string e.g. /qcbin/rest/is-authenticated
+        :param headerDict: request headers - keys in lower case
+        :param content: request body
+        :return: (status code, body, dict with response headers)
+        '''
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self._statsLock:
+            self._requestCount += 1
+            self._methodCount[method] = self._methodCount.get(method, 0) + 1
+
+        path, _, queryString = url.partition('?')
+
+        # Do not use urlparse.parse_qs - ';' is part of the ALM queries
+        paramDict = {}
+        for param in queryString.split('&'):
+            if param:
+                key, _, value = param.partition('=')
+                paramDict[urllib.unquote(key)] = urllib.unquote(value)
+
+        try:
+            return self._dispatch(method, urllib.unquote(path), paramDict, headerDict, content)
+
+        except (ValueError, SyntaxError, ET.ParseError) as e:
+            return 400, '<QCRestException><Title>%s</Title></QCRestException>' % e, {}
+
+    @staticmethod
+    def _getSessionId(headerDict):
+
+        for cookie in headerDict.get('cookie', '').split(';'):
+            key, _, value = cookie.strip().partition('=')
+            if key == sessionCookie:
+                return value
+
+        return None
+
+    def _dispatch(self, method, path, paramDict, headerDict, content):
+
+        if path == '/qcbin/authentication-point/authenticate':
+            return self._authenticate(headerDict)
+
+        if path == '/qcbin/authentication-point/logout':
+            self._sessionSet.discard(self._getSessionId(headerDict))
+            return 200, '', {}
+
+        if self.requireLogin and self._getSessionId(headerDict) not in self._sessionSet:
+            return 401, '', {}
+
+        if path == '/qcbin/rest/is-authenticated':
+            return 200, '<AuthenticationInfo><Username>fake</Username></AuthenticationInfo>', {}
+
+        if path == '/qcbin/rest/site-session':
+            headers = {}
+            if method == 'POST':
+                headers['Set-Cookie'] = 'QCSession=%s; Path=/' % uuid.uuid4().hex
+            return 200, '', headers
+
+        result = self.projectUrlRegex.match(path)
+
+        if result is None:
+            return 404, '', {}
+
+        partList = result.group(1).strip('/').split('/')
+
+        if partList[0] == 'customization':
+            return self._customization(partList[1:], paramDict)
+
+        # Run steps are under the run e.g. runs/1/run-steps
+        if len(partList) >= 3 and partList[0] == 'runs' and partList[2] == 'run-steps':
+            return self._entity(method, 'run-step', partList[3:], paramDict, headerDict, content,
+                                {'parent-id': partList[1]})
+
+        return self._entity(method, partList[0][:-1], partList[1:], paramDict, headerDict, content, {})
+
+    def _authenticate(self, headerDict):
+
+        authorization = headerDict.get('authorization', '')
+
+        if not authorization.startswith('Basic '):
+            return 401, '', {}
+
+        user, _, passwd = base64.b64decode(authorization[6:]).partition(':')
+
+        if self.users is not None and self.users.get(user) != passwd:
+            return 401, '', {}
+
+        sessionId = uuid.uuid4().hex
+        self._sessionSet.add(sessionId)
+
+        return 200, '', {'Set-Cookie': '%s=%s; Path=/' % (sessionCookie, sessionId)}
+
+    def _entity(self, method, entity, partList, paramDict, headerDict, content, parentDict):
+
+        store = self.store
+
+        entityId = partList[0] if len(partList) > 0 else None
+
+        if len(partList) > 1:
+
+            if partList[1] != 'attachments' or store.getEntity(entity, entityId) is None:
+                return 404, '', {}
+
+            return self._attachment(method, entity, entityId, headerDict, content)
+
+        if method == 'GET':
+
+            if entityId is not None:
+                fields = store.getEntity(entity, entityId)
+
+                if fields is None:
+                    return 404, '', {}
+
+                return 200, ET.tostring(getEntityXml(entity, fields)), {}
+
+            return 200, self._getEntityCollection(entity, paramDict, parentDict), {}
+
+        if method == 'POST':
+
+            entityList = parseEntityXml(content)
+
+            root = ET.Element('Entities')
+            for entityType, fields in entityList:
+
+                # Ids are always generated by the server
+                fields.pop('id', None)
+                fields.update(parentDict)
+
+                root.append(getEntityXml(entity, store.addEntity(entity, fields)))
+
+            if len(entityList) == 1 and 'type=collection' not in headerDict.get('content-type', ''):
+                return 201, ET.tostring(root[0]), {}
+
+            root.set('TotalResults', str(len(root)))
+
+            return 201, ET.tostring(root), {}
+
+        if method == 'PUT':
+
+            entityList = parseEntityXml(content)
+
+            root = ET.Element('Entities')
+            for entityType, fields in entityList:
+
+                fields = store.updateEntity(entity, entityId or fields.get('id'), fields)
+
+                if fields is None:
+                    return 404, '', {}
+
+                root.append(getEntityXml(entity, fields))
+
+            if entityId is not None:
+                return 200, ET.tostring(root[0]), {}
+
+            root.set('TotalResults', str(len(root)))
+
+            return 200, ET.tostring(root), {}
+
+        if method == 'DELETE':
+
+            idList = [entityId] if entityId is not None else paramDict.get('ids-to-delete', '').split(',')
+
+            root = ET.Element('Entities')
+            for deleteId in idList:
+
+                fields = store.deleteEntity(entity, deleteId.strip())
+
+                if fields is not None:
+                    root.append(getEntityXml(entity, fields))
+
+            root.set('TotalResults', str(len(root)))
+
+            return 200, ET.tostring(root), {}
+
+        return 405, '', {}
+
+    def _getEntityCollection(self, entity, paramDict, parentDict):
+
+        store = self.store
+
+        cacheKey = (entity, paramDict.get('query', ''), tuple(sorted(parentDict.items())), store.version)
+
+        if self._filterCache[0] == cacheKey:
+            entityList = self._filterCache[1]
+
+        else:
+            conditionList = parseQuery(paramDict.get('query', ''))
+
+            entityList = [fields for fields in store.getEntityList(entity)
+                          if all([fields.get(key) == value for key, value in parentDict.iteritems()]) and
+                          matchQuery(conditionList, fields)]
+
+            self._filterCache = (cacheKey, entityList)
+
+        pageSize = int(paramDict.get('page-size') or self.pageSize)
+        startIndex = int(paramDict.get('start-index') or 1)
+
+        fieldFilter = None
+        if paramDict.get('fields'):
+            fieldFilter = [field.strip() for field in paramDict['fields'].split(',')]
+
+        root = ET.Element('Entities', {'TotalResults': str(len(entityList))})
+
+        for fields in entityList[startIndex - 1:startIndex - 1 + pageSize]:
+            root.append(getEntityXml(entity, fields, fieldFilter))
+
+        return ET.tostring(root)
+
+    def _attachment(self, method, entity, entityId, headerDict, content):
+
+        store = self.store
+
+        if method == 'GET':
+
+            root = ET.Element('Entities')
+            for attachment in store.getAttachmentList(entity, entityId):
+                root.append(getEntityXml('attachment', attachment))
+            root.set('TotalResults', str(len(root)))
+
+            return 200, ET.tostring(root), {}
+
+        if method != 'POST':
+            return 405, '', {}
+
+        contentType = headerDict.get('content-type', '')
+
+        if contentType.startswith('multipart/form-data'):
+
+            boundary = contentType.partition('boundary=')[2]
+
+            formDict = {}
+            for part in content.split('--' + boundary):
+
+                header, _, data = part.partition('\r\n\r\n')
+
+                result = re.search(r'name="([^"]+)"', header)
+                if result:
+                    formDict[result.group(1)] = data[:-2] if data.endswith('\r\n') else data
+
+            fileName, description, data = formDict.get('filename'), formDict.get('description', ''), \
+                formDict.get('file', '')
+
+        else:
+            fileName = headerDict.get('slug')
+            description = headerDict.get('descripton') or headerDict.get('description', '')
+            data = content
+
+        if not fileName:
+            return 400, '', {}
+
+        attachment = store.addAttachment(entity, entityId, fileName, description, data)
+
+        return 201, ET.tostring(getEntityXml('attachment', attachment)), {}
+
+    def _customization(self, partList, paramDict):
+
+        store = self.store
+
+        if partList[0] == 'used-lists':
+
+            if 'name' in paramDict:
+                nameList = [name.strip() for name in paramDict['name'].split(',')]
+            else:
+                nameList = sorted(store.listDict.keys())
+
+            # Ids are the position of the list in the sorted list names
+            allNameList = sorted(store.listDict.keys())
+
+            if 'id' in paramDict:
+                nameList = [allNameList[int(listId) - 1] for listId in paramDict['id'].split(',')
+                            if 0 < int(listId) <= len(allNameList)]
+
+            return 200, self._getListsXml([name for name in nameList if name in store.listDict]), {}
+
+        if partList[0] != 'entities' or len(partList) < 3:
+            return 404, '', {}
+
+        entity, resource = partList[1], partList[2]
+
+        if resource == 'fields':
+
+            if paramDict.get('required') == 'true':
+                fieldList = store.requiredFieldDict.get(entity, [])
+            else:
+                fieldList = store.getFieldList(entity)
+
+            root = ET.Element('Fields')
+            for field in fieldList:
+                fieldElem = ET.SubElement(root, 'Field', {'Name': field, 'Label': field, 'PhysicalName': field})
+                ET.SubElement(fieldElem, 'Required').text = str(field in store.requiredFieldDict.get(entity, []))
+                ET.SubElement(fieldElem, 'Editable').text = str(field != 'id')
+
+            return 200, ET.tostring(root), {}
+
+        if resource == 'lists':
+            return 200, self._getListsXml(sorted(store.listDict.keys())), {}
+
+        if resource == 'relations':
+
+            root = ET.Element('Relations')
+            for relation in store.relationDict.get(entity, []):
+
+                if len(partList) > 3 and partList[3] != relation:
+                    continue
+
+                ET.SubElement(root, 'Relation', {'Name': relation})
+
+            return 200, ET.tostring(root), {}
+
+        return 404, '', {}
+
+    def _getListsXml(self, nameList):
+
+        store = self.store
+
+        allNameList = sorted(store.listDict.keys())
+
+        root = ET.Element('Lists')
+        for name in nameList:
+
+            listElem = ET.SubElement(root, 'List')
+            ET.SubElement(listElem, 'Name').text = name
+            ET.SubElement(listElem, 'Id').text = str(allNameList.index(name) + 1)
+
+            itemsElem = ET.SubElement(listElem, 'Items')
+            for value in store.listDict[name]:
+                ET.SubElement(itemsElem, 'Item', {'value': value})
+
+        return ET.tostring(root)
+
+
+class _FakeALMHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    # Send each response in a single write - headers sent one by one are delayed by the tcp stack
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+
+        with self.server.connectionLock:
+            self.server.connectionSet.add(self.connection)
+
+    def finish(self):
+        try:
+            BaseHTTPServer.BaseHTTPRequestHandler.finish(self)
+
+        finally:
+            with self.server.connectionLock:
+                self.server.connectionSet.discard(self.connection)
+
+    def log_message(self, format, *args):
+        logger.debug('FakeALMServer: ' + format % args)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def _handle(self, method):
+
+        length = int(self.headers.getheader('Content-Length') or 0)
+        content = self.rfile.read(length) if length else ''
+
+        # Header keys are in lower case
+        status, body, headers = self.server.app.handle(method, self.path, dict(self.headers.items()), content)
+
+        self.send_response(status)
+
+        for key, value in headers.iteritems():
+            self.send_header(key, value)
+
+        self.send_header('Content-Type', 'application/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        self.wfile.write(body)
+
+
+class _ThreadingHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class FakeALMServer(object):
+    '''
+    Local fake ALM REST server - runs in a background thread
+    '''
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, users=None, store=None, requireLogin=True,
+                 pageSize=100):
+        '''
+        :param host: host to bind
+        :param port: port to bind (0 for any free port - see url)
+        :param latency: seconds added to each request
+        :param users: dict user -> password accepted on login (None accepts any user)
+        :param store: FakeALMStore (a new one is created if not given)
+        :param requireLogin: if True requests without a login session are refused (401)
+        :param pageSize: page size used when the request does not define one
+        :return:
+        '''
+
+        self.app = FakeALMApp(store, latency, users, requireLogin, pageSize)
+        self.store = self.app.store
+
+        self._httpd = _ThreadingHTTPServer((host, port), _FakeALMHandler)
+
+        self._httpd.app = self.app
+        self._httpd.connectionSet = set()
+        self._httpd.connectionLock = threading.Lock()
+
+        self.url = 'http://%s:%d' % self._httpd.server_address[:2]
+
+        self._thread = None
+
+    @property
+    def latency(self):
+        return self.app.latency
+
+    @latency.setter
+    def latency(self, value):
+        self.app.latency = value
+
+    def getStats(self):
+        '''
+        Number of requests served
+        :return: {'requests': n, 'GET': n, 'POST': n, ...}
+        '''
+
+        return self.app.getStats()
+
+    def start(self):
+        '''
+        Start serving in a background thread
+        :return: server url
+        '''
+
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='FakeALMServer')
+        self._thread.daemon = True
+        self._thread.start()
+
+        logger.info('FakeALMServer: Serving on %s' % self.url)
+
+        return self.url
+
+    def stop(self):
+        '''
+        Stop serving
+        :return:
+        '''
+
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+
+        self._httpd.server_close()
+
+        # Close keep-alive connections so that their threads end
+        with self._httpd.connectionLock:
+            connectionList = list(self._httpd.connectionSet)
+
+        for connection in connectionList:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+
+        logger.info('FakeALMServer: Stopped')
+
+    def serveForever(self):
+        '''
+        Serve in the current thread until KeyboardInterrupt
+        :return:
+        '''
+
+        logger.info('FakeALMServer: Serving on %s' % self.url)
+
+        try:
+            self._httpd.serve_forever()
+
+        except KeyboardInterrupt:
+            pass
+
+        finally:
+            self._httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.stop()
@@ -0,0 +1,200 @@
+'''
+    journal.py - Contains the QCJournal class, a checkpoint journal used to resume interrupted sxml imports and
+    sync jobs.
+
+    The journal is a file that keeps, for each job, the phases already completed and the data needed to resume them
+    (e.g. ids of the entities created). Each completed phase is appended as one json record per line, so saving a
+    phase does not rewrite the journal. When a job ends successfully its records are removed from the journal.
+
+    >>> journal = QCJournal(QCJournal.getJobId('qcAddRuns', sxml))
+    >>> if not journal.isDone('addTestRunToTestLab.putRuns'):
+    ...     journal.setDone('addTestRunToTestLab.putRuns', ['1', '2'])
+    >>> journal.finish()
+'''
+
+__author__ = 'Rodolfo Andrade'
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+# Get logger
+logger = logging.getLogger('QCRest')
+
+
+class QCJournal(object):
+    '''
+    Checkpoint journal of a single job (sxml import or sync job)
+    '''
+
+    def __init__(self, jobId, fileName='.qc_journal.json'):
+        '''
+        Open the journal of a job - phases done in a previous run of the same job are loaded
+        :param jobId: job identifier, see getJobId
+        :param fileName: journal file (shared by several jobs)
+        :return:
+        '''
+
+        self.jobId = jobId
+        self.fileName = fileName
+
+        self._lock = threading.RLock()
+
+        # Phase -> data
+        self._phaseDict = self._loadJobs().get(jobId, {}).get('phases', {})
+
+        if len(self._phaseDict) > 0:
+            logger.info('QCJournal: Resuming job %s - phases done: %s' % (jobId, sorted(self._phaseDict.keys())))
+
+    @staticmethod
+    def getJobId(name, *dataList):
+        '''
+        Get job identifier from the job name and the data it processes (e.g. the sxml)
+        :param name: job name
+        :param dataList: job data - strings
+        :return: job identifier
+        '''
+
+        sha = hashlib.sha1()
+
+        for data in dataList:
+
+            if isinstance(data, unicode):
+                data = data.encode('utf-8')
+
+            sha.update(data)
+
+        return '%s-%s' % (name, sha.hexdigest())
+
+    def isDone(self, phase):
+        '''
+        Check if a phase was already completed
+        :param phase: phase name
+        :return: True if done
+        '''
+
+        with self._lock:
+            return phase in self._phaseDict
+
+    def getData(self, phase, default=None):
+        '''
+        Get the data saved when the phase was completed
+        :param phase: phase name
+        :param default: returned if phase is not done
+        :return: phase data
+        '''
+
+        with self._lock:
+            return self._phaseDict.get(phase, default)
+
+    def setDone(self, phase, data=None):
+        '''
+        Mark phase as completed and save the journal immediately
+        :param phase: phase name
+        :param data: json serializable data needed to resume the job (e.g. created ids)
+        :return:
+        '''
+
+        with self._lock:
+            self._phaseDict[phase] = data
+
+            with open(self.fileName, 'a') as filen:
+                filen.write(self._getRecord(self.jobId, phase, data))
+
+        logger.debug('QCJournal: %s: Phase \'%s\' done' % (self.jobId, phase))
+
+    def finish(self):
+        '''
+        Job ended successfully - remove it from the journal so that a new run starts from scratch. The journal is
+        compacted: only the records of the other jobs are kept
+        :return:
+        '''
+
+        with self._lock:
+            self._phaseDict = {}
+
+            jobDict = self._loadJobs()
+
+            if self.jobId in jobDict:
+                del jobDict[self.jobId]
+                self._saveJobs(jobDict)
+
+        logger.debug('QCJournal: %s: Job finished' % self.jobId)
+
+    @staticmethod
+    def _getRecord(jobId, phase, data, updated=None):
+
+        record = {'job': jobId, 'updated': updated or time.strftime('%Y-%m-%d %H:%M:%S'), 'phase': phase,
+                  'data': data}
+
+        return json.dumps(record, separators=(',', ':')) + '\n'
+
+    def _loadJobs(self):
+
+        # Job id -> {'updated': time of the last phase, 'phases': {phase: data}}
+        jobDict = {}
+
+        if not os.path.isfile(self.fileName):
+            return jobDict
+
+        with open(self.fileName, 'r') as filen:
+            content = filen.read()
+
+        # Journal written as a single json dict of jobs (before phases were appended) - converted to records
+        try:
+            oldJobDict = json.loads(content)
+
+        except ValueError:
+            pass
+
+        else:
+            if isinstance(oldJobDict, dict) and 'job' not in oldJobDict:
+                self._saveJobs(oldJobDict)
+                return oldJobDict
+
+        corruptedCount = 0
+
+        for line in content.splitlines():
+
+            if not line.strip():
+                continue
+
+            try:
+                record = json.loads(line)
+
+                job = jobDict.setdefault(record['job'], {'phases': {}})
+                job['updated'] = record['updated']
+                job['phases'][record['phase']] = record['data']
+
+            except (ValueError, KeyError, TypeError):
+                # E.g. last record not completely written when the job was interrupted
+                corruptedCount += 1
+
+        # Rewritten without them, so the next record is not appended to a partial line
+        if corruptedCount > 0:
+            logger.warning('QCJournal: Ignoring %d corrupted records in journal %s' % (corruptedCount, self.fileName))
+            self._saveJobs(jobDict)
+
+        return jobDict
+
+    def _saveJobs(self, jobDict):
+
+        if len(jobDict) == 0:
+            os.remove(self.fileName)
+            return
+
+        # Write to temporary file first so an interruption does not corrupt the journal
+        tmpFileName = self.fileName + '.tmp'
+
+        with open(tmpFileName, 'w') as filen:
+            for jobId, job in jobDict.iteritems():
+                for phase, data in job['phases'].iteritems():
+                    filen.write(self._getRecord(jobId, phase, data, job.get('updated')))
+
+        if os.path.isfile(self.fileName):
+            os.remove(self.fileName)
+
+        os.rename(tmpFileName, self.fileName)
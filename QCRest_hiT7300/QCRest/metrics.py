@@ -0,0 +1,200 @@
+'''
+    metrics.py - Contains the QCMetrics class that keeps, for each phase of the QC imports (id resolution, folder
+    creation, template fetching, create, update, step updates, ...), the wall time, the number of HTTP calls, the
+    entities created / updated / deleted and the bytes sent and received.
+
+    The requests are counted by Connect and added to the innermost phase running. Phases can be nested - the time
+    and requests of a phase do not include the ones of its sub-phases, so the totals are the sum of all phases.
+    The same metrics can be passed to several imports to get the totals of a whole job:
+
+    >>> metrics = QCMetrics()
+    >>> qc_con.addTestToTestPlan(xml, True, False, metrics=metrics)
+    >>> qc_con.addTestSet(xml, metrics=metrics)
+    >>> print metrics.report()
+'''
+
+__author__ = 'Rodolfo Andrade'
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Write operation of each http method
+_operationDict = {'POST': 'create', 'PUT': 'update', 'DELETE': 'delete'}
+
+
+@contextmanager
+def _noPhase():
+    yield
+
+
+def getPhase(metrics, phase):
+    '''
+    Context of a phase - does nothing if there are no metrics
+    :param metrics: QCMetrics or None
+    :param phase: phase name
+    :return: context manager
+    '''
+
+    if metrics is None:
+        return _noPhase()
+
+    return metrics.phase(phase)
+
+
+def getEntityCount(method, url, data):
+    '''
+    Number of entities written by a request
+    :param method: http method
+    :param url: request url
+    :param data: request body
+    :return: number of entities
+    '''
+
+    if method == 'DELETE' and 'ids-to-delete=' in url:
+        return url.split('ids-to-delete=', 1)[1].count(',') + 1
+
+    if isinstance(data, basestring) and '<Entity ' in data:
+        return data.count('<Entity ')
+
+    return 1
+
+
+class QCMetrics(object):
+    '''
+    Metrics of the phases of one or more QC imports
+    '''
+
+    keyList = ['time', 'requests', 'create', 'update', 'delete', 'bytesSent', 'bytesReceived']
+
+    def __init__(self):
+
+        # Phase -> {'time': seconds, 'requests': n, 'create': n, 'update': n, 'delete': n, 'bytesSent': n,
+        # 'bytesReceived': n}
+        self.phaseDict = OrderedDict()
+
+        # Running phases: [phase name, start time, time of the sub-phases]
+        self._phaseStack = []
+
+        self._lock = threading.Lock()
+
+    def _getPhaseData(self, phase):
+
+        if phase not in self.phaseDict:
+            self.phaseDict[phase] = dict([(key, 0) for key in self.keyList])
+
+        return self.phaseDict[phase]
+
+    @contextmanager
+    def phase(self, phase):
+        '''
+        Context of a phase - sub-phases are named <phase>.<sub-phase>
+        :param phase: phase name
+        :return:
+        '''
+
+        with self._lock:
+
+            if self._phaseStack:
+                phase = self._phaseStack[-1][0] + '.' + phase
+
+            # Keep the phase order
+            self._getPhaseData(phase)
+
+            entry = [phase, time.time(), 0.0]
+            self._phaseStack.append(entry)
+
+        try:
+            yield
+
+        finally:
+
+            with self._lock:
+
+                self._phaseStack.remove(entry)
+
+                elapsed = time.time() - entry[1]
+
+                self._getPhaseData(phase)['time'] += elapsed - entry[2]
+
+                # Sub-phase time is not added to the parent phase
+                if self._phaseStack:
+                    self._phaseStack[-1][2] += elapsed
+
+    def addRequest(self, entity, method, url, data, response):
+        '''
+        Add a request to the running phase (requests done outside phases are added to phase 'other')
+        :param entity: entity type (None if not an entity request)
+        :param method: http method
+        :param url: request url
+        :param data: request body
+        :param response: response
+        :return:
+        '''
+
+        with self._lock:
+
+            phaseData = self._getPhaseData(self._phaseStack[-1][0] if self._phaseStack else 'other')
+
+            phaseData['requests'] += 1
+
+            if isinstance(data, basestring):
+                phaseData['bytesSent'] += len(data)
+
+            phaseData['bytesReceived'] += len(response.content or '')
+
+            operation = _operationDict.get(method)
+
+            if operation is not None and entity is not None and response.status_code < 400:
+                phaseData[operation] += getEntityCount(method, url, data)
+
+    def getTotals(self):
+        '''
+        Get totals of all phases
+        :return: {'time': seconds, 'requests': n, ...}
+        '''
+
+        totals = dict([(key, 0) for key in self.keyList])
+
+        with self._lock:
+            for phaseData in self.phaseDict.itervalues():
+                for key in totals:
+                    totals[key] += phaseData[key]
+
+        return totals
+
+    def toDict(self):
+        '''
+        Metrics as a json serializable dict
+        :return: {'phases': {phase: {...}}, 'totals': {...}}
+        '''
+
+        with self._lock:
+            phaseDict = dict([(phase, dict(phaseData)) for phase, phaseData in self.phaseDict.iteritems()])
+
+        return {'phases': phaseDict, 'totals': self.getTotals()}
+
+    def report(self):
+        '''
+        Metrics as a text table
+        :return: string
+        '''
+
+        header = ['phase'] + self.keyList
+
+        lineFormat = '%-45s %10s' + ' %10s' * (len(header) - 2)
+
+        def getLine(phase, phaseData):
+            return lineFormat % tuple([phase, '%.3f' % phaseData['time']] +
+                                      [phaseData[key] for key in self.keyList[1:]])
+
+        lines = [lineFormat % tuple(header)]
+
+        with self._lock:
+            for phase, phaseData in self.phaseDict.iteritems():
+                lines.append(getLine(phase, phaseData))
+
+        lines.append(getLine('total', self.getTotals()))
+
+        return '\n'.join(lines)
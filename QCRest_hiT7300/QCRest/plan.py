@@ -0,0 +1,174 @@
+'''
+    plan.py - Contains the QCPlan class that keeps the result of a dry run (plan mode) of the QC imports.
+
+    In plan mode the QC add* methods only do the read-only calls needed to resolve the ids of the entities that
+    already exist. The writes they would do are added to the plan instead: number of entities created, updated and
+    deleted per entity type, number of write requests and estimated bytes sent.
+
+    >>> plan = QCPlan()
+    >>> qc_con.addTestToTestPlan(xml, True, False, plan=plan)
+    >>> print plan.report()
+'''
+
+__author__ = 'Rodolfo Andrade'
+
+from collections import OrderedDict
+
+# Xml of an empty field and of a collection (used to estimate the request size)
+_fieldXmlSize = len('<Field Name=""><Value></Value></Field>')
+_valueXmlSize = len('<Value></Value>')
+_collectionXmlSize = len('<Entities></Entities>')
+
+
+def getFieldXmlSize(field, value):
+    '''
+    Estimated size of a field in the entity xml
+    :param field: field name
+    :param value: field value - can be a list or None
+    :return: bytes
+    '''
+
+    if value is None:
+        return _fieldXmlSize + len(field)
+
+    if type(value) is list:
+        return _fieldXmlSize + len(field) + sum([len(val or '') + _valueXmlSize for val in value]) - _valueXmlSize
+
+    return _fieldXmlSize + len(field) + len(value)
+
+
+def getEntityXmlSize(templateSize, fieldDict):
+    '''
+    Estimated size of an entity xml
+    :param templateSize: size of the entity template (required fields)
+    :param fieldDict: fields added to the template
+    :return: bytes
+    '''
+
+    return templateSize + sum([getFieldXmlSize(field, value) for field, value in fieldDict.iteritems()])
+
+
+class QCPlan(object):
+    '''
+    Writes that a QC import would do, per entity type
+    '''
+
+    operationList = ['create', 'update', 'delete']
+
+    def __init__(self):
+
+        # Entity -> {'create': n, 'update': n, 'delete': n, 'requests': n, 'bytes': n}
+        self.entityDict = OrderedDict()
+
+        # Entity -> size of the entity template
+        self.templateSizeDict = {}
+
+    def add(self, entity, operation, count, requests, size=0):
+        '''
+        Add writes to the plan
+        :param entity: entity type (e.g. 'test')
+        :param operation: 'create', 'update' or 'delete'
+        :param count: number of entities
+        :param requests: number of write requests
+        :param size: estimated bytes sent
+        :return:
+        '''
+
+        if operation not in self.operationList:
+            raise ValueError('QCPlan: Invalid operation \'%s\'' % operation)
+
+        if entity not in self.entityDict:
+            self.entityDict[entity] = {'create': 0, 'update': 0, 'delete': 0, 'requests': 0, 'bytes': 0}
+
+        entityData = self.entityDict[entity]
+
+        entityData[operation] += count
+        entityData['requests'] += requests
+        entityData['bytes'] += size
+
+    def addEntityCollection(self, entity, operation, tagsList, fieldDict, templateSize, collectionSize,
+                            chunkSize=None):
+        '''
+        Add the creation / update of an entity collection. Collections are sent in chunks of chunkSize entities and
+        each chunk is broken in requests of collectionSize entities (see QC_Entity.breakEntityCollection)
+        :param entity: entity type
+        :param operation: 'create' or 'update'
+        :param tagsList: list of entity tags (fields)
+        :param fieldDict: fields added to all entities (values are only used to estimate the size)
+        :param templateSize: size of the entity template
+        :param collectionSize: max number of entities per request
+        :param chunkSize: number of entities per chunk (None for all)
+        :return:
+        '''
+
+        if len(tagsList) == 0:
+            return
+
+        chunkSize = chunkSize or len(tagsList)
+
+        requests = 0
+        for start in xrange(0, len(tagsList), chunkSize):
+            requests += (min(chunkSize, len(tagsList) - start) + collectionSize - 1) / collectionSize
+
+        size = sum([getEntityXmlSize(templateSize, tags) for tags in tagsList])
+        size += len(tagsList) * getEntityXmlSize(0, fieldDict) + requests * _collectionXmlSize
+
+        self.add(entity, operation, len(tagsList), requests, size)
+
+    def addDeleteIdList(self, entity, entityIds, idsPerRequest):
+        '''
+        Add the deletion of a list of entities - ids are sent in the url
+        :param entity: entity type
+        :param entityIds: list of ids
+        :param idsPerRequest: max number of ids per request
+        :return:
+        '''
+
+        if len(entityIds) == 0:
+            return
+
+        self.add(entity, 'delete', len(entityIds), (len(entityIds) + idsPerRequest - 1) / idsPerRequest,
+                 sum([len(entityId) + 1 for entityId in entityIds]))
+
+    def getTotals(self):
+        '''
+        Get totals of all entities
+        :return: {'create': n, 'update': n, 'delete': n, 'requests': n, 'bytes': n}
+        '''
+
+        totals = {'create': 0, 'update': 0, 'delete': 0, 'requests': 0, 'bytes': 0}
+
+        for entityData in self.entityDict.itervalues():
+            for key in totals:
+                totals[key] += entityData[key]
+
+        return totals
+
+    def toDict(self):
+        '''
+        Plan as a json serializable dict
+        :return: {'entities': {entity: {...}}, 'totals': {...}}
+        '''
+
+        return {'entities': dict(self.entityDict), 'totals': self.getTotals()}
+
+    def report(self):
+        '''
+        Plan as a text table
+        :return: string
+        '''
+
+        header = ['entity'] + self.operationList + ['requests', 'bytes']
+
+        lineFormat = '%-18s' + ' %10s' * (len(header) - 1)
+
+        lines = [lineFormat % tuple(header)]
+
+        for entity, entityData in self.entityDict.iteritems():
+            lines.append(lineFormat % tuple([entity] + [entityData[key] for key in header[1:]]))
+
+        totals = self.getTotals()
+
+        lines.append(lineFormat % tuple(['total'] + [totals[key] for key in header[1:]]))
+
+        return '\n'.join(lines)
@@ -0,0 +1,344 @@
+'''
+    profiler.py - Contains the QCProfiler class and the profileMain function used by the --profile option of the
+    scripts to profile a whole run without editing code.
+
+    >>> if __name__ == '__main__':
+    >>>     profileMain(main, sys.argv)
+
+    With --profile the script main runs under cProfile (default, all threads are profiled) or pyinstrument (only if
+    installed). The own time of the profiled functions is split in four categories, for each thread:
+
+        network - socket / ssl / httplib / requests / urllib3 (waiting for QC or Jira)
+        xml     - lxml / ElementTree / expat parsing and serialization
+        wait    - blocked in lock acquire / time.sleep / select / Queue and Condition waits (idle threads, e.g. the
+                  main thread waiting for the ThreadPool workers)
+        python  - everything else (the QC / Jira logic)
+
+    Threads are reported separately - adding them up would count the same wall time once per thread.
+
+    The report (<script>.profile.txt) is written to the current folder, next to the .sxml.xml of the run, together
+    with the raw stats (<script>.profile.prof - can be opened with pstats, snakeviz, gprof2dot, ...) or the
+    pyinstrument html flame view (<script>.profile.html).
+'''
+
+__author__ = 'Rodolfo Andrade'
+
+import argparse
+import cProfile
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import cStringIO
+
+# Get logger
+logger = logging.getLogger('QCRest')
+
+# Profilers supported by --profile
+profilerList = ['cprofile', 'pyinstrument']
+
+# Categories in report order
+categoryList = ['network', 'xml', 'wait', 'python']
+
+# Blocking calls - matched against the name of built-in functions and <module file>:<function> of python functions
+_waitRegex = re.compile(r"('acquire' of '\w*\.?lock'|<time\.sleep>|<select\.|'e?poll' of 'select\.|" +
+                        r"^threading\.py:(wait|join)$|^Queue\.py:(get|put)$)")
+
+# Category -> regex matched against the file name and function name of each profiled function
+_categoryRegexList = [
+    ('network', re.compile(r'(socket|ssl|httplib|requests|urllib3)', re.IGNORECASE)),
+    ('xml', re.compile(r'(lxml|etree|ElementTree|expat|xml[/\\.](dom|sax|parsers))', re.IGNORECASE)),
+]
+
+
+def getFunctionCategory(function):
+    '''
+    Category of a profiled function
+    :param function: pstats function key (file name, line, function name)
+    :return: 'network', 'xml', 'wait' or 'python'
+    '''
+
+    fileName, line, name = function
+
+    # Built-in functions have file name '~' - the module is part of the function name
+    if fileName == '~':
+        text = name
+        waitText = name
+    else:
+        text = fileName
+        waitText = '%s:%s' % (os.path.basename(fileName), name)
+
+    if _waitRegex.search(waitText):
+        return 'wait'
+
+    for category, regex in _categoryRegexList:
+        if regex.search(text):
+            return category
+
+    return 'python'
+
+
+def addProfileArguments(parser):
+    '''
+    Add the --profile options to the argument parser of a script
+    :param parser: argparse.ArgumentParser
+    :return: parser
+    '''
+
+    parser.add_argument('--profile', nargs='?', const='cprofile', choices=profilerList,
+                        help="Profile the run and write <script>.profile.txt (time per thread split in network / " +
+                             "xml / wait / python) next to the .sxml.xml. Default profiler: cprofile.")
+    parser.add_argument('--profile-file', help="Profile report name without extension. Default: <script>.profile")
+    return parser
+
+
+class QCProfiler(object):
+    '''
+    Profile of a run
+    '''
+
+    def __init__(self, fileName, profiler='cprofile'):
+        '''
+        :param fileName: report name without extension
+        :param profiler: 'cprofile' or 'pyinstrument'
+        :return:
+        '''
+
+        if profiler not in profilerList:
+            raise ValueError('QCProfiler: Invalid profiler \'%s\'' % profiler)
+
+        self.fileName = fileName
+        self.profiler = profiler
+
+        self.wallTime = 0.0
+
+        self._startTime = None
+
+        # cprofile: (thread name, profile) for each thread (cProfile only profiles the thread that enables it)
+        self._profileList = []
+        self._lock = threading.Lock()
+
+        # pyinstrument profiler
+        self._pyinstrument = None
+
+        self._stats = None
+
+    def _getThreadProfile(self):
+
+        profile = cProfile.Profile()
+
+        with self._lock:
+            self._profileList.append((threading.current_thread().name, profile))
+
+        return profile
+
+    def _startThread(self, frame, event, arg):
+
+        # Called once in each new thread (threading.setprofile) - replaced by the thread profile
+        self._getThreadProfile().enable()
+
+    def start(self):
+        '''
+        Start profiling
+        :return:
+        '''
+
+        if self.profiler == 'pyinstrument':
+
+            try:
+                from pyinstrument import Profiler
+
+            except ImportError:
+                logger.warning('QCProfiler: pyinstrument lib not found, cProfile is used')
+                self.profiler = 'cprofile'
+
+            else:
+                self._pyinstrument = Profiler()
+
+        self._startTime = time.time()
+
+        if self._pyinstrument is not None:
+            self._pyinstrument.start()
+
+        else:
+            threading.setprofile(self._startThread)
+            self._getThreadProfile().enable()
+
+    def stop(self):
+        '''
+        Stop profiling
+        :return:
+        '''
+
+        if self._pyinstrument is not None:
+            self._pyinstrument.stop()
+
+        else:
+            threading.setprofile(None)
+
+            # Threads still running keep their profile enabled - their stats are taken as they are now
+            for threadName, profile in self._profileList:
+                profile.disable()
+
+        self.wallTime = time.time() - self._startTime
+
+    def getStats(self):
+        '''
+        Stats of all threads
+        :return: pstats.Stats (None with pyinstrument)
+        '''
+
+        if self._pyinstrument is not None:
+            return None
+
+        if self._stats is None:
+
+            stream = cStringIO.StringIO()
+
+            for threadName, profile in self._profileList:
+
+                # Threads that did not call any function have no stats
+                profile.create_stats()
+
+                if not profile.stats:
+                    continue
+
+                if self._stats is None:
+                    self._stats = pstats.Stats(profile, stream=stream)
+                else:
+                    self._stats.add(profile)
+
+        return self._stats
+
+    def getThreadCategoryTimes(self):
+        '''
+        Time spent in each category by each thread (own time of the functions)
+        :return: list of (thread name, {'network': seconds, 'xml': seconds, 'wait': seconds, 'python': seconds})
+        '''
+
+        threadList = []
+
+        if self._pyinstrument is not None:
+            return threadList
+
+        for threadName, profile in self._profileList:
+
+            # pstats.Stats takes the stats out of the profile (see getStats) - they are created again
+            profile.create_stats()
+
+            if not profile.stats:
+                continue
+
+            categoryDict = dict.fromkeys(categoryList, 0.0)
+
+            for function, (cc, nc, tt, ct, callers) in profile.stats.iteritems():
+                categoryDict[getFunctionCategory(function)] += tt
+
+            threadList.append((threadName, categoryDict))
+
+        return threadList
+
+    def report(self, limit=30):
+        '''
+        Text report
+        :param limit: number of functions listed
+        :return: report string
+        '''
+
+        lines = ['Profile of: %s' % ' '.join(sys.argv),
+                 'Profiler: %s' % self.profiler,
+                 'Wall time: %.3f seconds' % self.wallTime,
+                 '']
+
+        if self._pyinstrument is not None:
+            lines.append(self._pyinstrument.output_text(unicode=False, color=False))
+            return '\n'.join(lines)
+
+        lines.append('Time per category and thread (seconds, % of the thread time):')
+        lines.append('    %-20s %10s' % ('thread', 'total') + ''.join(' %17s' % category for category in categoryList))
+
+        for threadName, categoryDict in self.getThreadCategoryTimes():
+
+            total = sum(categoryDict.values())
+
+            lines.append('    %-20s %10.3f' % (threadName, total) +
+                         ''.join(' %10.3f %5.1f%%' % (categoryDict[category],
+                                                      100.0 * categoryDict[category] / (total or 1.0))
+                                 for category in categoryList))
+
+        stats = self.getStats()
+
+        if stats is not None:
+
+            for sortKey in ['cumulative', 'tottime']:
+
+                stream = cStringIO.StringIO()
+
+                stats.stream = stream
+                stats.sort_stats(sortKey).print_stats(limit)
+
+                lines.append('')
+                lines.append('Top %d functions by %s:' % (limit, sortKey))
+                lines.append(stream.getvalue())
+
+        return '\n'.join(lines)
+
+    def save(self):
+        '''
+        Write the report and the raw stats / html
+        :return: list of files written
+        '''
+
+        fileList = [self.fileName + '.txt']
+
+        with open(fileList[0], 'w') as filen:
+            filen.write(self.report())
+
+        if self._pyinstrument is not None:
+
+            fileList.append(self.fileName + '.html')
+
+            with open(fileList[1], 'w') as filen:
+                filen.write(self._pyinstrument.output_html().encode('utf-8'))
+
+        elif self.getStats() is not None:
+
+            fileList.append(self.fileName + '.prof')
+
+            self.getStats().dump_stats(fileList[1])
+
+        logger.info('QCProfiler: Profile written to %s' % ', '.join(fileList))
+
+        return fileList
+
+
+def profileMain(main, argv):
+    '''
+    Run the main function of a script - profiled if --profile is passed (see addProfileArguments)
+    :param main: main function of the script
+    :param argv: sys.argv
+    :return: main return
+    '''
+
+    args, _ = addProfileArguments(argparse.ArgumentParser(add_help=False)).parse_known_args(argv[1:])
+
+    if not args.profile:
+        return main(argv)
+
+    fileName = args.profile_file or os.path.splitext(os.path.basename(argv[0]))[0] + '.profile'
+
+    profiler = QCProfiler(fileName, args.profile)
+
+    profiler.start()
+
+    try:
+        return main(argv)
+
+    finally:
+        # Also written when the script fails or exits
+        profiler.stop()
+
+        print '\nProfile written to %s' % ', '.join(profiler.save())
@@ -55,12 +55,15 @@ except:
 
 from os.path import join
 from connect import Connect, ConnectionError
+from metrics import getPhase
 
 import os
 import cStringIO
 import copy
 import itertools
 import logging.handlers
+from collections import Mapping
+from operator import attrgetter
 
 # Logging configuration
 loggerFileName = '.qc.log'
@@ -283,6 +286,9 @@ class QC(QC_Project, QC_Connect):
         self.domain = domain
         self.url_server = server
 
+        # Number of runs whose steps are updated between two journal checkpoints
+        self.journalChunkSize = 50
+
         # Init upper class
         super(QC, self).__init__(server, project, domain, silent, session, proxies)
 
@@ -324,7 +330,8 @@ class QC(QC_Project, QC_Connect):
         # Defect Collection (and instances)
         self.Defects = QC_Entity('defect', server, project, domain, silent, self.session, proxies)
 
-    def addTestToTestPlan(self, sxml, updateTestIfExists=False, ignoreTestIfExists=True):
+    def addTestToTestPlan(self, sxml, updateTestIfExists=False, ignoreTestIfExists=True, journal=None, plan=None,
+                          metrics=None):
         '''
         Add tests defined in sxml file
 
@@ -337,10 +344,21 @@ class QC(QC_Project, QC_Connect):
         :param sxml: SXML
         :param updateTestIfExists: See function description
         :param ignoreTestIfExists: See function description
+        :param journal: QCJournal - phases already done in a previous run of the job are skipped (optional)
+        :param plan: QCPlan - dry run, only read-only calls are done and the writes are added to the plan (optional)
+        :param metrics: QCMetrics - time, requests and entities written of each phase are added to it (optional)
         :return:
         '''
 
         logger.info('addTestToTestPlan: Start...')
+
+        # Dry run does not touch the journal
+        if plan is not None:
+            journal = None
+
+        # Requests of all entities are added to the metrics of this import
+        self._setMetrics(metrics)
+
         logger.debug('addTestToTestPlan: updateTestIfExists: %s' % updateTestIfExists)
         logger.debug('addTestToTestPlan: ignoreTestIfExists: %s' % ignoreTestIfExists)
 
@@ -348,10 +366,11 @@ class QC(QC_Project, QC_Connect):
         r = []
 
         # Process data
-        sxmlData = SXml(sxml)
+        with getPhase(self.metrics, 'addTestToTestPlan.sxml'):
+            sxmlData = SXml(sxml)
 
-        # Get Test data to add run
-        listTestData = sxmlData.getTestData()
+            # Get Test data to add run
+            listTestData = sxmlData.getTestData()
 
         # Get list of test folder
         listTestLocationXml = listTestData['location']
@@ -405,11 +424,15 @@ class QC(QC_Project, QC_Connect):
                 except:
                     pass
 
-        # Get Ids from test in test plan
-        listTestFolderIds = self._getIdTestPlanFolderFromPathList(listTestPath)
+        # Resolve ids
+        with getPhase(self.metrics, 'addTestToTestPlan.ids'):
+            # Get Ids from test in test plan
+            listTestFolderIds = self._getIdTestPlanFolderFromPathList(listTestPath)
 
-        # First get the list of tests that exist or not
-        listTestId = self._getIdTestPlanTestFromFolderIdTestName(listTestFolderIds, listTestName)
+            # First get the list of tests that exist or not - when resuming use the ones found in the first run
+            listTestId = self._getJournalIdList(journal, 'addTestToTestPlan.ids', listTestName,
+                                                self._getIdTestPlanTestFromFolderIdTestName, listTestFolderIds,
+                                                listTestName)
 
         # Create two lists one for the ones that exist and another for the ones that need to be created
         # List of new test folder
@@ -470,41 +493,53 @@ class QC(QC_Project, QC_Connect):
         # Check if test sets exist and update them if necessary or not...
         if updateTestIfExists is True and ignoreTestIfExists is True:
             # Update tests that already exist
-            r.append(self._updateTestList(listOldTestFolderIds, listOldTestTags, listTestId,
-                                          listOldDesignStepsTags, listOldDesignStepsName, listOldTestNames, False))
+            r.append(self._runPhase(journal, plan, 'addTestToTestPlan.update', self._updateTestList,
+                                    listOldTestFolderIds, listOldTestTags, listTestId,
+                                    listOldDesignStepsTags, listOldDesignStepsName, listOldTestNames, False))
 
             # Create missing tests
-            r.append(self._createTestList(listNewTestFolderIds, listNewTestTags, listNewTestPath,
-                                          listNewDesignStepsTags, listNewDesignStepsName, listNewTestNames))
+            r.append(self._runPhase(journal, plan, 'addTestToTestPlan.create', self._createTestList,
+                                    listNewTestFolderIds, listNewTestTags, listNewTestPath,
+                                    listNewDesignStepsTags, listNewDesignStepsName, listNewTestNames,
+                                    journal))
 
         elif updateTestIfExists is True and ignoreTestIfExists is False:
             # Update tests that already exist but delete steps first
-            r.append(self._updateTestList(listOldTestFolderIds, listOldTestTags, listTestId,
-                                          listOldDesignStepsTags, listOldDesignStepsName, listOldTestNames, True))
+            r.append(self._runPhase(journal, plan, 'addTestToTestPlan.update', self._updateTestList,
+                                    listOldTestFolderIds, listOldTestTags, listTestId,
+                                    listOldDesignStepsTags, listOldDesignStepsName, listOldTestNames, True))
 
             # Create missing tests
-            r.append(self._createTestList(listNewTestFolderIds, listNewTestTags, listNewTestPath,
-                                          listNewDesignStepsTags, listNewDesignStepsName, listNewTestNames))
+            r.append(self._runPhase(journal, plan, 'addTestToTestPlan.create', self._createTestList,
+                                    listNewTestFolderIds, listNewTestTags, listNewTestPath,
+                                    listNewDesignStepsTags, listNewDesignStepsName, listNewTestNames,
+                                    journal))
 
         elif updateTestIfExists is False and ignoreTestIfExists is True:
             # Do nothing to test if they exist and create missing tests
-            r.append(self._createTestList(listNewTestFolderIds, listNewTestTags, listNewTestPath,
-                                          listNewDesignStepsTags, listNewDesignStepsName, listNewTestNames)),
+            r.append(self._runPhase(journal, plan, 'addTestToTestPlan.create', self._createTestList,
+                                    listNewTestFolderIds, listNewTestTags, listNewTestPath,
+                                    listNewDesignStepsTags, listNewDesignStepsName, listNewTestNames,
+                                    journal)),
 
         elif updateTestIfExists is False and ignoreTestIfExists is False:
             # Replace test if they exist (delete and create)
-            r.append(self._deleteTestList(listTestId, listTestName))
+            r.append(self._runPhase(journal, plan, 'addTestToTestPlan.delete', self._deleteTestList,
+                                    listTestId, listTestName))
 
             # Create missing tests
-            r.append(self._createTestList(listTestFolderIds, listTestTags, listTestPath,
-                                          listDesignStepsTags, listDesignStepsName, listTestName))
+            r.append(self._runPhase(journal, plan, 'addTestToTestPlan.create', self._createTestList,
+                                    listTestFolderIds, listTestTags, listTestPath,
+                                    listDesignStepsTags, listDesignStepsName, listTestName,
+                                    journal))
 
         logger.debug('addTestToTestPlan: return: %s' % r)
         logger.info('addTestToTestPlan: ...done!')
 
         return r
 
-    def addTestSet(self, sxml, updateTestSetIfExists=True, ignoreTestsetIfExists=False):
+    def addTestSet(self, sxml, updateTestSetIfExists=True, ignoreTestsetIfExists=False, journal=None, plan=None,
+                   metrics=None):
         '''
         Add testsets defined in sxml file
 
@@ -516,10 +551,21 @@ class QC(QC_Project, QC_Connect):
         :param sxml: SXML
         :param updateTestSetIfExists: See function description
         :param ignoreTestsetIfExists: See function description
+        :param journal: QCJournal - phases already done in a previous run of the job are skipped (optional)
+        :param plan: QCPlan - dry run, only read-only calls are done and the writes are added to the plan (optional)
+        :param metrics: QCMetrics - time, requests and entities written of each phase are added to it (optional)
         :return:
         '''
 
         logger.info('addTestSet: Start...')
+
+        # Dry run does not touch the journal
+        if plan is not None:
+            journal = None
+
+        # Requests of all entities are added to the metrics of this import
+        self._setMetrics(metrics)
+
         logger.debug('addTestSet: updateTestSetIfExists: %s' % updateTestSetIfExists)
         logger.debug('addTestSet: ignoreTestsetIfExists: %s' % ignoreTestsetIfExists)
 
@@ -527,10 +573,11 @@ class QC(QC_Project, QC_Connect):
         r = []
 
         # Process data
-        sxmlData = SXml(sxml)
+        with getPhase(self.metrics, 'addTestSet.sxml'):
+            sxmlData = SXml(sxml)
 
-        # Get Test Instance data to add run
-        listTestSetData = sxmlData.getTestSetData()
+            # Get Test Instance data to add run
+            listTestSetData = sxmlData.getTestSetData()
 
         # Get list of testset locaton
         listTestSetLocationXml = listTestSetData['location']
@@ -580,12 +627,15 @@ class QC(QC_Project, QC_Connect):
                 except:
                     pass
 
-        # Get Ids from testset folders in test lab
-        listTestSetFolderIds = self._getIdTestLabTestSetFolderFromPathList(listTestSetPath)
+        # Resolve ids
+        with getPhase(self.metrics, 'addTestSet.ids'):
+            # Get Ids from testset folders in test lab
+            listTestSetFolderIds = self._getIdTestLabTestSetFolderFromPathList(listTestSetPath)
 
-        # First get the list of test sets that exist or not
-        listTestLabTestSetId = self._getIdTestLabTestSetFromFolderIdTestSetName(
-            listTestSetFolderIds, listTestSetName)
+            # First get the list of test sets that exist or not - when resuming use the ones found in the first run
+            listTestLabTestSetId = self._getJournalIdList(journal, 'addTestSet.ids', listTestSetLocation,
+                                                          self._getIdTestLabTestSetFromFolderIdTestSetName,
+                                                          listTestSetFolderIds, listTestSetName)
 
         # Create two lists one for the ones that exist and another for the ones that need to be created
         # List of new testset folder
@@ -631,34 +681,43 @@ class QC(QC_Project, QC_Connect):
         if updateTestSetIfExists is True:
 
             # Update testsets that already exist
-            r.append(self._updateTestSetList(listOldTestSetFolderIds, listOldTestSetTags,
-                                             listTestLabTestSetId, listOldTestSetName))
+            r.append(self._runPhase(journal, plan, 'addTestSet.update', self._updateTestSetList,
+                                    listOldTestSetFolderIds, listOldTestSetTags,
+                                    listTestLabTestSetId, listOldTestSetName))
 
             # Create missing testsets
-            r.append(self._createTestSetList(listNewTestSetFolderIds, listNewTestSetTags,
-                                             listNewTestSetPath, listNewTestSetName))
+            r.append(self._runPhase(journal, plan, 'addTestSet.create', self._createTestSetList,
+                                    listNewTestSetFolderIds, listNewTestSetTags,
+                                    listNewTestSetPath, listNewTestSetName,
+                                    journal))
 
         elif updateTestSetIfExists is False and ignoreTestsetIfExists is True:
 
             # Do nothing to testset if they exist and create missing testsets
-            r.append(self._createTestSetList(listNewTestSetFolderIds, listNewTestSetTags,
-                                             listNewTestSetPath, listNewTestSetName))
+            r.append(self._runPhase(journal, plan, 'addTestSet.create', self._createTestSetList,
+                                    listNewTestSetFolderIds, listNewTestSetTags,
+                                    listNewTestSetPath, listNewTestSetName,
+                                    journal))
 
         elif updateTestSetIfExists is False and ignoreTestsetIfExists is False:
 
             # Replace testset if they exist (delete and create)
-            r.append(self._deleteTestSetList(listTestLabTestSetId, listTestSetName))
+            r.append(self._runPhase(journal, plan, 'addTestSet.delete', self._deleteTestSetList,
+                                    listTestLabTestSetId, listTestSetName))
 
             # Create missing testsets
-            r.append(self._createTestSetList(listNewTestSetFolderIds, listNewTestSetTags,
-                                             listNewTestSetPath, listNewTestSetName))
+            r.append(self._runPhase(journal, plan, 'addTestSet.create', self._createTestSetList,
+                                    listNewTestSetFolderIds, listNewTestSetTags,
+                                    listNewTestSetPath, listNewTestSetName,
+                                    journal))
 
         logger.debug('addTestSet: return: %s' % r)
         logger.info('addTestSet: ...done!')
 
         return r
 
-    def addTestInstanceToTestLab(self, sxml, updateTestInstanceIfExists=True, ignoreTestInstanceIfExists=False):
+    def addTestInstanceToTestLab(self, sxml, updateTestInstanceIfExists=True, ignoreTestInstanceIfExists=False,
+                                 journal=None, plan=None, metrics=None):
         """
         Add Test Instance to Test Lab
         update      ignore
@@ -670,10 +729,21 @@ class QC(QC_Project, QC_Connect):
         :param sxml: Path to xml file containing the standard xml with the test info
         :param updateTestInstanceIfExists: Defines if the test instance when exists is overwritten - Default is False
         :param ignoreTestInstanceIfExists: Defined if the test instance is ignored if it exists - Default is True
+        :param journal: QCJournal - phases already done in a previous run of the job are skipped (optional)
+        :param plan: QCPlan - dry run, only read-only calls are done and the writes are added to the plan (optional)
+        :param metrics: QCMetrics - time, requests and entities written of each phase are added to it (optional)
         :return: Return the http response
         """
 
         logger.info('addTestInstanceToTestLab: Start...')
+
+        # Dry run does not touch the journal
+        if plan is not None:
+            journal = None
+
+        # Requests of all entities are added to the metrics of this import
+        self._setMetrics(metrics)
+
         logger.debug('addTestInstanceToTestLab: updateTestInstanceIfExists: %s' % updateTestInstanceIfExists)
         logger.debug('addTestInstanceToTestLab: ignoreTestInstanceIfExists: %s' % ignoreTestInstanceIfExists)
 
@@ -681,10 +751,11 @@ class QC(QC_Project, QC_Connect):
         r = []
 
         # Process data
-        sxmlData = SXml(sxml)
+        with getPhase(self.metrics, 'addTestInstanceToTestLab.sxml'):
+            sxmlData = SXml(sxml)
 
-        # Get Test Instance data
-        listTestInstanceData = sxmlData.getTestInstancesData()
+            # Get Test Instance data
+            listTestInstanceData = sxmlData.getTestInstancesData()
 
         # Get list of test location
         listSourceTestInstancePathXml = listTestInstanceData['location']
@@ -730,23 +801,32 @@ class QC(QC_Project, QC_Connect):
                 except:
                     pass
 
-        # Get Ids from tests in test plan
-        listTestPlanTestIds = self._getIdTestPlanTestFromPathList(listSourceTestPath)
+        # Resolve ids
+        with getPhase(self.metrics, 'addTestInstanceToTestLab.ids'):
+            # Get Ids from tests in test plan
+            listTestPlanTestIds = self._getIdTestPlanTestFromPathList(listSourceTestPath)
 
-        # Remove Root from the beginning of the lab paths
-        for index, path in enumerate(listTargetTestsetPath):
+            # Remove Root from the beginning of the lab paths
+            for index, path in enumerate(listTargetTestsetPath):
 
-            if 'Root' not in path:
-                self._raiseError('_createTestSetList', 'Invalid testset path - Missing \'Root\': ' + path + '!')
+                if 'Root' not in path:
+                    self._raiseError('_createTestSetList', 'Invalid testset path - Missing \'Root\': ' + path + '!')
+
+                listTargetTestsetPath[index] = path[5:]
 
-            listTargetTestsetPath[index] = path[5:]
+            # Get Ids from testsets in test lab
+            listTestLabTestsetIds = self._getIdTestLabTestSetFromPathList(listTargetTestsetPath)
 
-        # Get Ids from testsets in test lab
-        listTestLabTestsetIds = self._getIdTestLabTestSetFromPathList(listTargetTestsetPath)
+            # Get Ids of Test Instances that already exist - when resuming use the ones found in the first run
+            # In plan mode tests and testsets can be created by the previous phases of the import
+            if plan is None:
+                getTestInstanceIds = self._getIdTestLabTestInstancesFromTestsetIdTestId
+            else:
+                getTestInstanceIds = self._getIdTestLabTestInstancesFromKnownIds
 
-        # Get Ids of Test Instances that already exist
-        listTestLabTestInstanceId = self._getIdTestLabTestInstancesFromTestsetIdTestId(
-            listTestLabTestsetIds, listTestPlanTestIds)
+            listTestLabTestInstanceId = self._getJournalIdList(journal, 'addTestInstanceToTestLab.ids',
+                                                               listSourceTestInstancePath, getTestInstanceIds,
+                                                               listTestLabTestsetIds, listTestPlanTestIds)
 
         # Create two lists, one for the ones that already exist and the others
         # List of old test instance testset ids
@@ -789,56 +869,82 @@ class QC(QC_Project, QC_Connect):
         if updateTestInstanceIfExists is True and ignoreTestInstanceIfExists is True:
 
             # Delete test instance if exists and add a new one
-            r.append(self._deleteTestInstanceList(listTestLabTestInstanceId, listSourceTestName))
+            r.append(self._runPhase(journal, plan, 'addTestInstanceToTestLab.delete', self._deleteTestInstanceList,
+                                    listTestLabTestInstanceId, listSourceTestName))
 
             # Create test instance list
-            r.append(self._createTestInstance(listTestLabTestsetIds, listTestPlanTestIds,
-                                              listTagsTestInstance, listSourceTestName))
+            r.append(self._runPhase(journal, plan, 'addTestInstanceToTestLab.create', self._createTestInstance,
+                                    listTestLabTestsetIds, listTestPlanTestIds,
+                                    listTagsTestInstance, listSourceTestName,
+                                    journal))
 
         elif updateTestInstanceIfExists is False and ignoreTestInstanceIfExists is True:
 
             # Do nothing to test instance if they exist and create new
-            r.append(self._createTestInstance(listNewTestLabTestsetIds, listNewTestPlanTestIds,
-                                              listNewTagsTestInstance, listNewNameTest))
+            r.append(self._runPhase(journal, plan, 'addTestInstanceToTestLab.create', self._createTestInstance,
+                                    listNewTestLabTestsetIds, listNewTestPlanTestIds,
+                                    listNewTagsTestInstance, listNewNameTest,
+                                    journal))
 
         elif updateTestInstanceIfExists is True and ignoreTestInstanceIfExists is False:
 
             # Update old and create new
-            r.append(self._updateTestInstance(listOldTestLabTestsetIds, listOldTestPlanTestIds,
-                                              listOldTagsTestInstance, listOldTestLabTestInstanceId,
-                                              listOldNameTest))
+            r.append(self._runPhase(journal, plan, 'addTestInstanceToTestLab.update', self._updateTestInstance,
+                                    listOldTestLabTestsetIds, listOldTestPlanTestIds,
+                                    listOldTagsTestInstance, listOldTestLabTestInstanceId,
+                                    listOldNameTest))
 
             # Create new
-            r.append(self._createTestInstance(listNewTestLabTestsetIds, listNewTestPlanTestIds,
-                                              listNewTagsTestInstance, listNewNameTest))
+            r.append(self._runPhase(journal, plan, 'addTestInstanceToTestLab.create', self._createTestInstance,
+                                    listNewTestLabTestsetIds, listNewTestPlanTestIds,
+                                    listNewTagsTestInstance, listNewNameTest,
+                                    journal))
 
         elif updateTestInstanceIfExists is False and ignoreTestInstanceIfExists is False:
             # Adds a new test instance if one already exists
-            r.append(self._createTestInstance(listTestLabTestsetIds, listTestPlanTestIds,
-                                              listTagsTestInstance, listSourceTestName))
+            r.append(self._runPhase(journal, plan, 'addTestInstanceToTestLab.create', self._createTestInstance,
+                                    listTestLabTestsetIds, listTestPlanTestIds,
+                                    listTagsTestInstance, listSourceTestName,
+                                    journal))
 
         logger.debug('addTestInstanceToTestLab: return: %s' % r)
         logger.info('addTestInstanceToTestLab: ...done!')
 
         return r
 
-    def addTestRunToTestLab(self, sxml):
+    def addTestRunToTestLab(self, sxml, journal=None, plan=None, metrics=None):
         '''
         Add test run to test lab based on info provided in the sxml
+
+        With a journal the ids of the runs created are saved after each chunk of journalChunkSize runs is posted, so
+        if the job is interrupted (e.g. while posting the runs or updating the run steps) a new run of the job does not
+        create the runs again and only updates the steps of the runs not done yet (in chunks of journalChunkSize runs)
+
         :param sxml: SXml file path
+        :param journal: QCJournal - phases already done in a previous run of the job are skipped (optional)
+        :param plan: QCPlan - dry run, only read-only calls are done and the writes are added to the plan (optional)
+        :param metrics: QCMetrics - time, requests and entities written of each phase are added to it (optional)
         :return:
         '''
 
         logger.info('addTestRunToTestLab: Start...')
 
+        # Dry run does not touch the journal
+        if plan is not None:
+            journal = None
+
+        # Requests of all entities are added to the metrics of this import
+        self._setMetrics(metrics)
+
         # Request responses
         req = []
 
         # Process data
-        sxmlData = SXml(sxml)
+        with getPhase(self.metrics, 'addTestRunToTestLab.sxml'):
+            sxmlData = SXml(sxml)
 
-        # Get Test Instance data to add run
-        listTestInstanceRunData = sxmlData.getTestInstancesRunData()
+            # Get Test Instance data to add run
+            listTestInstanceRunData = sxmlData.getTestInstancesRunData()
 
         # Get list of run steps tags
         listRunStepsTags = listTestInstanceRunData['runstepstags']
@@ -857,140 +963,230 @@ class QC(QC_Project, QC_Connect):
             logger.warn('addTestRunToTestLab: No test instance found in sxml!')
             return req
 
-        # Get Ids from tests in test plan
-        listTestPlanTestIds = self._getIdTestPlanTestFromPathList(listSourceTestPath)
+        # Resolve ids
+        with getPhase(self.metrics, 'addTestRunToTestLab.ids'):
+            # Get Ids from tests in test plan
+            listTestPlanTestIds = self._getIdTestPlanTestFromPathList(listSourceTestPath)
 
-        # Check if test plan ids are None
-        if None in listTestPlanTestIds:
-            listOfNamesOfMissingTests = set([listSourceTestName[idx] for idx, e in enumerate(listTestPlanTestIds) if
-                                             e is None])
+            # Check if test plan ids are None - in plan mode they can be created by the previous phases of the import
+            if None in listTestPlanTestIds and plan is None:
+                listOfNamesOfMissingTests = set([listSourceTestName[idx] for idx, e in enumerate(listTestPlanTestIds) if
+                                                 e is None])
 
-            self._raiseError('addTestRunToTestLab', 'Following tests do not exist: %s' % listOfNamesOfMissingTests)
+                self._raiseError('addTestRunToTestLab', 'Following tests do not exist: %s' % listOfNamesOfMissingTests)
 
-        # Remove Root from the beginning of the lab paths
-        for index, path in enumerate(listTargetTestsetPath):
+            # Remove Root from the beginning of the lab paths
+            for index, path in enumerate(listTargetTestsetPath):
 
-            if 'Root' not in path:
-                self._raiseError('addTestRunToTestLab', 'Invalid testset path - Missing \'Root\': ' + path + '!')
+                if 'Root' not in path:
+                    self._raiseError('addTestRunToTestLab', 'Invalid testset path - Missing \'Root\': ' + path + '!')
 
-            listTargetTestsetPath[index] = path[5:]
+                listTargetTestsetPath[index] = path[5:]
 
-        # Get Ids from testsets in test lab
-        listTestLabTestsetIds = self._getIdTestLabTestSetFromPathList(listTargetTestsetPath)
+            # Get Ids from testsets in test lab
+            listTestLabTestsetIds = self._getIdTestLabTestSetFromPathList(listTargetTestsetPath)
 
-        # Check if test plan ids are None
-        if None in listTestLabTestsetIds:
-            listOfNamesOfMissingTestsets = set([listTargetTestsetPath[idx] for idx, e in
-                                                enumerate(listTestLabTestsetIds) if e is None])
+            # Check if test plan ids are None
+            if None in listTestLabTestsetIds and plan is None:
+                listOfNamesOfMissingTestsets = set([listTargetTestsetPath[idx] for idx, e in
+                                                    enumerate(listTestLabTestsetIds) if e is None])
 
-            self._raiseError('addTestRunToTestLab',
-                             'Following test sets do not exist: %s' % listOfNamesOfMissingTestsets)
+                self._raiseError('addTestRunToTestLab',
+                                 'Following test sets do not exist: %s' % listOfNamesOfMissingTestsets)
 
-        # Get Ids of Test Instances that already exist
-        listTestLabTestInstanceId = self._getIdTestLabTestInstancesFromTestsetIdTestId(
-            listTestLabTestsetIds, listTestPlanTestIds)
+            # Get Ids of Test Instances that already exist
+            if plan is None:
+                listTestLabTestInstanceId = self._getIdTestLabTestInstancesFromTestsetIdTestId(
+                    listTestLabTestsetIds, listTestPlanTestIds)
+            else:
+                listTestLabTestInstanceId = self._getIdTestLabTestInstancesFromKnownIds(
+                    listTestLabTestsetIds, listTestPlanTestIds)
+
+            # Raise error in case tests are missing
+            if None in listTestLabTestInstanceId and plan is None:
+                testInstanceMissing = set([e for idx, e in enumerate(listSourceTestName) if
+                                           listTestLabTestInstanceId[idx] == None])
+
+                self._raiseError('addTestRunToTestLab', 'TestInstance missing: %s' % testInstanceMissing)
+
+                logger.debug('addTestRunToTestLab: return: %s' % None)
+                logger.info('addTestRunToTestLab: ...done!')
+
+        # Build the run collection
+        with getPhase(self.metrics, 'addTestRunToTestLab.build'):
+            # Add test run
+            # Get Required Fields
+            testLabRunTemplateXml = self.TestLabRuns.getEntityDataTemplate()
+
+            # Add mandatory - Not required fields
+            testLabRunTemplateXml = self.TestLabRuns.addEntityDataFieldValue(
+                'subtype-id', 'hp.qc.run.MANUAL', testLabRunTemplateXml)
+
+            # Build run list
+            testLabRunXmlList = []
+            listTestPlanTestIdsToBeUpdate = []
+            listTestLabTestInstanceIdToBeUpdate = []
+            listTestLabTestsetIdsToBeUpdate = []
+            listTagsTestInstanceRunToBeUpdate = []
+            listSourceTestNameToBeUpdate = []
+            listRunStepsTagsToBeUpdate = []
+
+            for testPlanTestId, testLabTestInstanceId, testLabTestsetId, tagsTestInstanceRun, testName, runStepTags in itertools.izip(
+                    listTestPlanTestIds, listTestLabTestInstanceId, listTestLabTestsetIds, listTagsTestInstanceRun,
+                    listSourceTestName, listRunStepsTags):
+
+                if len(tagsTestInstanceRun) == 0:
+                    logger.warn('addTestRunToTestLab: No test instance run info found in sxml for test %s!' % testName)
+                    continue
 
-        # Raise error in case tests are missing
-        if None in listTestLabTestInstanceId:
-            testInstanceMissing = set([e for idx, e in enumerate(listSourceTestName) if
-                                       listTestLabTestInstanceId[idx] == None])
+                listTestPlanTestIdsToBeUpdate.append(testPlanTestId)
+                listTestLabTestInstanceIdToBeUpdate.append(testLabTestInstanceId)
+                listTestLabTestsetIdsToBeUpdate.append(testLabTestsetId)
+                listTagsTestInstanceRunToBeUpdate.append(tagsTestInstanceRun)
+                listSourceTestNameToBeUpdate.append(testName)
+                listRunStepsTagsToBeUpdate.append(runStepTags)
 
-            self._raiseError('addTestRunToTestLab', 'TestInstance missing: %s' % testInstanceMissing)
+                # Create copy
+                testLabRunXml = testLabRunTemplateXml
 
-            logger.debug('addTestRunToTestLab: return: %s' % None)
-            logger.info('addTestRunToTestLab: ...done!')
+                # Update necessary fields
+                # Test Id
+                testLabRunXml = self.TestLabRuns.addEntityDataFieldValue(
+                    'test-id', testPlanTestId, testLabRunXml)
+                # Test Instance
+                testLabRunXml = self.TestLabRuns.addEntityDataFieldValue(
+                    'testcycl-id', testLabTestInstanceId, testLabRunXml)
+                # Test Set
+                testLabRunXml = self.TestLabRuns.addEntityDataFieldValue(
+                    'cycle-id', testLabTestsetId, testLabRunXml)
 
-        # Add test run
-        # Get Required Fields
-        testLabRunTemplateXml = self.TestLabRuns.getEntityDataTemplate()
+                # Update remaining fields by iterating through the dictionary entries
+                for field, value in tagsTestInstanceRun.iteritems():
 
-        # Add mandatory - Not required fields
-        testLabRunTemplateXml = self.TestLabRuns.addEntityDataFieldValue(
-            'subtype-id', 'hp.qc.run.MANUAL', testLabRunTemplateXml)
+                    # Status cannot be updated here or test instance will not reflect the run status
+                    if field == 'status':
+                        continue
 
-        # Build test collection
-        testLabRunCollection = None
-        listTestPlanTestIdsToBeUpdate = []
-        listTestLabTestInstanceIdToBeUpdate = []
-        listTestLabTestsetIdsToBeUpdate = []
-        listTagsTestInstanceRunToBeUpdate = []
-        listSourceTestNameToBeUpdate = []
-        listRunStepsTagsToBeUpdate = []
-
-        for testPlanTestId, testLabTestInstanceId, testLabTestsetId, tagsTestInstanceRun, testName, runStepTags in itertools.izip(
-                listTestPlanTestIds, listTestLabTestInstanceId, listTestLabTestsetIds, listTagsTestInstanceRun,
-                listSourceTestName, listRunStepsTags):
-
-            if len(tagsTestInstanceRun) == 0:
-                logger.warn('addTestRunToTestLab: No test instance run info found in sxml for test %s!' % testName)
-                continue
+                    testLabRunXml = self.TestLabTestInstances.addEntityDataFieldValue(
+                        field, value, testLabRunXml)
 
-            listTestPlanTestIdsToBeUpdate.append(testPlanTestId)
-            listTestLabTestInstanceIdToBeUpdate.append(testLabTestInstanceId)
-            listTestLabTestsetIdsToBeUpdate.append(testLabTestsetId)
-            listTagsTestInstanceRunToBeUpdate.append(tagsTestInstanceRun)
-            listSourceTestNameToBeUpdate.append(testName)
-            listRunStepsTagsToBeUpdate.append(runStepTags)
+                # Add to list
+                testLabRunXmlList.append(testLabRunXml)
 
-            # Create copy
-            testLabRunXml = testLabRunTemplateXml
+        if len(listSourceTestNameToBeUpdate) == 0:
+            logger.warn('addTestRunToTestLab: No test instance run info found in sxml!')
+            return req
 
-            # Update necessary fields
-            # Test Id
-            testLabRunXml = self.TestLabRuns.addEntityDataFieldValue(
-                'test-id', testPlanTestId, testLabRunXml)
-            # Test Instance
-            testLabRunXml = self.TestLabRuns.addEntityDataFieldValue(
-                'testcycl-id', testLabTestInstanceId, testLabRunXml)
-            # Test Set
-            testLabRunXml = self.TestLabRuns.addEntityDataFieldValue(
-                'cycle-id', testLabTestsetId, testLabRunXml)
+        # Dry run: runs are created, updated with the status and then each run step is updated
+        if plan is not None:
+            runFieldDict = {'test-id': '0' * 6, 'testcycl-id': '0' * 6, 'cycle-id': '0' * 6}
 
-            # Update remaining fields by iterating through the dictionary entries
-            for field, value in tagsTestInstanceRun.iteritems():
+            self._planEntityCollection(plan, self.TestLabRuns, 'create', listTagsTestInstanceRunToBeUpdate,
+                                       runFieldDict)
+            runFieldDict['id'] = '0' * 6
+            self._planEntityCollection(plan, self.TestLabRuns, 'update', listTagsTestInstanceRunToBeUpdate,
+                                       runFieldDict)
+            self._planEntityCollection(plan, self.TestLabRunStep, 'update',
+                                       [runST for runStepsTags in listRunStepsTagsToBeUpdate for runST in runStepsTags],
+                                       {'parent-id': '0' * 6, 'id': '0' * 6}, 1)
 
-                # Status cannot be updated here or test instance will not reflect the run status
-                if field == 'status':
-                    continue
+            logger.info('addTestRunToTestLab: ...done (plan)!')
 
-                testLabRunXml = self.TestLabTestInstances.addEntityDataFieldValue(
-                    field, value, testLabRunXml)
+            return req
 
-            # Add to collection
-            testLabRunCollection = self.TestLabRuns.addEntityDataToCollection(testLabRunXml, testLabRunCollection)
+        with getPhase(self.metrics, 'addTestRunToTestLab.runs'):
+            # Add run to test instance in testlab - runs already created by an interrupted run of the job (journal)
+            # are not posted again
+            logger.info('addTestRunToTestLab: Adding run to tests: %s' % listSourceTestNameToBeUpdate)
+            r, newRunDict = self._postEntityCollectionJournal(journal, 'addTestRunToTestLab.postRuns', self.TestLabRuns,
+                                                              testLabRunXmlList, listTestLabTestInstanceIdToBeUpdate,
+                                                              ['id', 'testcycl-id'])
+            logger.info('addTestRunToTestLab: Adding run to tests done!')
+            req.append(r)
 
-        if len(listSourceTestNameToBeUpdate) == 0:
-            logger.warn('addTestRunToTestLab: No test instance run info found in sxml!')
-            return req
+            # Get ids from runs created ad update these with the correct status so that the test instance can
+            # reflect the correct test status
+            idList = newRunDict['id']
 
-        # Add run to test instance in testlab
-        logger.info('addTestRunToTestLab: Adding run to tests: %s' % listSourceTestNameToBeUpdate)
-        r = self.TestLabRuns.postEntityCollection(testLabRunCollection)
-        logger.info('addTestRunToTestLab: Adding run to tests done!')
-        req.append(r)
+            # Order list
+            idListOrd = []
 
-        # Get ids from runs created ad update these with the correct status so that the test instance can reflect the
-        # correct test status
-        xml = self._getXmlFromRequestQueryList(r)
-        idList = self.TestLabRuns.getEntityDataCollectionFieldValue('id', xml)
+            testInstanceIdList = newRunDict['testcycl-id']
 
-        # Order list
-        idListOrd = []
+            for testLabTestInstanceId in listTestLabTestInstanceIdToBeUpdate:
+
+                for idx, testInstanceId in enumerate(testInstanceIdList):
+
+                    if testInstanceId == testLabTestInstanceId:
+                        idListOrd.append(idList[idx])
+
+        # Run status already updated in a previous run of the job
+        if journal is not None and journal.isDone('addTestRunToTestLab.putRuns'):
+            runIdsOrd = journal.getData('addTestRunToTestLab.putRuns')
 
-        testInstanceIdList = self.TestLabRuns.getEntityDataCollectionFieldValue('testcycl-id', xml)
+            logger.info('addTestRunToTestLab: Run status already updated (journal)')
 
-        for testLabTestInstanceId in listTestLabTestInstanceIdToBeUpdate:
+        else:
+            with getPhase(self.metrics, 'addTestRunToTestLab.status'):
+                r, runIdsOrd = self._updateRunStatusList(testLabRunTemplateXml, listTestPlanTestIdsToBeUpdate,
+                                                         listTestLabTestInstanceIdToBeUpdate,
+                                                         listTestLabTestsetIdsToBeUpdate,
+                                                         listTagsTestInstanceRunToBeUpdate, idListOrd,
+                                                         listSourceTestNameToBeUpdate)
+            req.append(r)
 
-            for idx, testInstanceId in enumerate(testInstanceIdList):
+            if journal is not None:
+                journal.setDone('addTestRunToTestLab.putRuns', runIdsOrd)
 
-                if testInstanceId == testLabTestInstanceId:
-                    idListOrd.append(idList[idx])
+        # Update run steps in chunks so that an interrupted job resumes from the last chunk done
+        chunkSize = self.journalChunkSize if journal is not None else max(1, len(runIdsOrd))
+
+        r = []
+        for start in xrange(0, len(runIdsOrd), chunkSize):
+
+            phase = 'addTestRunToTestLab.runSteps.%d' % start
+
+            if journal is not None and journal.isDone(phase):
+                logger.info('addTestRunToTestLab: Run steps of runs %s already updated (journal)' %
+                            runIdsOrd[start:start + chunkSize])
+                continue
+
+            with getPhase(self.metrics, 'addTestRunToTestLab.steps'):
+                r.extend(self._updateRunStepsList(runIdsOrd[start:start + chunkSize],
+                                                  listRunStepsTagsToBeUpdate[start:start + chunkSize],
+                                                  listSourceTestNameToBeUpdate[start:start + chunkSize]))
+
+            if journal is not None:
+                journal.setDone(phase)
+
+        req.append(r)
+
+        logger.debug('addTestRunToTestLab: return: %s' % r)
+        logger.info('addTestRunToTestLab: ...done!')
+
+        return req
+
+    def _updateRunStatusList(self, testLabRunTemplateXml, listTestPlanTestIds, listTestLabTestInstanceIds,
+                             listTestLabTestsetIds, listTagsTestInstanceRun, runIdList, listSourceTestName):
+        '''
+        Update the runs created with their fields (status included) so that the test instance reflects the run status
+        :param testLabRunTemplateXml: Run template xml
+        :param listTestPlanTestIds: List of test ids of the runs
+        :param listTestLabTestInstanceIds: List of test instance ids of the runs
+        :param listTestLabTestsetIds: List of testset ids of the runs
+        :param listTagsTestInstanceRun: List of run tags
+        :param runIdList: List of run ids
+        :param listSourceTestName: List of test names
+        :return: Responses and run ids ordered as listTestLabTestInstanceIds
+        '''
+
+        logger.info('_updateRunStatusList: Start...')
 
         # Build run collection to be updated
         testLabRunCollection = None
         for testPlanTestId, testLabTestInstanceId, testLabTestsetId, tagsTestInstanceRun, id in itertools.izip(
-                listTestPlanTestIdsToBeUpdate, listTestLabTestInstanceIdToBeUpdate, listTestLabTestsetIdsToBeUpdate,
-                listTagsTestInstanceRunToBeUpdate, idListOrd):
+                listTestPlanTestIds, listTestLabTestInstanceIds, listTestLabTestsetIds, listTagsTestInstanceRun,
+                runIdList):
 
             # Create copy
             testLabRunXml = testLabRunTemplateXml
@@ -1017,10 +1213,9 @@ class QC(QC_Project, QC_Connect):
             testLabRunCollection = self.TestLabRuns.addEntityDataToCollection(testLabRunXml, testLabRunCollection)
 
         # Update run to test instance in testlab
-        logger.info('addTestRunToTestLab: Update run status of tests: %s' % listSourceTestNameToBeUpdate)
+        logger.info('_updateRunStatusList: Update run status of tests: %s' % listSourceTestName)
         r = self.TestLabRuns.putEntityCollection(testLabRunCollection)
-        logger.info('addTestRunToTestLab: Update run status of tests done!')
-        req.append(r)
+        logger.info('_updateRunStatusList: Update run status of tests done!')
 
         # If successful get the run IDs and TestInstance Ids
         xml = self._getXmlFromRequestQueryList(r)
@@ -1030,23 +1225,18 @@ class QC(QC_Project, QC_Connect):
         # Order Ids list according to the info in the xml so that we can match the values
         # This ordering is based on the already ordered list listTestLabTestInstanceIds
         runIdsOrd = []
-        runTestInstanceIdsOrd = []
-        for testLabTestInstanceId in listTestLabTestInstanceIdToBeUpdate:
+        for testLabTestInstanceId in listTestLabTestInstanceIds:
 
             # First check if it exists
             if testLabTestInstanceId in runTestInstanceIds:
                 position = runTestInstanceIds.index(testLabTestInstanceId)
 
                 runIdsOrd.append(runIds[position])
-                runTestInstanceIdsOrd.append(runTestInstanceIds[position])
-
-        r = self._updateRunStepsList(runIdsOrd, listRunStepsTagsToBeUpdate, listSourceTestNameToBeUpdate)
-        req.append(r)
 
-        logger.debug('addTestRunToTestLab: return: %s' % r)
-        logger.info('addTestRunToTestLab: ...done!')
+        logger.debug('_updateRunStatusList: return: %s' % r)
+        logger.info('_updateRunStatusList: ...done!')
 
-        return req
+        return r, runIdsOrd
 
     def _updateTestList(self, listTestFolderIds, listTestTags, listTestId, listDesignStepsTags,
                         listDesignStepsName, listTestName, deleteSteps):
@@ -1124,7 +1314,9 @@ class QC(QC_Project, QC_Connect):
         logger.info('_updateTestList: Updating tests done!')
 
         # Add Design Steps
-        r.append(self._addDesignSteps(listTestId, listDesignStepsTags, listDesignStepsName, listTestName, deleteSteps))
+        with getPhase(self.metrics, 'steps'):
+            r.append(self._addDesignSteps(listTestId, listDesignStepsTags, listDesignStepsName, listTestName,
+                                          deleteSteps))
 
         logger.debug('_updateTestList: return: %s' % r)
         logger.info('_updateTestList: ...done!')
@@ -1132,13 +1324,14 @@ class QC(QC_Project, QC_Connect):
         return r
 
     def _createTestList(self, listTestFolderIds, listTestTags, listTestPath, listDesignStepsTags,
-                        listDesignStepsName, listTestName):
+                        listDesignStepsName, listTestName, journal=None):
         '''
         Create test based on the test folder ids and test tags
         :param listTestTags:  Test folder ids - None indicates a test folder not created
         :param listTestPath: List of test path information
         :param listDesignStepsTags: List of design steps field information
         :param listDesignStepsName: List of design steps name
+        :param journal: QCJournal - tests created by an interrupted run of the job are not created again (optional)
         :return:
         '''
 
@@ -1160,10 +1353,11 @@ class QC(QC_Project, QC_Connect):
         testFoldersMissing = [elem for index, elem in enumerate(listTestPath)
                               if not listTestFolderIds[index]]
 
-        self._addTestFolderList(testFoldersMissing)
+        with getPhase(self.metrics, 'folders'):
+            self._addTestFolderList(testFoldersMissing)
 
-        # Get Ids from test folders in test lab
-        listTestFolderIds = self._getIdTestPlanFolderFromPathList(listTestPath)
+            # Get Ids from test folders in test lab
+            listTestFolderIds = self._getIdTestPlanFolderFromPathList(listTestPath)
 
         # Add test
         # Get Required Fields
@@ -1173,8 +1367,8 @@ class QC(QC_Project, QC_Connect):
         testPlanTestTemplateXml = self.TestPlanTests.addEntityDataFieldValue(
             'subtype-id', 'MANUAL', testPlanTestTemplateXml)
 
-        # Build test collection
-        testPlanTestCollection = None
+        # Build test list
+        testPlanTestXmlList = []
         for testTags, testPlanTestFolderId in itertools.izip(listTestTags, listTestFolderIds):
 
             # Create copy
@@ -1189,23 +1383,21 @@ class QC(QC_Project, QC_Connect):
                 testPlanTestXml = self.TestPlanTests.addEntityDataFieldValue(
                     field, value, testPlanTestXml)
 
-            # Add to collection
-            testPlanTestCollection = self.TestPlanTests.addEntityDataToCollection(
-                testPlanTestXml, testPlanTestCollection)
+            # Add to list
+            testPlanTestXmlList.append(testPlanTestXml)
 
         # Add test
         logger.info('_createTestList: Creating test list: %s!' % listTestName)
-        r = self.TestPlanTests.postEntityCollection(testPlanTestCollection)
+        r, newTestDict = self._postEntityCollectionJournal(journal, 'addTestToTestPlan.create', self.TestPlanTests,
+                                                           testPlanTestXmlList, listTestName,
+                                                           ['id', 'parent-id', 'name'])
         logger.info('_createTestList: Creating test list done!')
 
         # Add Design steps
         # If successful get the test IDs
-        xml = self._getXmlFromRequestQueryList(r)
-        newTestIdList = self.TestPlanTests.getEntityDataCollectionFieldValue('id', xml)
-        newTestFolderIdList = self.TestPlanTests.getEntityDataCollectionFieldValue('parent-id', xml)
-        newTestNameList = self.TestPlanTests.getEntityDataCollectionFieldValue('name', xml)
-
-        logger.debug('_createTestList: xml: %s' % xml)
+        newTestIdList = newTestDict['id']
+        newTestFolderIdList = newTestDict['parent-id']
+        newTestNameList = newTestDict['name']
 
         # Order Ids list according to the info in the xml so that we can match the values
         # This ordering is based on the already ordered list listTestLabTestInstanceIds
@@ -1218,7 +1410,8 @@ class QC(QC_Project, QC_Connect):
                 if newTestFolderId == testFolderId and newTestName == testName:
                     testIdsOrd.append(newTestId)
 
-        r = self._addDesignSteps(testIdsOrd, listDesignStepsTags, listDesignStepsName, listTestName, False)
+        with getPhase(self.metrics, 'steps'):
+            r = self._addDesignSteps(testIdsOrd, listDesignStepsTags, listDesignStepsName, listTestName, False)
 
         logger.debug('_createTestList: return: %s' % r)
         logger.info('_createTestList: ...done!')
@@ -1626,12 +1819,14 @@ class QC(QC_Project, QC_Connect):
 
         return r
 
-    def _createTestSetList(self, listNewTestSetFolderIds, listNewTestSetTags, listNewTestSetPath, listTestSetName):
+    def _createTestSetList(self, listNewTestSetFolderIds, listNewTestSetTags, listNewTestSetPath, listTestSetName,
+                           journal=None):
         '''
         Create testset based on the testset folder ids and testset tags
         :param listNewTestSetFolderIds:  Testset folder ids - None indicates a testset folder not created
         :param listNewTestSetTags: List of test set field information
         :param listNewTestSetPath: List of test set path information
+        :param journal: QCJournal - testsets created by an interrupted run of the job are not created again (optional)
         :return:
         '''
 
@@ -1653,10 +1848,11 @@ class QC(QC_Project, QC_Connect):
         testsetFoldersMissing = [elem for index, elem in enumerate(listNewTestSetPath)
                                  if not listNewTestSetFolderIds[index]]
 
-        self._addTestSetFolderList(testsetFoldersMissing)
+        with getPhase(self.metrics, 'folders'):
+            self._addTestSetFolderList(testsetFoldersMissing)
 
-        # Get Ids from testset folders in test lab
-        listNewTestSetFolderIds = self._getIdTestLabTestSetFolderFromPathList(listNewTestSetPath)
+            # Get Ids from testset folders in test lab
+            listNewTestSetFolderIds = self._getIdTestLabTestSetFolderFromPathList(listNewTestSetPath)
 
         # Add testset
         # Get Required Fields
@@ -1666,8 +1862,8 @@ class QC(QC_Project, QC_Connect):
         testLabTestSetTemplateXml = self.TestLabTestSets.addEntityDataFieldValue(
             'subtype-id', 'hp.qc.test-set.default', testLabTestSetTemplateXml)
 
-        # Build testSet collection
-        testLabTestSetCollection = None
+        # Build testSet list
+        testLabTestSetXmlList = []
         for testSetTags, testLabTestSetFolderId in itertools.izip(listNewTestSetTags, listNewTestSetFolderIds):
 
             # Create copy
@@ -1682,13 +1878,13 @@ class QC(QC_Project, QC_Connect):
                 testLabTestSetXml = self.TestLabTestSets.addEntityDataFieldValue(
                     field, value, testLabTestSetXml)
 
-            # Add to collection
-            testLabTestSetCollection = self.TestLabTestSets.addEntityDataToCollection(
-                testLabTestSetXml, testLabTestSetCollection)
+            # Add to list
+            testLabTestSetXmlList.append(testLabTestSetXml)
 
         # Add testset
         logger.info('_createTestSetList: Creating testsets: %s!' % listTestSetName)
-        r = self.TestLabTestSets.postEntityCollection(testLabTestSetCollection)
+        r, _ = self._postEntityCollectionJournal(journal, 'addTestSet.create', self.TestLabTestSets,
+                                                 testLabTestSetXmlList, listTestSetName, ['id'])
         logger.info('_createTestSetList: Creating testsets done!')
         req.append(r)
 
@@ -1799,7 +1995,18 @@ class QC(QC_Project, QC_Connect):
 
         return r
 
-    def _createTestInstance(self, listTestLabTestsetIds, listTestPlanTestIds, listTagsTestInstance, testNameList):
+    def _createTestInstance(self, listTestLabTestsetIds, listTestPlanTestIds, listTagsTestInstance, testNameList,
+                            journal=None):
+        '''
+        Create test instances of the test plan tests in the testsets
+        :param listTestLabTestsetIds: testset id of each test instance
+        :param listTestPlanTestIds: test plan test id of each test instance
+        :param listTagsTestInstance: test instance fields
+        :param testNameList: test names
+        :param journal: QCJournal - test instances created by an interrupted run of the job are not created again
+        (optional)
+        :return:
+        '''
 
         logger.info('_createTestInstance: Start...')
         logger.debug('_createTestInstance: listTestLabTestsetIds: %s' % listTestLabTestsetIds)
@@ -1830,8 +2037,8 @@ class QC(QC_Project, QC_Connect):
         testPlanTestsTemplateXml = self.TestPlanTests.addEntityDataFieldValue(
             'test-order', '1', testPlanTestsTemplateXml)
 
-        # Now create the test instance xml collection to be posted
-        testInstanceCollection = None
+        # Now create the test instance xml list to be posted
+        testInstanceXmlList = []
         for testPlanTestId, testLabTestsetId, tagsTestInstance in itertools.izip(
                 listTestPlanTestIds, listTestLabTestsetIds, listTagsTestInstance):
             # Create copy
@@ -1855,12 +2062,12 @@ class QC(QC_Project, QC_Connect):
                 testLabTestInstanceXml = self.TestLabTestInstances.addEntityDataFieldValue(
                     field, value, testLabTestInstanceXml)
 
-            testInstanceCollection = self.TestLabTestInstances.addEntityDataToCollection(
-                testLabTestInstanceXml, testInstanceCollection)
+            testInstanceXmlList.append(testLabTestInstanceXml)
 
         # Create test instance in testlab
         logger.info('_createTestInstance: Create test instances: %s' % testNameList)
-        r = self.TestLabTestInstances.postEntityCollection(testInstanceCollection)
+        r, _ = self._postEntityCollectionJournal(journal, 'addTestInstanceToTestLab.create', self.TestLabTestInstances,
+                                                 testInstanceXmlList, testNameList, ['id'])
         logger.info('_createTestInstance: Create test instances done!')
 
         logger.debug('_createTestInstance: return: %s' % r)
@@ -3202,6 +3409,31 @@ class QC(QC_Project, QC_Connect):
 
         return testInstanceIds
 
+    def _getIdTestLabTestInstancesFromKnownIds(self, testSetList, testList):
+        '''
+        Same as _getIdTestLabTestInstancesFromTestsetIdTestId but testset and test ids can be None (not created yet),
+        in this case None is returned in the list
+        :param testSetList:
+        :param testList:
+        :return:
+        '''
+
+        testInstanceIds = [None] * len(testSetList)
+
+        knownIndexList = [index for index, (testSetId, testId) in enumerate(itertools.izip(testSetList, testList))
+                          if testSetId and testId]
+
+        if len(knownIndexList) == 0:
+            return testInstanceIds
+
+        knownTestInstanceIds = self._getIdTestLabTestInstancesFromTestsetIdTestId(
+            [testSetList[index] for index in knownIndexList], [testList[index] for index in knownIndexList])
+
+        for index, testInstanceId in itertools.izip(knownIndexList, knownTestInstanceIds):
+            testInstanceIds[index] = testInstanceId
+
+        return testInstanceIds
+
     def _getIdTestLabTestRunFromTestsetIdTestId(self, testSetList, testList):
         '''
         Get list id for all testinstances in a specific folder identified by ID that belong to a specific testSet and
@@ -3806,6 +4038,301 @@ class QC(QC_Project, QC_Connect):
 
         return ET.tostring(dstXml)
 
+    def _runPhase(self, journal, plan, phase, function, *args):
+        '''
+        Run function unless the phase was already done in a previous run of the journal job.
+        In plan mode the function is not run, its planner adds the writes it would do to the plan
+        :param journal: QCJournal or None
+        :param plan: QCPlan or None
+        :param phase: phase name
+        :param function: function to run
+        :param args: function arguments
+        :return: function return or None if skipped
+        '''
+
+        if plan is not None:
+            with getPhase(self.metrics, phase):
+                getattr(self, self._plannerDict[function.__name__])(plan, *args)
+            return None
+
+        if journal is not None and journal.isDone(phase):
+            logger.info('_runPhase: Phase \'%s\' already done (journal) - skipping' % phase)
+            return None
+
+        with getPhase(self.metrics, phase):
+            r = function(*args)
+
+        if journal is not None:
+            journal.setDone(phase)
+
+        return r
+
+    def _setMetrics(self, metrics):
+        '''
+        Set the metrics the requests of QC and of all its entities are added to
+        :param metrics: QCMetrics or None
+        :return:
+        '''
+
+        for value in [self] + self.__dict__.values():
+            if isinstance(value, Connect):
+                value.metrics = metrics
+
+    # Planners used in plan mode - function name -> planner name. Planners get the plan and the function arguments
+    _plannerDict = {
+        '_createTestList': '_planCreateTestList',
+        '_updateTestList': '_planUpdateTestList',
+        '_deleteTestList': '_planDeleteTestList',
+        '_createTestSetList': '_planCreateTestSetList',
+        '_updateTestSetList': '_planUpdateTestSetList',
+        '_deleteTestSetList': '_planDeleteTestSetList',
+        '_createTestInstance': '_planCreateTestInstance',
+        '_updateTestInstance': '_planUpdateTestInstance',
+        '_deleteTestInstanceList': '_planDeleteTestInstanceList',
+    }
+
+    def _planCreateTestList(self, plan, listTestFolderIds, listTestTags, listTestPath, listDesignStepsTags,
+                            listDesignStepsName, listTestName, journal=None):
+
+        # Missing folders - one request per folder (parent folders not counted)
+        testFoldersMissing = set([path for path, folderId in itertools.izip(listTestPath, listTestFolderIds)
+                                  if not folderId])
+
+        self._planEntityCollection(plan, self.TestPlanTestFolders, 'create',
+                                   [{'name': path} for path in testFoldersMissing], {'parent-id': '0' * 6}, 1)
+
+        self._planEntityCollection(plan, self.TestPlanTests, 'create', listTestTags,
+                                   {'parent-id': '0' * 6, 'subtype-id': 'MANUAL'})
+
+        self._planEntityCollection(plan, self.TestPlanDesignSteps, 'create',
+                                   [dsTags for designStepsTags in listDesignStepsTags for dsTags in designStepsTags],
+                                   {'parent-id': '0' * 6}, 500)
+
+    def _planUpdateTestList(self, plan, listTestFolderIds, listTestTags, listTestId, listDesignStepsTags,
+                            listDesignStepsName, listTestName, deleteSteps):
+
+        # Only the first reference to a test is updated
+        testIdsToBeUpdated = set()
+        testTagsToBeUpdated = []
+
+        for testTags, testId in itertools.izip(listTestTags, listTestId):
+
+            if testId not in testIdsToBeUpdated:
+                testIdsToBeUpdated.add(testId)
+                testTagsToBeUpdated.append(testTags)
+
+        self._planEntityCollection(plan, self.TestPlanTests, 'update', testTagsToBeUpdated,
+                                   {'parent-id': '0' * 6, 'id': '0' * 6, 'subtype-id': 'MANUAL'})
+
+        if len(listTestId) == 0:
+            return
+
+        stepFieldDict = {'parent-id': '0' * 6}
+
+        if deleteSteps:
+
+            # All steps deleted and created again
+            designStepIds = self._getIdTestPlanDesignStepFromTestId(listTestId) or []
+
+            self._planDeleteIdList(plan, self.TestPlanDesignSteps, designStepIds)
+
+            self._planEntityCollection(plan, self.TestPlanDesignSteps, 'create',
+                                       [dsTags for designStepsTags in listDesignStepsTags for dsTags in designStepsTags],
+                                       stepFieldDict, 500)
+
+            return
+
+        # Steps that exist are updated and the others created - same read-only calls as _addDesignSteps
+        oldDesignStepsTags = []
+        newDesignStepsTags = []
+
+        for testId, designStepsName, designStepsTags in itertools.izip(
+                listTestId, listDesignStepsName, listDesignStepsTags):
+
+            designStepsIds = self._getIdTestPlanDesignStepFromTestIdStepName(
+                [testId] * len(designStepsName), designStepsName)
+
+            for designStepsId, dsTags in itertools.izip(designStepsIds, designStepsTags):
+
+                if designStepsId:
+                    oldDesignStepsTags.append(dsTags)
+                else:
+                    newDesignStepsTags.append(dsTags)
+
+        self._planEntityCollection(plan, self.TestPlanDesignSteps, 'create', newDesignStepsTags, stepFieldDict, 500)
+
+        stepFieldDict['id'] = '0' * 6
+
+        self._planEntityCollection(plan, self.TestPlanDesignSteps, 'update', oldDesignStepsTags, stepFieldDict, 500)
+
+    def _planDeleteTestList(self, plan, listTestId, listTestName):
+
+        self._planDeleteIdList(plan, self.TestPlanTests, listTestId)
+
+    def _planCreateTestSetList(self, plan, listNewTestSetFolderIds, listNewTestSetTags, listNewTestSetPath,
+                               listTestSetName, journal=None):
+
+        # Missing folders - one request per folder (parent folders not counted)
+        testsetFoldersMissing = set([path for path, folderId in
+                                     itertools.izip(listNewTestSetPath, listNewTestSetFolderIds) if not folderId])
+
+        self._planEntityCollection(plan, self.TestLabTestSetFolders, 'create',
+                                   [{'name': path} for path in testsetFoldersMissing], {'parent-id': '0' * 6}, 1)
+
+        self._planEntityCollection(plan, self.TestLabTestSets, 'create', listNewTestSetTags,
+                                   {'parent-id': '0' * 6, 'subtype-id': 'hp.qc.test-set.default'})
+
+    def _planUpdateTestSetList(self, plan, listOldTestSetFolderIds, listOldTestSetTags, testLabTestSetIdList,
+                               listTestSetName):
+
+        self._planEntityCollection(plan, self.TestLabTestSets, 'update', listOldTestSetTags,
+                                   {'parent-id': '0' * 6, 'id': '0' * 6, 'subtype-id': 'hp.qc.test-set.default'})
+
+    def _planDeleteTestSetList(self, plan, testLabTestSetIdList, listTestSetName):
+
+        self._planDeleteIdList(plan, self.TestLabTestSets, testLabTestSetIdList)
+
+    def _planCreateTestInstance(self, plan, listTestLabTestsetIds, listTestPlanTestIds, listTagsTestInstance,
+                                testNameList, journal=None):
+
+        self._planEntityCollection(plan, self.TestLabTestInstances, 'create', listTagsTestInstance,
+                                   {'test-id': '0' * 6, 'cycle-id': '0' * 6, 'test-order': '1',
+                                    'subtype-id': 'hp.qc.test-instance.MANUAL'})
+
+    def _planUpdateTestInstance(self, plan, listTestLabTestsetIds, listTestPlanTestIds, listTagsTestInstance,
+                                listTestLabTestInstanceId, testNameList):
+
+        self._planEntityCollection(plan, self.TestLabTestInstances, 'update', listTagsTestInstance,
+                                   {'id': '0' * 6, 'test-id': '0' * 6, 'cycle-id': '0' * 6, 'test-order': '1',
+                                    'subtype-id': 'hp.qc.test-instance.MANUAL'})
+
+    def _planDeleteTestInstanceList(self, plan, listTestLabTestInstanceId, testNameList):
+
+        self._planDeleteIdList(plan, self.TestLabTestInstances, listTestLabTestInstanceId)
+
+    def _planEntityCollection(self, plan, entity, operation, tagsList, fieldDict, chunkSize=None):
+        '''
+        Add to the plan the creation / update of an entity collection
+        :param plan: QCPlan
+        :param entity: QC_Entity
+        :param operation: 'create' or 'update'
+        :param tagsList: list of entity tags (fields)
+        :param fieldDict: fields added to all entities (values are only used to estimate the size)
+        :param chunkSize: number of entities sent per call of post/putEntityCollection (None for all)
+        :return:
+        '''
+
+        if len(tagsList) == 0:
+            return
+
+        # Template is read once per entity type (read-only call)
+        if entity.entity not in plan.templateSizeDict:
+            plan.templateSizeDict[entity.entity] = len(entity.getEntityDataTemplate())
+
+        plan.addEntityCollection(entity.entity, operation, tagsList, fieldDict, plan.templateSizeDict[entity.entity],
+                                 entity.collectionSize, chunkSize)
+
+    def _planDeleteIdList(self, plan, entity, entityIds):
+        '''
+        Add to the plan the deletion of a list of entities (ids are sent in the url)
+        :param plan: QCPlan
+        :param entity: QC_Entity
+        :param entityIds: list of ids
+        :return:
+        '''
+
+        # Same split as deleteEntityIdList
+        plan.addDeleteIdList(entity.entity, entityIds, 4000 / 10)
+
+    def _getJournalIdList(self, journal, phase, keyList, function, *args):
+        '''
+        Get the ids of entities that already exist. The ids found in the first run of the journal job are saved
+        and used again when resuming, so entities created by the interrupted run are not seen as existing ones
+        :param journal: QCJournal or None
+        :param phase: phase name
+        :param keyList: list identifying the entities (e.g. path) - used to validate the journal
+        :param function: function returning the id list
+        :param args: function arguments
+        :return: id list
+        '''
+
+        if journal is not None and journal.isDone(phase):
+
+            journalData = journal.getData(phase)
+
+            if journalData['keys'] != keyList:
+                self._raiseError('_getJournalIdList', 'Journal %s does not match the sxml (%s)!' %
+                                 (journal.fileName, phase))
+
+            return journalData['ids']
+
+        idList = function(*args)
+
+        if journal is not None:
+            journal.setDone(phase, {'keys': keyList, 'ids': idList})
+
+        return idList
+
+    def _postEntityCollectionJournal(self, journal, phase, entity, entityXmlList, keyList, fieldList):
+        '''
+        Post new entities in chunks of journalChunkSize entities. With a journal the fields of the entities created
+        by each chunk are saved right after it is posted, so when an interrupted job is resumed the chunks already
+        posted are not posted again (tests would fail on duplicated names and test instances would be duplicated)
+        :param journal: QCJournal or None
+        :param phase: phase name - each chunk is saved as <phase>.post.<index of its first entity>
+        :param entity: QC_Entity
+        :param entityXmlList: xml of each entity to be created
+        :param keyList: list identifying the entities (e.g. name) - used to validate the journal
+        :param fieldList: fields read from the entities created (e.g. ['id'])
+        :return: list of requests posted, {field: list of values of all entities created}
+        '''
+
+        req = []
+        fieldDict = dict((field, []) for field in fieldList)
+
+        chunkSize = self.journalChunkSize if journal is not None else max(1, len(entityXmlList))
+
+        for start in xrange(0, len(entityXmlList), chunkSize):
+
+            chunkPhase = '%s.post.%d' % (phase, start)
+            chunkKeyList = keyList[start:start + chunkSize]
+
+            if journal is not None and journal.isDone(chunkPhase):
+
+                # Entities were already created in a previous run of the job
+                journalData = journal.getData(chunkPhase)
+
+                if journalData['keys'] != chunkKeyList:
+                    self._raiseError('_postEntityCollectionJournal', 'Journal %s does not match the sxml (%s)!' %
+                                     (journal.fileName, chunkPhase))
+
+                chunkFieldDict = journalData['fields']
+
+                logger.info('_postEntityCollectionJournal: %s already created (journal): %s' %
+                            (entity.entity, chunkKeyList))
+
+            else:
+
+                entityCollection = None
+                for entityXml in entityXmlList[start:start + chunkSize]:
+                    entityCollection = entity.addEntityDataToCollection(entityXml, entityCollection)
+
+                r = entity.postEntityCollection(entityCollection)
+                req.extend(r)
+
+                xml = self._getXmlFromRequestQueryList(r)
+                chunkFieldDict = dict((field, entity.getEntityDataCollectionFieldValue(field, xml))
+                                      for field in fieldList)
+
+                # Save created entities before anything else can fail
+                if journal is not None:
+                    journal.setDone(chunkPhase, {'keys': chunkKeyList, 'fields': chunkFieldDict})
+
+            for field in fieldList:
+                fieldDict[field].extend(chunkFieldDict[field])
+
+        return req, fieldDict
+
     def _raiseError(self, function='None', message='', logError=True):
         '''
         Raise Error
@@ -4476,13 +5003,15 @@ class QC_Entity(QC_Connect):
             # Data Query
             requiredFields = None
 
-            if withAllFields:
+            with getPhase(self.metrics, 'template'):
 
-                requiredFields = self.getEntityFields()
+                if withAllFields:
 
-            elif withRequiredFields:
+                    requiredFields = self.getEntityFields()
 
-                requiredFields = self.getEntityFieldsRequired()
+                elif withRequiredFields:
+
+                    requiredFields = self.getEntityFieldsRequired()
 
             entityDataRoot = ET.fromstring(requiredFields.content)
 
@@ -5143,487 +5672,329 @@ class QC_Entity_TL_Test_Instance(QC_Entity):
         self.collectionSize = 20
 
 
-class SXml(object):
+class SXmlTestSet(object):
     '''
-    Class that processes the standard Xml file and serves as an input to the major QC functions in QC class
+    Test set of the standard Xml file
     '''
 
-    # Initialize class - input is the xml string
-    def __init__(self, sxml, silent=False):
+    __slots__ = ('name', 'folder', 'location', 'tags')
 
-        # Silent mode - no exception is raised only messages are sent to console when using _raiseError()
-        self.silent = silent
+    def __init__(self, name=None, folder=None, location=None, tags=None):
+        '''
+        :param name: test set name
+        :param folder: folder where the test set is in
+        :param location: folder path + test set name
+        :param tags: test set tags {name: value}
+        :return:
+        '''
 
-        # Xml string
-        self.sxml = sxml
+        self.name = name
+        self.folder = folder
+        self.location = location
+        self.tags = tags
 
-        # Root of xml
-        self._sxmlRoot = ET.fromstring(sxml)
 
-        # data dictionary containing all the necessary information
-        self._data = {
-            'test': [],
-            'testset': [],
-            'testinstance': [],
-            'testinstancerun': []
-        }
+class SXmlTest(object):
+    '''
+    Test (test plan) of the standard Xml file
+    '''
 
-        # Testset Data
-        self.testSetData = None
+    __slots__ = ('name', 'folder', 'location', 'tags', 'designStepsTags', 'designStepsName')
 
-        # Test Instance Data
-        self.testInstanceData = None
+    def __init__(self, name, folder, location, tags, designStepsTags, designStepsName):
+        '''
+        :param name: test name
+        :param folder: test path
+        :param location: test path + test name
+        :param tags: test tags {name: value}
+        :param designStepsTags: list of design steps tags [{name: value}, ...]
+        :param designStepsName: list of design steps names
+        :return:
+        '''
 
-        # Test Instance Data
-        self.testInstanceRunData = None
+        self.name = name
+        self.folder = folder
+        self.location = location
+        self.tags = tags
+        self.designStepsTags = designStepsTags
+        self.designStepsName = designStepsName
 
-        # Test Data
-        self.testData = None
 
-        # Process xml file
-        self._processXml()
+class SXmlTestInstance(object):
+    '''
+    Test instance (test lab) of the standard Xml file - test set and test are indexes in the test set / test lists
+    '''
 
-    # Return testSet Data dict
-    def getTestSetData(self, forceUpdate=False):
+    __slots__ = ('testSet', 'test', 'location', 'tags')
 
-        if forceUpdate is True:
+    def __init__(self, testSet, test, location, tags):
+        '''
+        :param testSet: test set index
+        :param test: test index
+        :param location: test set location + test name
+        :param tags: test instance tags {name: value}
+        :return:
+        '''
 
-            # Process everything again
-            self._processXml()
+        self.testSet = testSet
+        self.test = test
+        self.location = location
+        self.tags = tags
 
-        elif self.testSetData is not None:
 
-            # If update is not enforced and list already exists... use it!
-            return self.testSetData
+class SXmlRun(object):
+    '''
+    Test instance run of the standard Xml file - test instance is an index in the test instance list
+    '''
 
-        # Test location list
-        testSetNameList = []
-        for testSet in self._data['testset']:
-            # Add test location
-            testSetNameList.append(testSet['name'])
+    __slots__ = ('testInstance', 'tags', 'runStepsTags')
 
-        # Test location list
-        testSetLocationList = []
-        for testSet in self._data['testset']:
-            # Add test location
-            testSetLocationList.append(testSet['location'])
+    def __init__(self, testInstance, tags, runStepsTags):
+        '''
+        :param testInstance: test instance index
+        :param tags: run tags {name: value}
+        :param runStepsTags: list of run steps tags [{name: value}, ...]
+        :return:
+        '''
 
-        # Test tags list
-        testSetTagList = []
-        for testSet in self._data['testset']:
-            # Add test location
-            testSetTagList.append(testSet['tags'])
+        self.testInstance = testInstance
+        self.tags = tags
+        self.runStepsTags = runStepsTags
 
-        # Test folder list
-        testSetFolderList = []
-        for testSet in self._data['testset']:
-            # Add test location
-            testSetFolderList.append(testSet['folder'])
 
-        # Save for future use
-        self.testSetData = {
-            'location': testSetLocationList,
-            'tags': testSetTagList,
-            'folder': testSetFolderList,
-            'name': testSetNameList
-        }
+class SXmlView(Mapping):
+    '''
+    Read only dict of lists over a list of SXml records - each list is only built when it is first used
+    '''
 
-        return self.testSetData
+    def __init__(self, recordList, getterDict):
+        '''
+        :param recordList: list of records
+        :param getterDict: key -> function that gets the value of the key from a record
+        :return:
+        '''
 
-    # Return test data dict
-    def getTestData(self, forceUpdate=False):
+        self._recordList = recordList
+        self._getterDict = getterDict
+        self._listDict = {}
 
-        if forceUpdate is True:
+    def __getitem__(self, key):
 
-            # Process everything again
-            self._processXml()
+        if key not in self._listDict:
+            getter = self._getterDict[key]
+            self._listDict[key] = [getter(record) for record in self._recordList]
 
-        elif self.testData is not None:
+        return self._listDict[key]
 
-            # If update is not enforced and list already exists... use it!
-            return self.testData
+    def __iter__(self):
+        return iter(self._getterDict)
 
-        # Test folder list
-        testFolderList = []
-        # Test name list
-        testNameList = []
-        # Test location list
-        testLocationList = []
-        # Test location list
-        testTagList = []
-        # Test design steps tags
-        testDesignStepsTagsList = []
-        # Test design steps name
-        testDesignStepsNameList = []
-
-        for test in self._data['test']:
-            # Add test folder
-            testFolderList.append(test['folder'])
-            # Add test folder
-            testNameList.append(test['name'])
-            # Add test location
-            testLocationList.append(test['location'])
-            # Add test location
-            testTagList.append(test['tags'])
-            # Add test run steps tags
-            testDesignStepsTagsList.append(test['designsteps']['tags'])
-            # Add test run steps name
-            testDesignStepsNameList.append(test['designsteps']['name'])
-
-        # Save for future use
-        self.testData = {
-            'location': testLocationList,
-            'tags': testTagList,
-            'folder': testFolderList,
-            'name': testNameList,
-            'designstepstags': testDesignStepsTagsList,
-            'designstepsname': testDesignStepsNameList
-        }
+    def __len__(self):
+        return len(self._getterDict)
 
-        return self.testData
 
-    # Return test instances data in a dic
-    def getTestInstancesData(self, forceUpdate=False):
+class SXmlReader(object):
+    '''
+    Streaming reader of the standard Xml file - the test sets and test cases are yielded one by one while the xml is
+    parsed (iterparse) and the processed elements are dropped, so the memory used does not grow with the input size.
+
+    Records are SXmlTestSet, SXmlTest, SXmlTestInstance and SXmlRun. The test instances / runs reference the test
+    set / test / test instance by its index (order in which they are yielded). Paths, names, tag names and tag values
+    are interned - repeated strings (e.g. status, release, folders) are kept only once.
+
+    >>> testSetList = []
+    >>> for recordType, record in SXmlReader(sxml):
+    >>>     if recordType == 'testset':
+    >>>         testSetList.append(record)
+    >>>     else:
+    >>>         test, testInstance, run = record
+    >>>         print testSetList[testInstance.testSet].name, test.name
+    '''
 
-        if forceUpdate is True:
-
-            # Process everything again
-            self._processXml()
-
-        elif self.testInstanceData is not None:
-
-            # If update is not enforced and list already exists... use it!
-            return self.testInstanceData
-
-        # Test instance info lists
-        testInstanceLocationList = []
-        testInstanceTagList = []
-        testInstanceTestLocationList = []
-        testInstanceTestNameList = []
-        testInstanceTestTagsList = []
-        testInstanceTestSetLocationList = []
-        testInstanceTestSetTagsList = []
-
-        for testInstance in self._data['testinstance']:
-            # Add test instance location
-            testInstanceLocationList.append(testInstance['location'])
-            # Add test instance tag
-            testInstanceTagList.append(testInstance['tags'])
-            # Add test location
-            testInstanceTestLocationList.append(testInstance['test']['location'])
-            # Add test name
-            testInstanceTestNameList.append(testInstance['test']['name'])
-            # Add test tags
-            testInstanceTestTagsList.append(testInstance['test']['tags'])
-            # Add test set location
-            testInstanceTestSetLocationList.append(testInstance['testset']['location'])
-            # Add test set tags
-            testInstanceTestSetTagsList.append(testInstance['testset']['tags'])
-
-        # Save for future use
-        self.testInstanceData = {
-            'location': testInstanceLocationList,
-            'tags': testInstanceTagList,
-            'testlocation': testInstanceTestLocationList,
-            'testtags': testInstanceTestTagsList,
-            'testname': testInstanceTestNameList,
-            'testsetlocation': testInstanceTestSetLocationList,
-            'testsettags': testInstanceTestSetTagsList
-        }
+    def __init__(self, source):
+        '''
+        :param source: xml string or file object
+        :return:
+        '''
 
-        return self.testInstanceData
+        self.source = source
 
-    # Return test instances run data in a dic
-    def getTestInstancesRunData(self, forceUpdate=False):
+        # String -> same string
+        self._stringDict = {}
 
-        if forceUpdate is True:
-
-            # Process everything again
-            self._processXml()
-
-        elif self.testInstanceRunData is not None:
-
-            # If update is not enforced and list already exists... use it!
-            return self.testInstanceRunData
-
-        # Test instance info lists
-        testInstanceLocationList = []
-        testInstanceTagList = []
-        testInstanceTestLocationList = []
-        testInstanceTestNameList = []
-        testInstanceTestTagsList = []
-        testInstanceTestRunTagsList = []
-        testInstanceTestSetLocationList = []
-        testInstanceTestSetTagsList = []
-
-        for testInstanceRun in self._data['testinstancerun']:
-            # Add test instance location
-            testInstanceLocationList.append(testInstanceRun['testinstance']['location'])
-            # Add test instance tag
-            testInstanceTagList.append(testInstanceRun['testinstance']['tags'])
-            # Add test location
-            testInstanceTestLocationList.append(testInstanceRun['testinstance']['test']['location'])
-            # Add test tags
-            testInstanceTestTagsList.append(testInstanceRun['testinstance']['test']['tags'])
-            # Add test name
-            testInstanceTestNameList.append(testInstanceRun['testinstance']['test']['name'])
-            # Add test set location
-            testInstanceTestSetLocationList.append(testInstanceRun['testinstance']['testset']['location'])
-            # Add test set tags
-            testInstanceTestSetTagsList.append(testInstanceRun['testinstance']['testset']['tags'])
-            # Add test run steps tags
-            testInstanceTestRunTagsList.append(testInstanceRun['runsteps']['tags'])
-
-        # Get test instance run tags
-        testInstanceRunTagList = []
-        for testinstancerun in self._data['testinstancerun']:
-            # Add test instance run tags
-            testInstanceRunTagList.append(testinstancerun['tags'])
-
-        # Save for future use
-        self.testInstanceRunData = {
-            'testinstancelocation': testInstanceLocationList,
-            'testinstancetags': testInstanceTagList,
-            'testlocation': testInstanceTestLocationList,
-            'testtags': testInstanceTestTagsList,
-            'testname': testInstanceTestNameList,
-            'testsetlocation': testInstanceTestSetLocationList,
-            'testsettags': testInstanceTestSetTagsList,
-            'runstepstags': testInstanceTestRunTagsList,
-            'tags': testInstanceRunTagList
-        }
+    def __iter__(self):
+        return self.iterRecords()
 
-        return self.testInstanceRunData
+    def _intern(self, value):
 
-    # Process xml to populate the dataDic related to test instances present in sxml
-    def _processXml(self):
+        if value is None:
+            return None
 
-        # Information needs to be updated!
-        # Testset information
-        dataTestset = {
-            'location': None,  # List of testset locations - composed by folder path + testset name
-            'tags': None,  # List of testset tags ( name, value )
-            'folder': None,  # List of folder where the testset is in
-            'name': None  # List with testset name
-        }
+        return self._stringDict.setdefault(value, value)
 
-        # Testset List
-        testSetList = []
-        testList = []
-        testInstanceList = []
-        testInstanceRunsList = []
+    def iterRecords(self):
+        '''
+        Parse the xml
+        :return: generator of ('testset', SXmlTestSet) and ('testcase', (SXmlTest, SXmlTestInstance, SXmlRun)) - a
+                 test set is yielded before its test cases
+        '''
+
+        source = self.source
+
+        if isinstance(source, unicode):
+            source = source.encode('utf-8')
+
+        if isinstance(source, str):
+            source = cStringIO.StringIO(source)
+
+        # Elements being parsed - report / test_sets / test_set / test_cases / test_case / ...
+        elemStack = []
+
+        # Test set being parsed and if it was already yielded
+        testSet = None
+        testSetDone = False
+
+        # Index of the next test set / test case
+        testSetIdx = 0
+        testCaseIdx = 0
+
+        for event, elem in ET.iterparse(source, events=('start', 'end')):
+
+            if event == 'start':
+
+                elemStack.append(elem)
 
-        # Search for testset
-        for testSet in self._sxmlRoot.findall('./test_sets/test_set'):
+                depth = len(elemStack)
 
-            # Initialize testset dict
-            dataTestset['location'] = None
-            dataTestset['tags'] = None
-            dataTestset['folder'] = None
-            dataTestset['name'] = None
+                if depth == 3 and elem.tag == 'test_set' and elemStack[1].tag == 'test_sets':
 
-            # tag dictionary
-            tagsTestSet = {}
-            for testSetChild in testSet:
+                    testSet = SXmlTestSet(tags={})
+                    testSetDone = False
+
+                # Test set tags are found before the test cases
+                elif depth == 4 and elem.tag == 'test_cases' and testSet is not None and not testSetDone:
+
+                    self._setTestSetLocation(elemStack[2], testSet)
+                    testSetDone = True
+
+                    yield 'testset', testSet
+
+                continue
+
+            elemStack.pop()
+
+            depth = len(elemStack) + 1
+
+            if testSet is None or depth < 3:
+                continue
+
+            if depth == 3:
+
+                # Test set without test cases
+                if not testSetDone:
+                    self._setTestSetLocation(elem, testSet)
+
+                    yield 'testset', testSet
+
+                testSet = None
+                testSetIdx += 1
+
+                # Drop processed test set
+                elemStack[-1].remove(elem)
+
+            elif depth == 4 and elem.tag != 'test_cases':
 
                 # Populate tag dictionary
-                if testSetChild.tag != 'test_cases':
-                    if testSetChild.get('tl_name') is not None:
-                        tagsTestSet[testSetChild.get('tl_name')] = testSetChild.text
-
-                # Fill test set information
-                dataTestset['tags'] = tagsTestSet
-
-            dataTestset['location'] = testSet.get('path') + '\\' + dataTestset['tags']['name']
-            dataTestset['name'] = dataTestset['tags']['name']
-            dataTestset['folder'] = testSet.get('path')
-
-            # Now lets check the tests / tests instances
-            testL, testInstanceL, testInstanceRunL = self._processTestCases(testSet, dataTestset)
-
-            # Concatenate lists
-            testList += testL
-            testInstanceList += testInstanceL
-            testInstanceRunsList += testInstanceRunL
-
-            # Add testset to list
-            testSetList.append(copy.deepcopy(dataTestset))
-
-        self._data['test'] = testList
-        self._data['testset'] = testSetList
-        self._data['testinstance'] = testInstanceList
-        self._data['testinstancerun'] = testInstanceRunsList
-
-    # Process testcases in testSet element
-    def _processTestCases(self, testSet, dataTestset):
-
-        # Test information
-        dataTest = {
-            'location': None,  # test location - path + test name
-            'tags': None,  # List of test tags ( name, value )
-            'name': None,  # List of test name
-            'folder': None,  # List of test path
-            'designsteps': None  # List of test path
-        }
-        # Test instance information
-        dataTestInstance = {
-            'testset': None,  # testset information
-            'test': None,  # test information
-            'location': None,  # test instance location - path + testset + testintance name
-            'tags': None  # List of test instance tags ( name, value )
-        }
-        # Test instance information
-        dataTestInstanceRun = {
-            'testinstance': None,  # test instance information
-            'tags': None,  # List of test instance tags ( name, value )
-            'runsteps': None  # Run steps information
-        }
-        # Test instance runs information
-        dataTestInstanceRunSteps = {
-            'tags': None  # List of run steps tags {tagX, tagY, ...}
-        }
-        # Test step information
-        dataTestDesignSteps = {
-            'tags': None,  # List of design steps tags {tagX, tagY, ...}
-            'name': None  # List of design steps name tag
-        }
+                if elem.get('tl_name') is not None:
+                    testSet.tags[self._intern(elem.get('tl_name'))] = self._intern(elem.text)
 
-        testList = []
-        testInstanceList = []
-        testInstanceRunList = []
-
-        if testSet.find('./test_cases') is not None:
-
-            for testCase in testSet.find('./test_cases'):
-
-                # Initialize dicts
-                dataTest['location'] = None
-                dataTest['tags'] = None
-                dataTest['name'] = None
-                dataTest['folder'] = None
-                dataTest['designsteps'] = None
-                dataTestInstance['testset'] = None
-                dataTestInstance['location'] = None
-                dataTestInstance['test'] = None
-                dataTestInstance['tags'] = None
-                dataTestInstanceRun['testinstance'] = None
-                dataTestInstanceRun['tags'] = None
-                dataTestInstanceRun['runsteps'] = None
-                dataTestInstanceRunSteps['tags'] = None
-                dataTestDesignSteps['tags'] = None
-                dataTestDesignSteps['name'] = None
-
-                # test tag dictionary
-                tagsTest = {}
-                # test instances tag dictionary
-                tagsTestInstance = {}
-                # test instances tag dictionary
-                tagsTestInstanceRun = {}
-                # Test Instance Run Step List
-                testRunStepList = []
-                # Test Design Step List
-                testDesignStepList = []
-                # Name Design Step List
-                nameDesignStepList = []
-
-                for testCaseChild in testCase:
-
-                    # Populate tag dictionary for test instance
-                    if testCaseChild.tag != 'test_case_steps' and testCaseChild.tag != 'test_case_run':
-
-                        # Check if field contains multiple values or single value - no value field
-                        if testCaseChild.find('value') is None:
-
-                            # Populate test instance
-                            if testCaseChild.get('tl_name') is not None:
-                                tagsTestInstance[testCaseChild.get('tl_name')] = testCaseChild.text
-
-                            # Populate test
-                            if testCaseChild.get('tp_name') is not None:
-                                tagsTest[testCaseChild.get('tp_name')] = testCaseChild.text
+            elif depth == 5 and elemStack[-1].tag == 'test_cases':
 
-                        else:
-                            # Multiple values found
-                            testValue = []
-                            testInstanceValue = []
+                yield 'testcase', self._processTestCase(elem, testSet, testSetIdx, testCaseIdx)
+
+                testCaseIdx += 1
 
-                            # Populate test instance
-                            if testCaseChild.get('tl_name') is not None:
+                # Drop processed test case
+                elemStack[-1].remove(elem)
 
-                                for valueField in testCaseChild.findall('value'):
-                                    testInstanceValue.append(valueField.text)
+    # Set test set location, name and folder
+    def _setTestSetLocation(self, testSetElem, testSet):
 
-                                tagsTestInstance[testCaseChild.get('tl_name')] = testInstanceValue
+        if 'name' not in testSet.tags:
+            raise SXmlError('Error!', 'SXmlReader: Test set without name in path \'%s\'' % testSetElem.get('path'))
 
-                            # Populate test
-                            if testCaseChild.get('tp_name') is not None:
+        testSet.name = testSet.tags['name']
+        testSet.folder = self._intern(testSetElem.get('path'))
+        testSet.location = self._intern(testSet.folder + '\\' + testSet.name)
 
-                                for valueField in testCaseChild.findall('value'):
-                                    testValue.append(valueField.text)
+    # Process a test case element
+    def _processTestCase(self, testCase, testSet, testSetIdx, testCaseIdx):
 
-                                tagsTest[testCaseChild.get('tp_name')] = testValue
+        # test tag dictionary
+        tagsTest = {}
+        # test instances tag dictionary
+        tagsTestInstance = {}
+        # test instances tag dictionary
+        tagsTestInstanceRun = {}
+        # Test Instance Run Step List
+        testRunStepList = []
+        # Test Design Step List
+        testDesignStepList = []
+        # Name Design Step List
+        nameDesignStepList = []
 
-                    # Populate tag dictionary for test instance run
-                    elif testCaseChild.tag == 'test_case_run':
+        for testCaseChild in testCase:
 
-                        for testInstanceRunChild in testCaseChild:
+            # Populate tag dictionary for test instance
+            if testCaseChild.tag != 'test_case_steps' and testCaseChild.tag != 'test_case_run':
 
-                            # Check if field contains multiple values or single value - no value field
-                            if testInstanceRunChild.find('value') is None:
+                # Populate test instance
+                if testCaseChild.get('tl_name') is not None:
+                    tagsTestInstance[self._intern(testCaseChild.get('tl_name'))] = self._getTagValue(testCaseChild)
 
-                                # Populate test instance run
-                                if testInstanceRunChild.get('tl_name') is not None:
-                                    tagsTestInstanceRun[testInstanceRunChild.get('tl_name')] = testInstanceRunChild.text
+                # Populate test
+                if testCaseChild.get('tp_name') is not None:
+                    tagsTest[self._intern(testCaseChild.get('tp_name'))] = self._getTagValue(testCaseChild)
 
-                            else:
-                                # Multiple values found
-                                testInstanceRunValue = []
+            # Populate tag dictionary for test instance run
+            elif testCaseChild.tag == 'test_case_run':
 
-                                # Populate test instance Run
-                                if testInstanceRunChild.get('tl_name') is not None:
+                for testInstanceRunChild in testCaseChild:
 
-                                    for valueField in testInstanceRunChild.findall('value'):
-                                        testInstanceRunValue.append(valueField.text)
+                    # Populate test instance run
+                    if testInstanceRunChild.get('tl_name') is not None:
+                        tagsTestInstanceRun[self._intern(testInstanceRunChild.get('tl_name'))] = self._getTagValue(
+                            testInstanceRunChild)
 
-                                    tagsTestInstanceRun[testInstanceRunChild.get('tl_name')] = testInstanceRunValue
+            # Now lets look at the test run steps
+            elif testCaseChild.tag == 'test_case_steps':
 
-                    # Now lets look at the test run steps
-                    elif testCaseChild.tag == 'test_case_steps':
+                testRunStepListTemp, testDesignStepListTemp, nameDesignStep = self._processTestCaseSteps(
+                    testCaseChild)
 
-                        testRunStepListTemp, testDesignStepListTemp, nameDesignStep = self._processTestCaseSteps(
-                            testCaseChild)
+                testRunStepList += testRunStepListTemp
+                testDesignStepList += testDesignStepListTemp
+                nameDesignStepList += nameDesignStep
 
-                        testRunStepList += testRunStepListTemp
-                        testDesignStepList += testDesignStepListTemp
-                        nameDesignStepList += nameDesignStep
+        folder = self._intern(testCase.get('path'))
 
-                # Update data
-                dataTestDesignSteps['tags'] = testDesignStepList
-                dataTestDesignSteps['name'] = nameDesignStepList
+        test = SXmlTest(tagsTest['name'], folder, folder + '\\' + tagsTest['name'], tagsTest, testDesignStepList,
+                        nameDesignStepList)
 
-                dataTest['tags'] = tagsTest
-                dataTest['location'] = testCase.get('path') + '\\' + dataTest['tags']['name']
-                dataTest['name'] = dataTest['tags']['name']
-                dataTest['folder'] = testCase.get('path')
-                dataTest['designsteps'] = dataTestDesignSteps
+        testInstance = SXmlTestInstance(testSetIdx, testCaseIdx, testSet.location + '\\' + tagsTest['name'],
+                                        tagsTestInstance)
 
-                dataTestInstance['tags'] = tagsTestInstance
-                dataTestInstance['location'] = dataTestset['location'] + '\\' + dataTest['tags']['name']
-                dataTestInstance['testset'] = dataTestset
-                dataTestInstance['test'] = dataTest
+        run = SXmlRun(testCaseIdx, tagsTestInstanceRun, testRunStepList)
 
-                dataTestInstanceRunSteps['tags'] = testRunStepList
+        return test, testInstance, run
 
-                dataTestInstanceRun['tags'] = tagsTestInstanceRun
-                dataTestInstanceRun['testinstance'] = dataTestInstance
-                dataTestInstanceRun['runsteps'] = dataTestInstanceRunSteps  # List with all run steps data
+    # Value of a tag - list if the field contains multiple values
+    def _getTagValue(self, elem):
 
-                # Add caught values to respective lists
-                testList.append(copy.deepcopy(dataTest))
-                testInstanceList.append(copy.deepcopy(dataTestInstance))
-                testInstanceRunList.append(copy.deepcopy(dataTestInstanceRun))
+        if elem.find('value') is None:
+            return self._intern(elem.text)
 
-        return testList, testInstanceList, testInstanceRunList
+        return [self._intern(valueField.text) for valueField in elem.findall('value')]
 
     # Process Test Case Steps in testStepNode element
     def _processTestCaseSteps(self, testStepsNode):
@@ -5645,47 +6016,160 @@ class SXml(object):
 
             for testStepChild in testStep:
 
-                # Check if field contains multiple values or single value - no value field
-                if testStepChild.find('value') is None:
+                # Populate test instance run
+                if testStepChild.get('tl_name') is not None:
+                    tagsRunSteps[self._intern(testStepChild.get('tl_name'))] = self._getTagValue(testStepChild)
 
-                    # Populate test instance run
-                    if testStepChild.get('tl_name') is not None:
-                        tagsRunSteps[testStepChild.get('tl_name')] = testStepChild.text
+                # Populate test design step
+                if testStepChild.get('tp_name') is not None:
+                    tagsDesignSteps[self._intern(testStepChild.get('tp_name'))] = self._getTagValue(testStepChild)
 
-                    # Populate test instance run
-                    if testStepChild.get('tp_name') is not None:
-                        tagsDesignSteps[testStepChild.get('tp_name')] = testStepChild.text
+            # Save run step to list
+            tagsRunStepList.append(tagsRunSteps)
+            tagsDesignStepList.append(tagsDesignSteps)
 
-                else:
-                    # Multiple values found
-                    testRunStepValue = []
-                    # Multiple values found
-                    testDesignStepValue = []
+            if len(tagsDesignSteps) != 0:
+                nameDesignSteps.append(tagsDesignSteps['name'])
 
-                    # Populate test instance Run
-                    if testStepChild.get('tl_name') is not None:
+        return tagsRunStepList, tagsDesignStepList, nameDesignSteps
 
-                        for valueField in testStepChild.findall('value'):
-                            testRunStepValue.append(valueField.text)
 
-                        tagsRunSteps[testStepChild.get('tl_name')] = testRunStepValue
+class SXml(object):
+    '''
+    Class that processes the standard Xml file and serves as an input to the major QC functions in QC class
+    '''
 
-                    # Populate test instance Run
-                    if testStepChild.get('tp_name') is not None:
+    # Initialize class - input is the xml string
+    def __init__(self, sxml, silent=False):
 
-                        for valueField in testStepChild.findall('value'):
-                            testDesignStepValue.append(valueField.text)
+        # Silent mode - no exception is raised only messages are sent to console when using _raiseError()
+        self.silent = silent
 
-                        tagsDesignSteps[testStepChild.get('tp_name')] = testDesignStepValue
+        # Xml string
+        self.sxml = sxml
 
-            # Save run step to list
-            tagsRunStepList.append(tagsRunSteps)
-            tagsDesignStepList.append(tagsDesignSteps)
+        # Records - the test, test instance and run with the same index are from the same test case
+        self.testSetList = []
+        self.testList = []
+        self.testInstanceList = []
+        self.runList = []
 
-            if len(tagsDesignSteps) != 0:
-                nameDesignSteps.append(tagsDesignSteps['name'])
+        # Testset Data
+        self.testSetData = None
 
-        return tagsRunStepList, tagsDesignStepList, nameDesignSteps
+        # Test Instance Data
+        self.testInstanceData = None
+
+        # Test Instance Data
+        self.testInstanceRunData = None
+
+        # Test Data
+        self.testData = None
+
+        # Process xml file
+        self._processXml()
+
+    # Return testSet Data dict
+    def getTestSetData(self, forceUpdate=False):
+
+        # Views are built from the records - forceUpdate does not need to parse the xml again
+        if forceUpdate is True or self.testSetData is None:
+
+            self.testSetData = SXmlView(self.testSetList, {
+                'location': attrgetter('location'),
+                'tags': attrgetter('tags'),
+                'folder': attrgetter('folder'),
+                'name': attrgetter('name')
+            })
+
+        return self.testSetData
+
+    # Return test data dict
+    def getTestData(self, forceUpdate=False):
+
+        if forceUpdate is True or self.testData is None:
+
+            self.testData = SXmlView(self.testList, {
+                'location': attrgetter('location'),
+                'tags': attrgetter('tags'),
+                'folder': attrgetter('folder'),
+                'name': attrgetter('name'),
+                'designstepstags': attrgetter('designStepsTags'),
+                'designstepsname': attrgetter('designStepsName')
+            })
+
+        return self.testData
+
+    # Return test instances data in a dic
+    def getTestInstancesData(self, forceUpdate=False):
+
+        if forceUpdate is True or self.testInstanceData is None:
+
+            testList = self.testList
+            testSetList = self.testSetList
+
+            self.testInstanceData = SXmlView(self.testInstanceList, {
+                'location': attrgetter('location'),
+                'tags': attrgetter('tags'),
+                'testlocation': lambda testInstance: testList[testInstance.test].location,
+                'testtags': lambda testInstance: testList[testInstance.test].tags,
+                'testname': lambda testInstance: testList[testInstance.test].name,
+                'testsetlocation': lambda testInstance: testSetList[testInstance.testSet].location,
+                'testsettags': lambda testInstance: testSetList[testInstance.testSet].tags
+            })
+
+        return self.testInstanceData
+
+    # Return test instances run data in a dic
+    def getTestInstancesRunData(self, forceUpdate=False):
+
+        if forceUpdate is True or self.testInstanceRunData is None:
+
+            testList = self.testList
+            testSetList = self.testSetList
+            testInstanceList = self.testInstanceList
+
+            def getTestInstance(run):
+                return testInstanceList[run.testInstance]
+
+            self.testInstanceRunData = SXmlView(self.runList, {
+                'testinstancelocation': lambda run: getTestInstance(run).location,
+                'testinstancetags': lambda run: getTestInstance(run).tags,
+                'testlocation': lambda run: testList[getTestInstance(run).test].location,
+                'testtags': lambda run: testList[getTestInstance(run).test].tags,
+                'testname': lambda run: testList[getTestInstance(run).test].name,
+                'testsetlocation': lambda run: testSetList[getTestInstance(run).testSet].location,
+                'testsettags': lambda run: testSetList[getTestInstance(run).testSet].tags,
+                'runstepstags': attrgetter('runStepsTags'),
+                'tags': attrgetter('tags')
+            })
+
+        return self.testInstanceRunData
+
+    # Process xml to populate the record lists
+    def _processXml(self):
+
+        testSetList = []
+        testList = []
+        testInstanceList = []
+        runList = []
+
+        for recordType, record in SXmlReader(self.sxml):
+
+            if recordType == 'testset':
+                testSetList.append(record)
+                continue
+
+            test, testInstance, run = record
+
+            testList.append(test)
+            testInstanceList.append(testInstance)
+            runList.append(run)
+
+        self.testSetList = testSetList
+        self.testList = testList
+        self.testInstanceList = testInstanceList
+        self.runList = runList
 
     # Raise Error
     def _raiseError(self, function='None', message=''):
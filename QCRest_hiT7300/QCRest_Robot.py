@@ -1,6 +1,7 @@
 __author__ = 'Matteo Feroldi'
 
 import logging
+import multiprocessing
 import os
 import time
 from datetime import datetime
@@ -455,13 +456,8 @@ class RobotTags(object):
     def read_qc_tags(self):
 
 
-        qc_tags = {}
-        sections = self.qcRobot.read_sections()
-
-        for section in sections:
-            data = self.qcRobot.read_all_values(section)
-            d = dict(zip(data[0], data[1]))
-            qc_tags.update({section: d})
+        # {section: {option: value}} - read at once from the cached file
+        qc_tags = dict(self.qcRobot.read_snapshot())
 
         return qc_tags
 
@@ -475,11 +471,10 @@ class RobotTags(object):
         # load qc tags
         qc_tags = self.read_qc_tags()
 
-        # check number of qc_test_case
-        i = 1
-        while 'd_%s' % i in data.keys():
-            i += 1
-        n_test_case = i - 1
+        # ordered list of qc_test_case: 'd_1', 'd_2', ..., 'd_n'
+        test_list = []
+        while 'd_%s' % (len(test_list) + 1) in data:
+            test_list.append(data['d_%s' % (len(test_list) + 1)])
 
 
         # tag label generation
@@ -503,6 +498,13 @@ class RobotTags(object):
         # read qc tags of test case
         qc_tags_options_steps = self.iniCo.read_all_values(tag)[0]
 
+        # tag label generation
+
+        tag = 'tags_' + system + '_test_case_run'
+
+        # read qc tags of test case run
+        qc_tags_options_run = self.iniCo.read_all_values(tag)[0]
+
         root = etree.Element('report')
         # root.set('xmlns:xsi', 'http://www.w3.org/2001/XMLSchema-instance')
         # root.set('xsi:noNamespaceSchemaLocation', 'report-schema.xsd')
@@ -513,23 +515,20 @@ class RobotTags(object):
         test_sets = etree.Element('test_sets')
         root.append(test_sets)
 
-        for n in range(n_test_case):
-            in_test_set = False
-            i = n + 1
-
-            ''' *****************   define test_set  ****************** '''
+        # (test set path, test set name) -> test_cases element of the test set
+        test_set_dict = {}
 
-            test_set_name = data['d_%s' % i]['test_set_name']
-            test_set_path = data['d_%s' % i]['test_set']
-            test_status_temp = data['d_%s' % i]['test_case_run_status_temp']
+        for test_data in test_list:
 
+            ''' *****************   define test_set  ****************** '''
 
-            for ele in root.findall(".//test_set_name"):
-                if test_set_name == ele.text:
-                    in_test_set = True
+            test_set_name = test_data['test_set_name']
+            test_set_path = test_data['test_set']
+            test_status_temp = test_data['test_case_run_status_temp']
 
+            test_cases = test_set_dict.get((test_set_path, test_set_name))
 
-            if in_test_set == False:
+            if test_cases is None:
 
                 test_set = etree.Element('test_set')
                 test_sets.append(test_set)
@@ -537,12 +536,12 @@ class RobotTags(object):
 
                 for option in qc_tags_options_set:
                     if option == 'test_set':
-                        test_set.set('path', data['d_%s' % i]['test_set'])
+                        test_set.set('path', test_data['test_set'])
                     else:
-                        if option in data['d_%s' % i].keys():
+                        if option in test_data:
                             elem = etree.Element('%s' % option)
                             test_set.append(elem)
-                            elem.text = data['d_%s' % i]['%s' % option]
+                            elem.text = test_data['%s' % option]
                             d = qc_tags[option]
                             for val in d.keys():
                                 elem.set(val, d[val])
@@ -551,38 +550,18 @@ class RobotTags(object):
                 test_cases = etree.Element('test_cases')
                 test_set.append(test_cases)
 
-            else:
-
-                # get the test_set where the qc_test_case below
-                match = False
-                for ele in root.findall(".//test_set[@path='%s']" % test_set_path):
-                    t_test_set = ele
-                    for el in ele.findall("./test_set_name"):
-                        if el.text == test_set_name:
-                            test_set = t_test_set
-                            match = True
-                            break
-                    if match:
-                        break
-
-                # get the test_cases where the qc_test_case below
-
-                for node in test_set.getchildren():
-                    if node.tag == 'test_cases':
-                        test_cases = node
-                        break
-
+                test_set_dict[(test_set_path, test_set_name)] = test_cases
 
             ''' *******************   define qc_test_case  ******************* '''
             test_case = etree.Element('qc_test_case')
             test_cases.append(test_case)
             for option in qc_tags_options_case:
                 if option == 'qc_test_case':
-                    test_case.set('path', data['d_%s' % i]['qc_test_case'])
+                    test_case.set('path', test_data['qc_test_case'])
                 elif option == 'test_case_products_concerned':
                     elem = etree.Element('%s' % option)
                     test_case.append(elem)
-                    d = data['d_%s' % i]['%s' % option]
+                    d = test_data['%s' % option]
                     for value in d:
                         val = etree.Element('value')
                         elem.append(val)
@@ -591,10 +570,10 @@ class RobotTags(object):
                     for val in d.keys():
                         elem.set(val, d[val])
                 else:
-                    if option in data['d_%s' % i].keys():
+                    if option in test_data:
                         elem = etree.Element('%s' % option)
                         test_case.append(elem)
-                        elem.text = data['d_%s' % i]['%s' % option]
+                        elem.text = test_data['%s' % option]
                         d = qc_tags[option]
                         for val in d.keys():
                             elem.set(val, d[val])
@@ -606,7 +585,7 @@ class RobotTags(object):
 
             # check number of qc_test_case step
             l = 1
-            while 'step_%s' % l in data['d_%s' % i].keys():
+            while 'step_%s' % l in test_data:
                 l += 1
             n_case_step = l - 1
             step_stat = 'Not Analyzed'
@@ -615,7 +594,7 @@ class RobotTags(object):
                 test_case_step = etree.Element('test_case_step')
                 test_case_steps.append(test_case_step)
 
-                if data['d_%s' % i]['step_%s' % k][3] != 'Passed':
+                if test_data['step_%s' % k][3] != 'Passed':
                     step_stat = 'Failed'
                 elif step_stat == 'Not Analyzed':
                     step_stat = 'Passed'
@@ -624,7 +603,7 @@ class RobotTags(object):
                 for step in qc_tags_options_steps:
                     elem = etree.Element('%s' % step)
                     test_case_step.append(elem)
-                    elem.text = data['d_%s' % i]['step_%s' % k][m]
+                    elem.text = test_data['step_%s' % k][m]
                     m += 1
                     d = qc_tags[step]
                     for val in d.keys():
@@ -635,11 +614,6 @@ class RobotTags(object):
             test_case_run = etree.Element('test_case_run')
             test_case.append(test_case_run)
 
-            tag = 'tags_' + system + '_test_case_run'
-
-            # read qc tags of test case
-            qc_tags_options_run = self.iniCo.read_all_values(tag)[0]
-
             for option in qc_tags_options_run:
                 d = qc_tags[option]
                 if option == 'test_case_run_status':
@@ -651,10 +625,10 @@ class RobotTags(object):
                         elem.text = test_status_temp
                     for val in d.keys():
                         elem.set(val, d[val])
-                if option in data['d_%s' % i].keys():
+                if option in test_data:
                     elem = etree.Element('%s' % option)
                     test_case_run.append(elem)
-                    elem.text = data['d_%s' % i]['%s' % option]
+                    elem.text = test_data['%s' % option]
                     for val in d.keys():
                         elem.set(val, d[val])
 
@@ -662,3 +636,67 @@ class RobotTags(object):
             tree.write(self.xml_out_path)
         else:
             return etree.tostring(root)
+
+
+# Parse a Robot output file (or read a sxml file) - module function so that it can run in the worker processes
+def parseRobotFile(fileArgs):
+    '''
+    Get the test sets of a Robot output file or sxml file
+    :param fileArgs: (file name, fail_test of RobotTags)
+    :return: (file name, list of serialized test_set elements - None if the file could not be parsed, parse time)
+    '''
+
+    fileName, failTest = fileArgs
+
+    start_time = time.time()
+
+    try:
+        if fileName.endswith('sxml.xml'):
+            xml = open(fileName).read()
+        else:
+            xml = RobotTags(fileName, None, failTest).gen_xml(False)
+
+        testSetList = [etree.tostring(node) for node in etree.fromstring(xml).findall('*/test_set')]
+
+    except Exception as e:
+        logger.debug('parseRobotFile: %s: %s' % (fileName, e))
+        return fileName, None, time.time() - start_time
+
+    return fileName, testSetList, time.time() - start_time
+
+
+def parseRobotFiles(fileList, failTest='default', workers=1):
+    '''
+    Get the test sets of several Robot output files / sxml files - parsed in a pool of processes if workers > 1.
+    Results are returned in the order of fileList whatever the order in which the files are parsed, so the merged
+    sxml is always the same
+    :param fileList: list of files
+    :param failTest: fail_test of RobotTags
+    :param workers: number of processes (0 or None: one per CPU, 1: no pool)
+    :return: generator of (file name, list of serialized test_set elements or None, parse time)
+    '''
+
+    argsList = [(fileName, failTest) for fileName in fileList]
+
+    if not workers:
+        workers = multiprocessing.cpu_count()
+
+    workers = min(workers, len(argsList))
+
+    if workers <= 1:
+        for fileArgs in argsList:
+            yield parseRobotFile(fileArgs)
+        return
+
+    logger.info('parseRobotFiles: Parsing %d files in %d processes' % (len(argsList), workers))
+
+    pool = multiprocessing.Pool(workers)
+
+    try:
+        # imap keeps the order of argsList
+        for result in pool.imap(parseRobotFile, argsList):
+            yield result
+
+    finally:
+        pool.terminate()
+        pool.join()
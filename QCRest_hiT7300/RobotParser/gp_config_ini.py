@@ -2,11 +2,31 @@
 __author__ = 'Matteo Feroldi'
 
 # Collection of functions to read and write information in config file (.ini file)
+#
+# Files are parsed once and kept in a cache shared by all ConfigIni of the same file - the cache is reloaded when
+# the modification time of the file changes, so the ini files are not read again each time a value is read
 
 
+import os
+import threading
+from collections import OrderedDict
 from ConfigParser import SafeConfigParser
 
 
+# Path -> (modification time, {section: {option: value}})
+_cacheDict = {}
+_cacheLock = threading.Lock()
+
+
+def _getModificationTime(path):
+
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        # File does not exist
+        return None
+
+
 class ConfigIni():
 
     def __init__(self, path):
@@ -14,13 +34,45 @@ class ConfigIni():
         self.parser = SafeConfigParser()
         self.path = path
 
+    # Get the sections of the file from the cache - file is parsed only if it changed since it was cached
+
+    def _get_sections(self):
+
+        key = os.path.abspath('%s' % self.path)
+        mtime = _getModificationTime(key)
+
+        with _cacheLock:
+            entry = _cacheDict.get(key)
+
+            if entry is not None and entry[0] == mtime:
+                return entry[1]
+
+        parser = SafeConfigParser()
+        parser.read(key)
+
+        sections = OrderedDict()
+        for section in parser.sections():
+            sections[section] = OrderedDict([(option, parser.get(section, option))
+                                             for option in parser.options(section)])
+
+        with _cacheLock:
+            _cacheDict[key] = (mtime, sections)
+
+        return sections
+
+    # Drop the cached file so that it is parsed again on the next read
+
+    def clear_cache(self):
+
+        with _cacheLock:
+            _cacheDict.pop(os.path.abspath('%s' % self.path), None)
+
     # Read the value from the option inside the session, output: value (string)
 
     def read_value(self, section, option):
-        self.parser.read('%s' % self.path)
-        if section in self.parser.sections():
-            if option in self.parser.options(section):
-                return self.parser.get('%s' % section, '%s' % option)
+        sections = self._get_sections()
+        if section in sections:
+            return sections[section].get(option)
         else:
             return None
 
@@ -28,14 +80,11 @@ class ConfigIni():
     # Read all values and all options inside the session, output: values list(string), options list(string)
 
     def read_all_values(self, section):
-        self.parser.read('%s' % self.path)
-        if section in self.parser.sections():
-            options = self.parser.options(section)
+        sections = self._get_sections()
+        if section in sections:
+            options = sections[section]
             if options:
-                values = []
-                for value in self.parser.items(section):
-                    values.append(value[1])
-                return options, values
+                return options.keys(), options.values()
         else:
             return None
 
@@ -59,11 +108,17 @@ class ConfigIni():
         self.parser.write(cfgfile)
         cfgfile.close()
 
+        # Modification time may not change if the file is written twice in the same second
+        self.clear_cache()
+
 
     # Read all sections, output: sections list(string)
 
     def read_sections(self):
-        self.parser.read('%s' % self.path)
-        sections = self.parser.sections()
-        return sections
+        return self._get_sections().keys()
+
+
+    # Snapshot of the whole file, output: {section: {option: value}} (copy - can be changed by the caller)
 
+    def read_snapshot(self):
+        return OrderedDict([(section, dict(options)) for section, options in self._get_sections().iteritems()])
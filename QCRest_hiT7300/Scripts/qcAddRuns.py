@@ -13,17 +13,20 @@ import sys
 import time
 
 try:
-    from QCRest_hiT7300 import RobotTags
-    from QCRest_hiT7300 import hiT7300_QC, ConnectionError, QCError
+    from QCRest_hiT7300 import RobotTags, parseRobotFiles
+    from QCRest_hiT7300 import hiT7300_QC, ConnectionError, QCError, QCJournal, QCPlan, CassetteSession, openCassette
+    from QCRest_hiT7300 import QCMetrics, profileMain, addProfileArguments
     
 except:
     sys.path.append(os.path.dirname(os.path.abspath(__file__)).rsplit("\\", 2)[0])
 
-    from QCRest_hiT7300 import RobotTags
-    from QCRest_hiT7300 import hiT7300_QC, ConnectionError, QCError
+    from QCRest_hiT7300 import RobotTags, parseRobotFiles
+    from QCRest_hiT7300 import hiT7300_QC, ConnectionError, QCError, QCJournal, QCPlan, CassetteSession, openCassette
+    from QCRest_hiT7300 import QCMetrics, profileMain, addProfileArguments
 
-from QCRest_hiT7300 import RobotTags
-from QCRest_hiT7300 import hiT7300_QC, ConnectionError, QCError
+from QCRest_hiT7300 import RobotTags, parseRobotFiles
+from QCRest_hiT7300 import hiT7300_QC, ConnectionError, QCError, QCJournal, QCPlan, CassetteSession, openCassette
+from QCRest_hiT7300 import QCMetrics, profileMain, addProfileArguments
 
 logger = logging.getLogger('QCRest')
 
@@ -40,8 +43,15 @@ def main(argv):
 
     release = args.release
 
+    # Record / replay the QC requests
+    cassette = openCassette(args.record, args.replay, args.replay_speed)
+
+    session = None
+    if cassette is not None:
+        session = CassetteSession(cassette)
+
     # Establish connection to QC
-    qc_con = hiT7300_QC(None, None, None, release=release)
+    qc_con = hiT7300_QC(None, None, None, session=session, release=release)
 
     # Start Time
     start_time = time.time()
@@ -82,48 +92,20 @@ def main(argv):
 
             root = ET.fromstring(sxml)
 
-            for fileFound in getFileList(path, sxmlFileType):
+            # Files are parsed in parallel with --workers - test sets are merged in the order of the file list
+            for fileFound, testSetList, parse_time in parseRobotFiles(list(getFileList(path, sxmlFileType)),
+                                                                      importFailRule, args.workers):
 
-                if fileFound.endswith("sxml.xml"):
+                if testSetList is None:
+                    # Error found
+                    print '%s,-' % (fileFound)
+                    continue
+
+                for node in testSetList:
+                    root[0].append(ET.fromstring(node))
+
+                print '%s, %s' % (fileFound, parse_time)
 
-                    try:
-                        process_time = time.time()
-                        
-                        xml = qc_con.readXmlFromFile(fileFound)
-    
-                        parse_time = time.time() - process_time
-    
-                        toAdd = ET.fromstring(xml)
-    
-                        for node in toAdd.findall('*/test_set'):
-                            root[0].append(node)
-    
-                        print '%s, %s' % (fileFound, parse_time)
-    
-                    except:
-                        # Error found
-                        print '%s,-' % (fileFound)
-                
-                else:
-
-                    try:
-                        process_time = time.time()
-    
-                        xml = processFile(fileFound, importFailRule)
-    
-                        parse_time = time.time() - process_time
-    
-                        toAdd = ET.fromstring(xml)
-    
-                        for node in toAdd.findall('*/test_set'):
-                            root[0].append(node)
-    
-                        print '%s, %s' % (fileFound, parse_time)
-    
-                    except:
-                        # Error found
-                        print '%s,-' % (fileFound)
-            
             sxml = ET.tostring(root)
 
         # Save xml for possible debug
@@ -132,15 +114,39 @@ def main(argv):
         # Upload to QC
         rest_time_start = time.time()
 
+        # Time, requests and entities written of each phase of the upload
+        metrics = QCMetrics()
+
         if sxml == '<report><test_sets/></report>':
 
             logger.warning('Sxml file is empty! Please check if the file(s) exist!')
 
+        elif args.plan:
+
+            # Dry run - only read-only calls are done
+            plan = QCPlan()
+
+            processRest(qc_con, sxml, plan=plan, metrics=metrics)
+
+            print '\nQCREST: Plan\n%s' % plan.report()
+
         else:
 
-            processRest(qc_con, sxml)
+            # Checkpoint journal - an interrupted upload of the same sxml resumes where it stopped
+            journal = None
+
+            if args.journal:
+                journal = QCJournal(QCJournal.getJobId('qcAddRuns', sxml))
+
+            processRest(qc_con, sxml, journal, metrics=metrics)
+
+            if journal is not None:
+                journal.finish()
 
         print 'Upload to REST: %s seconds!' % (time.time() - rest_time_start)
+
+        if metrics.phaseDict:
+            print '\nQCREST: Metrics\n%s\n' % metrics.report()
             
         print 'Congratulation! Script ran successfully!'
         print '--- %s seconds ---' % ( time.time() - start_time)
@@ -158,6 +164,12 @@ def main(argv):
             raise AssertionError('\nUps, an exception was raised: ' + e.expr + ' - ' + e.msg)
             #print ('\nUps, an exception was raised: ' + e.expr + ' - ' + e.msg)
 
+        finally:
+
+            # Save recorded requests - also when the upload fails
+            if cassette is not None and cassette.mode == 'record':
+                cassette.save()
+
     print ("Bye bye!")
 
 def processFile(fileFound, update_fail_tests_with_status):
@@ -167,24 +179,24 @@ def processFile(fileFound, update_fail_tests_with_status):
 
     return xml
 
-def processRest(qc_con, xml):
+def processRest(qc_con, xml, journal=None, plan=None, metrics=None):
 
     process_time = time.time()
     print '\nQCREST: Start adding tests to test plan'
-    qc_con.addTestToTestPlan(xml, True, False)
+    qc_con.addTestToTestPlan(xml, True, False, journal=journal, plan=plan, metrics=metrics)
     print 'QCREST: Done in %ss' % (time.time() - process_time)
     process_time = time.time()
     print '\nQCREST: Start adding testsets to test lab'
-    qc_con.addTestSet(xml)
+    qc_con.addTestSet(xml, journal=journal, plan=plan, metrics=metrics)
     print 'QCREST: Done in %ss' % (time.time() - process_time)
     process_time = time.time()
     print '\nQCREST: Start adding test instance to test lab'
-    qc_con.addTestInstanceToTestLab(xml)
+    qc_con.addTestInstanceToTestLab(xml, journal=journal, plan=plan, metrics=metrics)
     print 'QCREST: Done in %ss' % (time.time() - process_time)
 
     process_time = time.time()
     print '\nQCREST: Start adding test run to test lab'
-    qc_con.addTestRunToTestLab(xml)
+    qc_con.addTestRunToTestLab(xml, journal=journal, plan=plan, metrics=metrics)
     print 'QCREST: Done in %ss' % (time.time() - process_time)
 
 def getArgsParser():
@@ -194,6 +206,18 @@ def getArgsParser():
     parser.add_argument('-s','--input_file_type', help="File type should be either \'sxml\' or \'xml\'. Default is \'sxml\'")
     parser.add_argument('-r','--release', help="Release name: If passed, default login and QC server info is used." +
                                                "Supported values are: \'5.40.xx\' or \'5.50.xx\'")
+    parser.add_argument('-j', '--journal', action='store_true',
+                        help="Keep a checkpoint journal so that an interrupted upload resumes where it stopped.")
+    parser.add_argument('--plan', action='store_true',
+                        help="Dry run: only report the entities created/updated/deleted and the write requests.")
+    parser.add_argument('--record', help="Record the QC requests to this cassette file.")
+    parser.add_argument('--replay', help="Replay the QC requests from this cassette file (no network).")
+    parser.add_argument('--replay-speed', type=float,
+                        help="Replay with the recorded request times divided by this value. Default: no wait.")
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help="Parse the robot output files of a folder in this number of processes (0: one per CPU)." +
+                             " Default is 1")
+    addProfileArguments(parser)
     return parser
 
 def getFileList(path, sxmlFileType):
@@ -201,12 +225,12 @@ def getFileList(path, sxmlFileType):
     # Get list of files
     for currentDir, subFolders, files in os.walk(path, False):
 
-        for fileinfolder in files:
+        for fileinfolder in sorted(files):
 
             if fileinfolder.__contains__(sxmlFileType):
 
                 yield os.path.join(currentDir, fileinfolder)
 
 if __name__ == '__main__':
-    main(sys.argv)
+    profileMain(main, sys.argv)
     
@@ -14,8 +14,9 @@ import os
 import sys
 import time
 
-from QCRest_hiT7300 import RobotTags, gp_config_ini
-from QCRest_hiT7300 import hiT7300_QC, ConnectionError, QCError
+from QCRest_hiT7300 import RobotTags, gp_config_ini, parseRobotFiles
+from QCRest_hiT7300 import hiT7300_QC, ConnectionError, QCError, QCJournal, QCPlan, CassetteSession, openCassette
+from QCRest_hiT7300 import profileMain, addProfileArguments
 
 logger = logging.getLogger('QCRest')
 
@@ -32,8 +33,15 @@ def main(argv):
 
     release = args.release
 
+    # Record / replay the QC requests
+    cassette = openCassette(args.record, args.replay, args.replay_speed)
+
+    session = None
+    if cassette is not None:
+        session = CassetteSession(cassette)
+
     # Establish connection to QC
-    qc_con = hiT7300_QC(None, None, None, release=release)
+    qc_con = hiT7300_QC(None, None, None, session=session, release=release)
 
     # Start Time
     start_time = time.time()
@@ -71,47 +79,18 @@ def main(argv):
 
             root = ET.fromstring(sxml)
 
-            for fileFound in getFileList(path):
-
-                if fileFound.endswith("sxml.xml"):
-
-                    try:
-                        process_time = time.time()
-
-                        xml = qc_con.readXmlFromFile(fileFound)
-
-                        parse_time = time.time() - process_time
-
-                        toAdd = ET.fromstring(xml)
-
-                        for node in toAdd.findall('*/test_set'):
-                            root[0].append(node)
-
-                        logger.info('qcCreateStructure: %s, %s' % (fileFound, parse_time))
-
-                    except:
-                        # Error found
-                        logger.info('qcCreateStructure: %s,-' % (fileFound))
-
-                else:
-
-                    try:
-                        process_time = time.time()
-
-                        xml = processFile(fileFound)
+            # Files are parsed in parallel with --workers - test sets are merged in the order of the file list
+            for fileFound, testSetList, parse_time in parseRobotFiles(list(getFileList(path)), workers=args.workers):
 
-                        parse_time = time.time() - process_time
-
-                        toAdd = ET.fromstring(xml)
-
-                        for node in toAdd.findall('*/test_set'):
-                            root[0].append(node)
+                if testSetList is None:
+                    # Error found
+                    logger.info('qcCreateStructure: %s,-' % (fileFound))
+                    continue
 
-                        logger.info('qcCreateStructure: %s, %s' % (fileFound, parse_time))
+                for node in testSetList:
+                    root[0].append(ET.fromstring(node))
 
-                    except:
-                        # Error found
-                        logger.info('qcCreateStructure: %s,-' % (fileFound))
+                logger.info('qcCreateStructure: %s, %s' % (fileFound, parse_time))
 
             sxml = ET.tostring(root)
 
@@ -129,9 +108,27 @@ def main(argv):
 
             logger.warning('Sxml file is empty! Please check if the file(s) exist!')
 
+        elif args.plan:
+
+            # Dry run - only read-only calls are done
+            plan = QCPlan()
+
+            processRest(qc_con, sxml, args, plan=plan)
+
+            logger.info('qcCreateStructure: Plan\n%s' % plan.report())
+
         else:
 
-            processRest(qc_con, sxml, args)
+            # Checkpoint journal - an interrupted upload of the same sxml resumes where it stopped
+            journal = None
+
+            if args.journal:
+                journal = QCJournal(QCJournal.getJobId('qcCreateStructure', sxml))
+
+            processRest(qc_con, sxml, args, journal)
+
+            if journal is not None:
+                journal.finish()
 
         print 'Upload to REST: %s seconds!' % (time.time() - rest_time_start)
 
@@ -149,6 +146,12 @@ def main(argv):
         except (ConnectionError, QCError) as e:
             print ('\nUps, an exception was raised: ' + e.expr + ' - ' + e.msg)
 
+        finally:
+
+            # Save recorded requests - also when the upload fails
+            if cassette is not None and cassette.mode == 'record':
+                cassette.save()
+
     print ("Bye bye!")
 
     if not args.silence:
@@ -201,21 +204,21 @@ def processFile(fileFound):
 
     return xml
 
-def processRest(qc_con, xml, args):
+def processRest(qc_con, xml, args, journal=None, plan=None):
     if args.testplan or not (args.testplan or args.testlab):
         process_time = time.time()
         logger.info('qcCreateStructure: Start adding tests to test plan')
-        qc_con.addTestToTestPlan(xml, True, False)
+        qc_con.addTestToTestPlan(xml, True, False, journal=journal, plan=plan)
         logger.info('qcCreateStructure: Done in %ss' % (time.time() - process_time))
 
     if args.testlab or not (args.testplan or args.testlab):
         process_time = time.time()
         logger.info('qcCreateStructure: Start adding testsets to test lab')
-        qc_con.addTestSet(xml)
+        qc_con.addTestSet(xml, journal=journal, plan=plan)
         logger.info('qcCreateStructure: Done in %ss' % (time.time() - process_time))
         process_time = time.time()
         logger.info('qcCreateStructure: Start adding test instance to test lab')
-        qc_con.addTestInstanceToTestLab(xml)
+        qc_con.addTestInstanceToTestLab(xml, journal=journal, plan=plan)
         logger.info('qcCreateStructure: Done in %ss' % (time.time() - process_time))
 
 def warning(data):
@@ -237,16 +240,28 @@ def getArgsParser():
                         help="File type should be either \'sxml\' or \'xml\'. Default is \'sxml\'")
     parser.add_argument('-r', '--release', help="Release name: If passed, default login and QC server info is used." +
                                                 "Supported values are: \'5.40.xx\' or \'5.50.xx\'")
+    parser.add_argument('-j', '--journal', action='store_true',
+                        help="Keep a checkpoint journal so that an interrupted upload resumes where it stopped.")
+    parser.add_argument('--plan', action='store_true',
+                        help="Dry run: only report the entities created/updated/deleted and the write requests.")
+    parser.add_argument('--record', help="Record the QC requests to this cassette file.")
+    parser.add_argument('--replay', help="Replay the QC requests from this cassette file (no network).")
+    parser.add_argument('--replay-speed', type=float,
+                        help="Replay with the recorded request times divided by this value. Default: no wait.")
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help="Parse the robot output files of a folder in this number of processes (0: one per CPU)." +
+                             " Default is 1")
+    addProfileArguments(parser)
     return parser
 
 def getFileList(path):
     # Get list of files
     for currentDir, subFolders, files in os.walk(path, False):
 
-        for fileinfolder in files:
+        for fileinfolder in sorted(files):
 
             if fileinfolder.__contains__('.xml'):
                 yield os.path.join(currentDir, fileinfolder)
 
 if __name__ == '__main__':
-    main(sys.argv)
+    profileMain(main, sys.argv)
@@ -0,0 +1,46 @@
+__author__ = 'Rodolfo Andrade'
+
+import argparse
+import logging
+import os
+import sys
+
+try:
+    from QCRest_hiT7300 import FakeALMServer
+
+except:
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)).rsplit("\\", 2)[0])
+
+    from QCRest_hiT7300 import FakeALMServer
+
+logger = logging.getLogger('QCRest')
+
+def main(argv):
+
+    args = getArgsParser().parse_args()
+
+    users = None
+
+    # Users accepted on login e.g. 'user:passwd'
+    if args.user:
+        users = dict([user.split(':', 1) for user in args.user])
+
+    server = FakeALMServer(args.host, args.port, args.latency, users)
+
+    print 'Fake ALM server running on %s (Ctrl+C to stop)' % server.url
+
+    server.serveForever()
+
+    print ("Bye bye!")
+
+def getArgsParser():
+    parser = argparse.ArgumentParser(description='Run a local fake ALM REST server with an in-memory store.')
+    parser.add_argument('--host', default='127.0.0.1', help="Host to bind.")
+    parser.add_argument('--port', type=int, default=8090, help="Port to bind.")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to each request.")
+    parser.add_argument('-u', '--user', action='append',
+                        help="User accepted on login as \'user:passwd\' (can be repeated). Default: any user.")
+    return parser
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -5,7 +5,28 @@ from hiT7300_QC import hiT7300_QC
 from QCRest.qc import QCError
 from QCRest.connect import ConnectionError
 
-from QCRest_Robot import RobotTags
+# Import checkpoint journal used to resume interrupted jobs
+from QCRest.journal import QCJournal
+
+# Import plan used in dry runs
+from QCRest.plan import QCPlan
+
+# Import metrics of the phases of the imports
+from QCRest.metrics import QCMetrics
+
+# Import fake ALM server used to run offline
+from QCRest.fakealm import FakeALMServer, FakeALMStore, FakeALMApp
+
+# Import cassette used to record / replay the requests
+from QCRest.cassette import Cassette, CassetteSession, openCassette
+
+# Import profiler used by the --profile option of the scripts
+from QCRest.profiler import QCProfiler, profileMain, addProfileArguments
+
+# Import Prometheus exporter used by the long running syncs
+from QCRest.exporter import MetricsExporter
+
+from QCRest_Robot import RobotTags, parseRobotFiles
 from RobotParser import gp_config_ini
 # from RobotParser import gp_config_ini, gp_logger
 
@@ -2,14 +2,21 @@
 __author__ = 'Rodolfo Andrade'
 
 import base64
+import cStringIO
+import csv
 import itertools
 import logging
 import re
+import threading
+from multiprocessing.pool import ThreadPool
 
 from QCRest import QC
 
 logger = logging.getLogger('QCRest')
 
+# Step number in design step names e.g. 'Step 12'
+_stepNumberRegex = re.compile(r'Step\s+(\d+)')
+
 class hiT7300_QC(QC):
     '''
     hiT7300 specific class
@@ -72,6 +79,10 @@ class hiT7300_QC(QC):
             }
         }
 
+        # Cache of release name -> release id - see getReleaseIdDict
+        self._releaseIdDict = None
+        self._releaseIdDictLock = threading.Lock()
+
         super(hiT7300_QC, self).__init__(server, project, domain, silent, session, proxies)
 
     def login(self, user=None, passwd=None, **kwargs):
@@ -87,6 +98,42 @@ class hiT7300_QC(QC):
 
         return login_r
 
+    def getReleaseIdDict(self, forceUpdate=False):
+        '''
+        Get dict release name -> release id. Releases are only requested once and shared by all the sync processes
+        using this connection
+        :param forceUpdate: request releases again
+        :return: dict release name -> release id
+        '''
+
+        with self._releaseIdDictLock:
+
+            if self._releaseIdDict is None or forceUpdate:
+
+                r = self.Releases.getEntity('id,name')
+                xml = self._getXmlFromRequestQueryList(r)
+                releaseList = self.Releases.getEntityDataCollectionFieldValueList(['name', 'id'], xml)
+
+                self._releaseIdDict = dict(itertools.izip(releaseList[0], releaseList[1]))
+
+            return self._releaseIdDict
+
+    def getReleaseId(self, releaseName):
+        '''
+        Get the id of a release. If the release is not in the cached dict the releases are requested again, so a
+        release created after the cache was filled is found
+        :param releaseName: name of the release
+        :return: release id - KeyError if the release does not exist in QC
+        '''
+
+        releaseIdDict = self.getReleaseIdDict()
+
+        if releaseName not in releaseIdDict:
+            logger.info('Release %s not in cache, requesting releases again...' % releaseName)
+            releaseIdDict = self.getReleaseIdDict(forceUpdate=True)
+
+        return releaseIdDict[releaseName]
+
     def syncDefects(self, fieldDataList, jiraKey, deleteReq=True):
 
         req = []
@@ -776,9 +823,16 @@ class hiT7300_QC(QC):
 
         return r
 
-    def getCSVWithRunsFromTargetCycle(self, qcRelease, releaseName=None):
+    def getCSVWithRunsFromTargetCycle(self, qcRelease, releaseName=None, outFile=None):
+        '''
+        Build a CSV report with all runs / test instances / target cycles of a release
+        :param qcRelease: QC release name whose target cycles are reported
+        :param releaseName: only runs with this release name (user-03) are reported - None for all runs
+        :param outFile: file path or file-like object where the CSV is streamed to (optional)
+        :return: CSV string if outFile is None otherwise None
+        '''
 
-        runList = []
+        logger.info('getCSVWithRunsFromTargetCycle: Start...')
 
         if releaseName is None:
 
@@ -804,11 +858,6 @@ class hiT7300_QC(QC):
             runList = self.TestLabRuns.getEntityDataCollectionFieldValueList(
                 ['id', 'name', 'status', 'testcycl-id'], xml)
 
-        runIdList = runList[0]
-        runNameList = runList[1]
-        runStatusList = runList[2]
-        testInstanceIdList = runList[3]
-
         # Get id of Release
         idReleaseQuery = self._getQueryListOrAnd(['name'], [[qcRelease]])
 
@@ -828,11 +877,8 @@ class hiT7300_QC(QC):
         releaseCycleList = self.ReleaseCycles.getEntityDataCollectionFieldValueList(
             ['id', 'name'], xml)
 
-        idTargetCyclesXml = releaseCycleList[0]
-        nameTargetCyclesXml = releaseCycleList[1]
-
         # Get all test instances id that have this target cycle
-        query = self._getQueryListOrAnd(['assign-rcyc'], [idTargetCyclesXml])
+        query = self._getQueryListOrAnd(['assign-rcyc'], [releaseCycleList[0]])
 
         r = self.TestLabTestInstances.getEntityQueryList(query, 'test-id,assign-rcyc,status')
 
@@ -841,166 +887,144 @@ class hiT7300_QC(QC):
         testLabTestInstanceList = self.TestLabTestInstances.getEntityDataCollectionFieldValueList(
             ['test-id', 'id', 'assign-rcyc', 'status'], xml)
 
-        testIdList = testLabTestInstanceList[0]
-        testInstIdList = testLabTestInstanceList[1]
-        testTargetCycleIdList = testLabTestInstanceList[2]
-        testInstStatusList = testLabTestInstanceList[3]
-
         # Get test names from their ID
-        query = self._getQueryListOrAnd(['id'], [testIdList])
+        query = self._getQueryListOrAnd(['id'], [testLabTestInstanceList[0]])
 
         r = self.TestPlanTests.getEntityQueryList(query, 'name,id,user-12,user-26')
 
         xml = self._getXmlFromRequestQueryList(r)
 
-        testList = self.TestPlanTests.getEntityDataCollectionFieldValueList(['name', 'id','user-12','user-26'], xml)
-
-        testNameListXml = testList[0]
-        testIdListXml = testList[1]
-        testInstAutoLevelListXml = testList[2]
-        testInstDetailAutoLevelListXml = testList[3]
-
-        testNameList = []
-        targetCyclesNameList = []
-        testInstAutoLevelList = []
-        testInstDetailAutoLevelList = []
-
-        for testId, targetCycle in itertools.izip(testIdList, testTargetCycleIdList):
-
-            for testNameXml, testIdXml,testInstAutoLevelXml, testInstDetailAutoLevelXml in itertools.izip(
-                    testNameListXml, testIdListXml, testInstAutoLevelListXml, testInstDetailAutoLevelListXml):
-
-                if testIdXml == testId:
-                    testNameList.append(testNameXml)
-                    testInstAutoLevelList.append(testInstAutoLevelXml)
-                    testInstDetailAutoLevelList.append(testInstDetailAutoLevelXml)
-
-                    break
-
-            else:
-                testNameList.append(None)
-                testInstAutoLevelList.append(None)
-                testInstDetailAutoLevelList.append(None)
-
-            for idTargetCycleXml, nameTargetCycleXml in itertools.izip(idTargetCyclesXml, nameTargetCyclesXml):
-
-                if idTargetCycleXml == targetCycle:
-                    targetCyclesNameList.append(nameTargetCycleXml)
-
-                    break
-
-            else:
-                targetCyclesNameList.append(None)
+        testList = self.TestPlanTests.getEntityDataCollectionFieldValueList(['name', 'id', 'user-12', 'user-26'], xml)
 
-        dataCSV = 'Run ID,Run Name,Status,Test Instance Name,Test Instance Status,Target Cycle,TI_id,Automation Level,Detailed Automation Level\n'
+        csvData = self._writeCSVWithRunsFromTargetCycle(outFile, runList, releaseCycleList,
+                                                        testLabTestInstanceList, testList)
 
-        # List of tc mapped
-        tcMapped = []
+        logger.info('getCSVWithRunsFromTargetCycle: ...done!')
 
-        # List of ti mapped
-        tiMapped = []
+        return csvData
 
-        for runId, runName, runStatus, testInstanceId in itertools.izip(
-                runIdList, runNameList, runStatusList, testInstanceIdList):
+    def _writeCSVWithRunsFromTargetCycle(self, outFile, runList, releaseCycleList, testLabTestInstanceList, testList):
+        '''
+        Join runs, test instances, tests and target cycles and stream the result as CSV
+        :param outFile: file path or file-like object - if None the CSV is returned as a string
+        :param runList: [id, name, status, testcycl-id] lists of runs
+        :param releaseCycleList: [id, name] lists of target cycles
+        :param testLabTestInstanceList: [test-id, id, assign-rcyc, status] lists of test instances
+        :param testList: [name, id, user-12, user-26] lists of tests
+        :return: CSV string if outFile is None otherwise None
+        '''
 
-            if testInstanceId in testInstIdList:
-                idx = testInstIdList.index(testInstanceId)
+        def _csvValue(value):
+            # csv module in python 2 does not handle unicode
+            if value is None:
+                return ''
+            if isinstance(value, unicode):
+                return value.encode('utf-8')
+            return value
+
+        # Test id -> (name, automation level, detailed automation level)
+        testDict = {}
+        for testName, testId, autoLevel, detailAutoLevel in itertools.izip(*testList):
+            testDict.setdefault(testId, (testName, autoLevel, detailAutoLevel))
+
+        # Target cycle id -> target cycle name
+        targetCycleDict = {}
+        for idTargetCycle, nameTargetCycle in itertools.izip(*releaseCycleList):
+            targetCycleDict.setdefault(idTargetCycle, nameTargetCycle)
+
+        # Test instance id -> [name, status, target cycle, id, automation level, detailed automation level]
+        testInstanceDict = {}
+        testInstanceOrder = []
+        for testId, testInstId, targetCycleId, testInstStatus in itertools.izip(*testLabTestInstanceList):
+
+            if testInstId in testInstanceDict:
+                continue
 
-                if runStatus is None:
-                    runStatus = ''
+            testName, autoLevel, detailAutoLevel = testDict.get(testId, (None, None, None))
 
-                if testInstAutoLevelList[idx] is None:
-                    testInstAutoLevelList[idx] = ''
+            testInstanceDict[testInstId] = [_csvValue(testName), _csvValue(testInstStatus),
+                                            _csvValue(targetCycleDict.get(targetCycleId)), _csvValue(testInstId),
+                                            _csvValue(autoLevel), _csvValue(detailAutoLevel)]
+            testInstanceOrder.append(testInstId)
 
-                if testInstDetailAutoLevelList[idx] is None:
-                    testInstDetailAutoLevelList[idx] = ''
+        # Output file
+        closeFile = False
+        if outFile is None:
+            csvFile = cStringIO.StringIO()
+        elif isinstance(outFile, basestring):
+            csvFile = open(outFile, 'wb')
+            closeFile = True
+        else:
+            csvFile = outFile
 
-                if testInstStatusList[idx] is None:
-                    testInstStatusList[idx] = ''
+        try:
+            writer = csv.writer(csvFile, lineterminator='\n')
 
-                dataCSV += runId + ','
-                dataCSV += runName.replace(",", "#") + ','
-                dataCSV += runStatus + ','
-                dataCSV += testNameList[idx].replace(",", "#") + ','
-                dataCSV += testInstStatusList[idx].replace(",", "#") + ','
-                dataCSV += targetCyclesNameList[idx].replace(",", "#") + ','
-                dataCSV += testInstanceId.replace(",", "#") + ','
-                dataCSV += testInstAutoLevelList[idx].replace(",", "#") + ','
-                dataCSV += testInstDetailAutoLevelList[idx].replace(",", "#") + '\n'
+            writer.writerow(['Run ID', 'Run Name', 'Status', 'Test Instance Name', 'Test Instance Status',
+                             'Target Cycle', 'TI_id', 'Automation Level', 'Detailed Automation Level'])
 
-                # Add tc to a TC list so we know which are already mapped
-                tcMapped.append(targetCyclesNameList[idx])
-                tiMapped.append(testInstanceId)
+            # Target cycles and test instances already mapped
+            tcMapped = set()
+            tiMapped = set()
 
-        # Iterate through test instance list and the ones which do not have runs
-        for idx, tiId in enumerate(testInstIdList):
+            for runId, runName, runStatus, testInstanceId in itertools.izip(*runList):
 
-            if tiId not in tiMapped:
+                testInstanceRow = testInstanceDict.get(testInstanceId)
 
-                if testInstAutoLevelList[idx] is None:
-                    testInstAutoLevelList[idx] = ''
+                if testInstanceRow is None:
+                    continue
 
-                if testInstDetailAutoLevelList[idx] is None:
-                    testInstDetailAutoLevelList[idx] = ''
+                writer.writerow([_csvValue(runId), _csvValue(runName), _csvValue(runStatus)] + testInstanceRow)
 
-                if testInstStatusList[idx] is None:
-                    testInstStatusList[idx] = ''
+                tcMapped.add(testInstanceRow[2])
+                tiMapped.add(testInstanceId)
 
-                dataCSV += ','
-                dataCSV += ','
-                dataCSV += ','
-                dataCSV += testNameList[idx].replace(",", "#") + ','
-                dataCSV += testInstStatusList[idx].replace(",", "#") + ','
-                dataCSV += targetCyclesNameList[idx].replace(",", "#") + ','
-                dataCSV += testInstIdList[idx].replace(",", "#") + ','
-                dataCSV += testInstAutoLevelList[idx].replace(",", "#") + ','
-                dataCSV += testInstDetailAutoLevelList[idx].replace(",", "#") + '\n'
+            # Test instances which do not have runs
+            for testInstId in testInstanceOrder:
 
-                # Add TC to a TC list so we know which are already mapped
-                tcMapped.append(targetCyclesNameList[idx])
+                if testInstId in tiMapped:
+                    continue
 
-        # Add remaining target cycle if they do not have a run nor a test
-        for tcName in nameTargetCyclesXml:
+                testInstanceRow = testInstanceDict[testInstId]
 
-            if tcName not in tcMapped:
-                dataCSV += ',,,,,' + tcName.replace(",", "#") + ',,,\n'
+                writer.writerow(['', '', ''] + testInstanceRow)
 
-        return dataCSV
+                tcMapped.add(testInstanceRow[2])
 
-    def getCSVWithRunsFromTargetCycleAndMultipleReleases(self, qcReleaseList, releaseNameList=None):
+            # Add remaining target cycle if they do not have a run nor a test
+            for tcName in releaseCycleList[1]:
 
-        runList = []
+                tcName = _csvValue(tcName)
 
-        if releaseNameList is None:
+                if tcName not in tcMapped:
+                    writer.writerow(['', '', '', '', '', tcName, '', '', ''])
 
-            print "Getting ALL RUNS"
-            # Get all runs
-            r = self.TestLabRuns.getEntity('id,name,status,assign-rcyc,test-id,testcycl-id')
+            if outFile is None:
+                return csvFile.getvalue()
 
-            xml = self._getXmlFromRequestQueryList(r)
+        finally:
+            if closeFile:
+                csvFile.close()
 
-            runList = self.TestLabRuns.getEntityDataCollectionFieldValueList(
-                ['id', 'name', 'status', 'testcycl-id'], xml)
-
-        else:
-
-            print "Getting only " + str(releaseNameList) + " RUNS"
-            # Get all runs from target release
-            query = self._getQueryListOrAnd(['user-03'], [releaseNameList])
+    def getCSVWithRunsFromTargetCycleAndMultipleReleases(self, qcReleaseList, releaseNameList=None, outFile=None,
+                                                         maxWorkers=4):
+        '''
+        Build a single CSV report with all runs / test instances / target cycles of several releases. Releases,
+        target cycles and tests are fetched once for all releases and the per release run / test instance queries
+        are done concurrently
+        :param qcReleaseList: list of QC release names whose target cycles are reported
+        :param releaseNameList: only runs with these release names (user-03) are reported - None for all runs
+        :param outFile: file path or file-like object where the CSV is streamed to (optional)
+        :param maxWorkers: max number of concurrent queries
+        :return: CSV string if outFile is None otherwise None
+        '''
 
-            r = self.TestLabRuns.getEntityQueryList(query, 'id,name,status,assign-rcyc,test-id,testcycl-id')
+        logger.info('getCSVWithRunsFromTargetCycleAndMultipleReleases: Start...')
 
-            xml = self._getXmlFromRequestQueryList(r)
-
-            runList = self.TestLabRuns.getEntityDataCollectionFieldValueList(
-                ['id', 'name', 'status', 'testcycl-id'], xml)
+        runFields = ['id', 'name', 'status', 'testcycl-id']
+        testInstanceFields = ['test-id', 'id', 'assign-rcyc', 'status']
 
-        runIdList = runList[0]
-        runNameList = runList[1]
-        runStatusList = runList[2]
-        testInstanceIdList = runList[3]
-
-        # Get id of Release
+        # Get id of all releases at once
         idReleaseQuery = self._getQueryListOrAnd(['name'], [qcReleaseList])
 
         r = self.Releases.getEntityQueryList(idReleaseQuery, 'id')
@@ -1009,154 +1033,104 @@ class hiT7300_QC(QC):
 
         idRelease = self.Releases.getEntityDataCollectionFieldValue('id', xml)
 
-        # Get all target cycles associated with release
+        # Get all target cycles associated with all releases at once
         query = self._getQueryListOrAnd(['parent-id'], [idRelease])
 
-        r = self.ReleaseCycles.getEntityQueryList(query, 'name,id')
+        r = self.ReleaseCycles.getEntityQueryList(query, 'name,id,parent-id')
 
         xml = self._getXmlFromRequestQueryList(r)
 
-        releaseCycleList = self.ReleaseCycles.getEntityDataCollectionFieldValueList(
-            ['id', 'name'], xml)
+        releaseCycleList = self.ReleaseCycles.getEntityDataCollectionFieldValueList(['id', 'name', 'parent-id'], xml)
 
-        idTargetCyclesXml = releaseCycleList[0]
-        nameTargetCyclesXml = releaseCycleList[1]
+        # Release id -> target cycle id list
+        releaseCycleDict = {}
+        for idTargetCycle, releaseId in itertools.izip(releaseCycleList[0], releaseCycleList[2]):
+            releaseCycleDict.setdefault(releaseId, []).append(idTargetCycle)
 
-        # Get all test instances id that have this target cycle
-        query = self._getQueryListOrAnd(['assign-rcyc'], [idTargetCyclesXml])
+        def _getRuns(releaseName):
 
-        r = self.TestLabTestInstances.getEntityQueryList(query, 'test-id,assign-rcyc,status')
+            if releaseName is None:
+                # Get all runs
+                r = self.TestLabRuns.getEntity('id,name,status,assign-rcyc,test-id,testcycl-id')
+            else:
+                # Get all runs from target release
+                query = self._getQueryListOrAnd(['user-03'], [[releaseName]])
 
-        xml = self._getXmlFromRequestQueryList(r)
+                r = self.TestLabRuns.getEntityQueryList(query, 'id,name,status,assign-rcyc,test-id,testcycl-id')
 
-        testLabTestInstanceList = self.TestLabTestInstances.getEntityDataCollectionFieldValueList(
-            ['test-id', 'id', 'assign-rcyc', 'status'], xml)
+            xml = self._getXmlFromRequestQueryList(r)
 
-        testIdList = testLabTestInstanceList[0]
-        testInstIdList = testLabTestInstanceList[1]
-        testTargetCycleIdList = testLabTestInstanceList[2]
-        testInstStatusList = testLabTestInstanceList[3]
+            return self.TestLabRuns.getEntityDataCollectionFieldValueList(runFields, xml)
 
-        # Get test names from their ID
-        query = self._getQueryListOrAnd(['id'], [testIdList])
+        def _getTestInstances(releaseId):
 
-        r = self.TestPlanTests.getEntityQueryList(query, 'name,id,user-12,user-26')
+            if not releaseCycleDict.get(releaseId):
+                return [[] for field in testInstanceFields]
 
-        xml = self._getXmlFromRequestQueryList(r)
-
-        testList = self.TestPlanTests.getEntityDataCollectionFieldValueList(['name', 'id', 'user-12', 'user-26'], xml)
+            # Get all test instances id that have the target cycles of this release
+            query = self._getQueryListOrAnd(['assign-rcyc'], [releaseCycleDict[releaseId]])
 
-        testNameListXml = testList[0]
-        testIdListXml = testList[1]
-        testInstAutoLevelListXml = testList[2]
-        testInstDetailAutoLevelListXml = testList[3]
+            r = self.TestLabTestInstances.getEntityQueryList(query, 'test-id,assign-rcyc,status')
 
-        testNameList = []
-        targetCyclesNameList = []
-        testInstAutoLevelList = []
-        testInstDetailAutoLevelList = []
+            xml = self._getXmlFromRequestQueryList(r)
 
-        for testId, targetCycle in itertools.izip(testIdList, testTargetCycleIdList):
+            return self.TestLabTestInstances.getEntityDataCollectionFieldValueList(testInstanceFields, xml)
 
-            for testNameXml, testIdXml, testInstAutoLevelXml, testInstDetailAutoLevelXml in itertools.izip(
-                    testNameListXml, testIdListXml, testInstAutoLevelListXml, testInstDetailAutoLevelListXml):
+        # Per release queries - results are kept in the same order as the input
+        jobList = []
 
-                if testIdXml == testId:
-                    testNameList.append(testNameXml)
-                    testInstAutoLevelList.append(testInstAutoLevelXml)
-                    testInstDetailAutoLevelList.append(testInstDetailAutoLevelXml)
+        if releaseNameList is None:
+            print "Getting ALL RUNS"
+            jobList.append((_getRuns, None))
+        else:
+            print "Getting only " + str(releaseNameList) + " RUNS"
+            for releaseName in releaseNameList:
+                jobList.append((_getRuns, releaseName))
 
-                    break
+        for releaseId in idRelease:
+            jobList.append((_getTestInstances, releaseId))
 
-            else:
-                testNameList.append(None)
-                testInstAutoLevelList.append(None)
-                testInstDetailAutoLevelList.append(None)
+        pool = ThreadPool(max(1, min(maxWorkers, len(jobList))))
 
-            for idTargetCycleXml, nameTargetCycleXml in itertools.izip(idTargetCyclesXml, nameTargetCyclesXml):
+        try:
+            resultList = pool.map(lambda job: job[0](job[1]), jobList)
+        finally:
+            pool.close()
+            pool.join()
 
-                if idTargetCycleXml == targetCycle:
-                    targetCyclesNameList.append(nameTargetCycleXml)
+        # Merge per release results
+        runList = [[] for field in runFields]
+        testLabTestInstanceList = [[] for field in testInstanceFields]
 
-                    break
+        for job, result in itertools.izip(jobList, resultList):
 
+            if job[0] is _getRuns:
+                mergedList = runList
             else:
-                targetCyclesNameList.append(None)
-
-        dataCSV = 'Run ID,Run Name,Status,Test Instance Name,Test Instance Status,Target Cycle,TI_id,Automation Level,Detailed Automation Level\n'
-
-        # List of tc mapped
-        tcMapped = []
-
-        # List of ti mapped
-        tiMapped = []
-
-        for runId, runName, runStatus, testInstanceId in itertools.izip(
-                runIdList, runNameList, runStatusList, testInstanceIdList):
-
-            if testInstanceId in testInstIdList:
-                idx = testInstIdList.index(testInstanceId)
+                mergedList = testLabTestInstanceList
 
-                if runStatus is None:
-                    runStatus = ''
+            for mergedValues, values in itertools.izip(mergedList, result):
+                mergedValues += values
 
-                if testInstAutoLevelList[idx] is None:
-                    testInstAutoLevelList[idx] = ''
+        # Get test names from their ID - only once for all releases
+        testList = [[], [], [], []]
 
-                if testInstDetailAutoLevelList[idx] is None:
-                    testInstDetailAutoLevelList[idx] = ''
+        if testLabTestInstanceList[0]:
+            query = self._getQueryListOrAnd(['id'], [list(set(testLabTestInstanceList[0]))])
 
-                if testInstStatusList[idx] is None:
-                    testInstStatusList[idx] = ''
+            r = self.TestPlanTests.getEntityQueryList(query, 'name,id,user-12,user-26')
 
-                dataCSV += runId + ','
-                dataCSV += runName.replace(",", "#") + ','
-                dataCSV += runStatus + ','
-                dataCSV += testNameList[idx].replace(",", "#") + ','
-                dataCSV += testInstStatusList[idx].replace(",", "#") + ','
-                dataCSV += targetCyclesNameList[idx].replace(",", "#") + ','
-                dataCSV += testInstanceId.replace(",", "#") + ','
-                dataCSV += testInstAutoLevelList[idx].replace(",", "#") + ','
-                dataCSV += testInstDetailAutoLevelList[idx].replace(",", "#") + '\n'
-
-                # Add tc to a TC list so we know which are already mapped
-                tcMapped.append(targetCyclesNameList[idx])
-                tiMapped.append(testInstanceId)
-
-        # Iterate through test instance list and the ones which do not have runs
-        for idx, tiId in enumerate(testInstIdList):
-
-            if tiId not in tiMapped:
-
-                if testInstAutoLevelList[idx] is None:
-                    testInstAutoLevelList[idx] = ''
-
-                if testInstDetailAutoLevelList[idx] is None:
-                    testInstDetailAutoLevelList[idx] = ''
-
-                if testInstStatusList[idx] is None:
-                    testInstStatusList[idx] = ''
-
-                dataCSV += ','
-                dataCSV += ','
-                dataCSV += ','
-                dataCSV += testNameList[idx].replace(",", "#") + ','
-                dataCSV += testInstStatusList[idx].replace(",", "#") + ','
-                dataCSV += targetCyclesNameList[idx].replace(",", "#") + ','
-                dataCSV += testInstIdList[idx].replace(",", "#") + ','
-                dataCSV += testInstAutoLevelList[idx].replace(",", "#") + ','
-                dataCSV += testInstDetailAutoLevelList[idx].replace(",", "#") + '\n'
+            xml = self._getXmlFromRequestQueryList(r)
 
-                # Add TC to a TC list so we know which are already mapped
-                tcMapped.append(targetCyclesNameList[idx])
+            testList = self.TestPlanTests.getEntityDataCollectionFieldValueList(['name', 'id', 'user-12', 'user-26'],
+                                                                                xml)
 
-        # Add remaining target cycle if they do not have a run nor a test
-        for tcName in nameTargetCyclesXml:
+        csvData = self._writeCSVWithRunsFromTargetCycle(outFile, runList, releaseCycleList[:2],
+                                                        testLabTestInstanceList, testList)
 
-            if tcName not in tcMapped:
-                dataCSV += ',,,,,' + tcName.replace(",", "#") + ',,,\n'
+        logger.info('getCSVWithRunsFromTargetCycleAndMultipleReleases: ...done!')
 
-        return dataCSV
+        return csvData
 
     def getTestStepsDictFromTestPlanPath(self, tp_path):
 
@@ -1177,16 +1151,8 @@ class hiT7300_QC(QC):
         testPlanTestInfoList = self.TestPlanTests.getEntityDataCollectionFieldValueList(
             ['id','name','description','user-12','user-26','user-15', 'user-43'], xml)
 
-        testPlanTestIdListXml = testPlanTestInfoList[0]
-        testPlanTestNameListXml = testPlanTestInfoList[1]
-        testPlanTestDescriptionListXml = testPlanTestInfoList[2]
-        testPlanTestAutoLevelListXml = testPlanTestInfoList[3]
-        testPlanTestDetailAutoLevelListXml = testPlanTestInfoList[4]
-        testPlanTestWorthRegressionTestListXml = testPlanTestInfoList[5]
-        testPlanTestPriorityListXml = testPlanTestInfoList[6]
-
         # Now get the test steps for all the tests
-        query = self._getQueryListOrAnd(['parent-id'], [testPlanTestIdListXml])
+        query = self._getQueryListOrAnd(['parent-id'], [testPlanTestInfoList[0]])
 
         r = self.TestPlanDesignSteps.getEntityQueryList(query, 'description,expected,parent-id,name')
 
@@ -1195,48 +1161,15 @@ class hiT7300_QC(QC):
         testPlanTestStepInfoList = self.TestPlanDesignSteps.getEntityDataCollectionFieldValueList(
             ['description','expected','parent-id','name'], xml)
 
-        testPlanTestStepDescriptionListXml = testPlanTestStepInfoList[0]
-        testPlanTestStepExpectedListXml = testPlanTestStepInfoList[1]
-        testPlanTestStepParentIdListXml = testPlanTestStepInfoList[2]
-        testPlanTestStepNameListXml = testPlanTestStepInfoList[3]
-
-        # Ok, so lets get everything ordered and build the test info dict
-        for testPlanTestIdXml, testPlanTestNameXml, testPlanTestDescriptionXml, testPlanTestAutoLevelXml, testPlanTestDetailAutoLevelXml, testPlanTestWorthRegressionTestXml, testPlanTestPriorityXml  in itertools.izip(
-                testPlanTestIdListXml, testPlanTestNameListXml, testPlanTestDescriptionListXml, testPlanTestAutoLevelListXml, testPlanTestDetailAutoLevelListXml, testPlanTestWorthRegressionTestListXml, testPlanTestPriorityListXml):
-
-            testInfoDict[testPlanTestNameXml] = {'description': testPlanTestDescriptionXml, 'Automation_Level': testPlanTestAutoLevelXml, 'Detailed_Automation_Level': testPlanTestDetailAutoLevelXml, 'Worth_Regression_Test':testPlanTestWorthRegressionTestXml, 'Priority':testPlanTestPriorityXml}            
-            testInfoDict[testPlanTestNameXml]['steps'] = []
-
-            testStepsDescriptionList = []
-            testStepsExpectedList = []
-            testStepsNameList = []
-
-            # First match the test ID
-            for testPlanTestStepParentIdXml, testPlanTestStepExpectedXml, \
-                testPlanTestStepDescriptionXml, testPlanTestStepNameXml in itertools.izip(
-                    testPlanTestStepParentIdListXml, testPlanTestStepExpectedListXml,
-                    testPlanTestStepDescriptionListXml, testPlanTestStepNameListXml):
-
-                if testPlanTestStepParentIdXml == testPlanTestIdXml:
-
-                    testStepsDescriptionList.append(testPlanTestStepDescriptionXml)
-                    testStepsExpectedList.append(testPlanTestStepExpectedXml)
-                    testStepsNameList.append(testPlanTestStepNameXml)
+        # Test id -> ordered steps
+        testStepsDict = self._getTestStepsDictFromDesignStepList(*testPlanTestStepInfoList)
 
-            # Now we need to order the steps
-            for i in range(len(testStepsNameList)):
+        # Ok, so lets build the test info dict
+        for testPlanTestIdXml, testPlanTestNameXml, testPlanTestDescriptionXml, testPlanTestAutoLevelXml, testPlanTestDetailAutoLevelXml, testPlanTestWorthRegressionTestXml, testPlanTestPriorityXml in itertools.izip(
+                *testPlanTestInfoList):
 
-                matchString = 'Step\s+' + str(i+1)
-
-                for idx,testStepsName in enumerate(testStepsNameList):
-
-                    if re.findall(matchString, testStepsName):
-
-                        # Ok found it so add it
-                        testInfoDict[testPlanTestNameXml]['steps'].append(
-                            [testStepsDescriptionList[idx], testStepsExpectedList[idx]])
-
-                        break
+            testInfoDict[testPlanTestNameXml] = {'description': testPlanTestDescriptionXml, 'Automation_Level': testPlanTestAutoLevelXml, 'Detailed_Automation_Level': testPlanTestDetailAutoLevelXml, 'Worth_Regression_Test':testPlanTestWorthRegressionTestXml, 'Priority':testPlanTestPriorityXml}
+            testInfoDict[testPlanTestNameXml]['steps'] = testStepsDict.get(testPlanTestIdXml, [])
 
         return testInfoDict
 
@@ -1258,6 +1191,11 @@ class hiT7300_QC(QC):
         # Retrieve lab location
         testLabTestInstancePathList = self._getFolderPathListFromTestLabTestSetIdList(testsetIdList)
 
+        # Test set id -> test lab path
+        testLabPathDict = {}
+        for testsetId, testLabTestInstancePath in itertools.izip(testsetIdList, testLabTestInstancePathList):
+            testLabPathDict.setdefault(testsetId, testLabTestInstancePath)
+
         # Get test instance list
         testInstancesIdList = self._getIdTestLabTestInstancesFromTestsetId(testsetIdList)
 
@@ -1275,11 +1213,6 @@ class hiT7300_QC(QC):
             ['id','name','description','user-12','user-26','user-15'], xml)
 
         testPlanTestIdList = testPlanTestInfoList[0]
-        testPlanTestNameListXml = testPlanTestInfoList[1]
-        testPlanTestDescriptionListXml = testPlanTestInfoList[2]
-        testPlanTestAutoLevelListXml = testPlanTestInfoList[3]
-        testPlanTestDetailAutoLevelListXml = testPlanTestInfoList[4]
-        testPlanTestWorthRegressionTestListXml = testPlanTestInfoList[5]
 
         # Retrieve plan location
         testPlanTestPathList = self._getFolderPathListFromTestPlanTestIdList(testPlanTestIdList)
@@ -1294,10 +1227,13 @@ class hiT7300_QC(QC):
         testPlanTestStepInfoList = self.TestPlanDesignSteps.getEntityDataCollectionFieldValueList(
             ['description','expected','parent-id','name'], xml)
 
-        testPlanTestStepDescriptionListXml = testPlanTestStepInfoList[0]
-        testPlanTestStepExpectedListXml = testPlanTestStepInfoList[1]
-        testPlanTestStepParentIdListXml = testPlanTestStepInfoList[2]
-        testPlanTestStepNameListXml = testPlanTestStepInfoList[3]
+        # Test id -> ordered steps
+        testStepsDict = self._getTestStepsDictFromDesignStepList(*testPlanTestStepInfoList)
+
+        # Test id -> test row
+        testPlanTestDict = {}
+        for testPlanTestRow in itertools.izip(*(testPlanTestInfoList + [testPlanTestPathList])):
+            testPlanTestDict.setdefault(testPlanTestRow[0], testPlanTestRow)
 
         # Now get all the information of target test instances to map them to testset IDs  and test
         query = self._getQueryListOrAnd(['id'], [testInstancesIdList])
@@ -1309,74 +1245,71 @@ class hiT7300_QC(QC):
         testLabTestInstanceInfoList = self.TestPlanDesignSteps.getEntityDataCollectionFieldValueList(
             ['cycle-id','id','test-id'], xml)
 
-        testLabTestInstanceTestSetListXml = testLabTestInstanceInfoList[0]
-        testLabTestInstanceIdListXml = testLabTestInstanceInfoList[1]
-        testLabTestInstanceTestIdListXml = testLabTestInstanceInfoList[2]
-
         # Add test lab information
         for testLabTestInstanceTestSetXml, testLabTestInstanceIdXml, testLabTestInstanceTestIdXml in itertools.izip(
-                testLabTestInstanceTestSetListXml, testLabTestInstanceIdListXml, testLabTestInstanceTestIdListXml):
+                *testLabTestInstanceInfoList):
 
-            # Ok, so lets get everything ordered and build the test info dict
-            for testPlanTestIdXml, testPlanTestNameXml, testPlanTestDescriptionXml, testPlanTestAutoLevelXml,\
-                testPlanTestDetailAutoLevelXml, testPlanTestWorthRegressionTestXml, testPlanTestPath in itertools.izip(
-                    testPlanTestIdList, testPlanTestNameListXml, testPlanTestDescriptionListXml,
-                    testPlanTestAutoLevelListXml, testPlanTestDetailAutoLevelListXml,
-                    testPlanTestWorthRegressionTestListXml, testPlanTestPathList):
+            testPlanTestRow = testPlanTestDict.get(testLabTestInstanceTestIdXml)
 
-                if testLabTestInstanceTestIdXml == testPlanTestIdXml:
+            if testPlanTestRow is None:
+                continue
 
-                    # Add prefix for multiple test instances pointing to same test
-                    testPlanTestNameXml = testPlanTestNameXml + '_0000'
+            testPlanTestIdXml, testPlanTestNameXml, testPlanTestDescriptionXml, testPlanTestAutoLevelXml, \
+                testPlanTestDetailAutoLevelXml, testPlanTestWorthRegressionTestXml, testPlanTestPath = testPlanTestRow
 
-                    while testInfoDict.has_key(testPlanTestNameXml):
+            # Add prefix for multiple test instances pointing to same test
+            testPlanTestNameXml = testPlanTestNameXml + '_0000'
 
-                        testPlanTestNameXml = testPlanTestNameXml[:-4] + '%04d' % (int(testPlanTestNameXml[-4:]) + 1)
+            while testPlanTestNameXml in testInfoDict:
 
-                    # Add test plan information
-                    testInfoDict[testPlanTestNameXml] = {'description': testPlanTestDescriptionXml,
-                                                         'Automation_Level': testPlanTestAutoLevelXml,
-                                                         'Detailed_Automation_Level': testPlanTestDetailAutoLevelXml,
-                                                         'Worth_Regression_Test':testPlanTestWorthRegressionTestXml,
-                                                         'Test Plan Path': testPlanTestPath}
+                testPlanTestNameXml = testPlanTestNameXml[:-4] + '%04d' % (int(testPlanTestNameXml[-4:]) + 1)
 
-                    testInfoDict[testPlanTestNameXml]['Test Lab Path'] = testLabTestInstancePathList[
-                        testsetIdList.index(testLabTestInstanceTestSetXml)]
+            # Add test plan information
+            testInfoDict[testPlanTestNameXml] = {'description': testPlanTestDescriptionXml,
+                                                 'Automation_Level': testPlanTestAutoLevelXml,
+                                                 'Detailed_Automation_Level': testPlanTestDetailAutoLevelXml,
+                                                 'Worth_Regression_Test':testPlanTestWorthRegressionTestXml,
+                                                 'Test Plan Path': testPlanTestPath}
 
-                    testInfoDict[testPlanTestNameXml]['steps'] = []
+            testInfoDict[testPlanTestNameXml]['Test Lab Path'] = testLabPathDict[testLabTestInstanceTestSetXml]
 
-                    testStepsDescriptionList = []
-                    testStepsExpectedList = []
-                    testStepsNameList = []
+            # Each test instance gets its own list of steps
+            testInfoDict[testPlanTestNameXml]['steps'] = list(testStepsDict.get(testPlanTestIdXml, []))
 
-                    # First match the test ID
-                    for testPlanTestStepParentIdXml, testPlanTestStepExpectedXml, \
-                        testPlanTestStepDescriptionXml, testPlanTestStepNameXml in itertools.izip(
-                            testPlanTestStepParentIdListXml, testPlanTestStepExpectedListXml,
-                            testPlanTestStepDescriptionListXml, testPlanTestStepNameListXml):
+        return testInfoDict
 
-                        if testPlanTestStepParentIdXml == testPlanTestIdXml:
+    @staticmethod
+    def _getTestStepsDictFromDesignStepList(descriptionList, expectedList, parentIdList, nameList):
+        '''
+        Group design steps by test id and order them by the step number in their name ('Step N')
+        :param descriptionList: design step description list
+        :param expectedList: design step expected list
+        :param parentIdList: design step parent-id (test id) list
+        :param nameList: design step name list
+        :return: dict test id -> list of [description, expected] ordered by step number
+        '''
 
-                            testStepsDescriptionList.append(testPlanTestStepDescriptionXml)
-                            testStepsExpectedList.append(testPlanTestStepExpectedXml)
-                            testStepsNameList.append(testPlanTestStepNameXml)
+        # Test id -> list of (step number, description, expected)
+        stepsDict = {}
 
-                    # Now we need to order the steps
-                    for i in range(len(testStepsNameList)):
+        for description, expected, parentId, name in itertools.izip(
+                descriptionList, expectedList, parentIdList, nameList):
 
-                        matchString = 'Step\s+' + str(i+1)
+            match = _stepNumberRegex.search(name or '')
 
-                        for idx,testStepsName in enumerate(testStepsNameList):
+            # Steps without a number are not exported
+            if match is None:
+                continue
 
-                            if re.findall(matchString, testStepsName):
+            stepsDict.setdefault(parentId, []).append((int(match.group(1)), description, expected))
 
-                                # Ok found it so add it
-                                testInfoDict[testPlanTestNameXml]['steps'].append(
-                                    [testStepsDescriptionList[idx], testStepsExpectedList[idx]])
+        testStepsDict = {}
 
-                                break
+        for parentId, stepList in stepsDict.iteritems():
 
-                    # Exit loop
-                    break
+            # Sort is stable so steps with the same number keep their order
+            stepList.sort(key=lambda step: step[0])
 
-        return testInfoDict
+            testStepsDict[parentId] = [[description, expected] for number, description, expected in stepList]
+
+        return testStepsDict
@@ -272,11 +272,10 @@ class RobotTags(object):
         # load qc tags
         qc_tags = self.read_qc_tags()
 
-        # check number of qc_test_case
-        i = 1
-        while 'd_%s' % i in data.keys():
-            i += 1
-        n_test_case = i - 1
+        # ordered list of qc_test_case: 'd_1', 'd_2', ..., 'd_n'
+        test_list = []
+        while 'd_%s' % (len(test_list) + 1) in data:
+            test_list.append(data['d_%s' % (len(test_list) + 1)])
 
 
         # tag label generation
@@ -300,6 +299,13 @@ class RobotTags(object):
         # read qc tags of test case
         qc_tags_options_steps = self.iniCo.read_all_values(tag)[0]
 
+        # tag label generation
+
+        tag = 'tags_' + system + '_test_case_run'
+
+        # read qc tags of test case run
+        qc_tags_options_run = self.iniCo.read_all_values(tag)[0]
+
         root = etree.Element('report')
         # root.set('xmlns:xsi', 'http://www.w3.org/2001/XMLSchema-instance')
         # root.set('xsi:noNamespaceSchemaLocation', 'report-schema.xsd')
@@ -310,22 +316,19 @@ class RobotTags(object):
         test_sets = etree.Element('test_sets')
         root.append(test_sets)
 
-        in_test_set = False
+        # (test set path, test set name) -> test_cases element of the test set
+        test_set_dict = {}
 
-        for n in range(n_test_case):
-            in_test_case = False
-            i = n + 1
+        for test_data in test_list:
 
             ''' *****************   define test_set  ****************** '''
 
-            test_set_name = data['d_%s' % i]['test_set_name']
+            test_set_name = test_data['test_set_name']
+            test_set_path = test_data['test_set']
 
-            if in_test_set == False:
-                for ele in root.findall(".//test_set_name"):
-                    if test_set_name == ele.text:
-                        in_test_set = True
+            test_cases = test_set_dict.get((test_set_path, test_set_name))
 
-            if in_test_set == False:
+            if test_cases is None:
 
                 test_set = etree.Element('test_set')
                 test_sets.append(test_set)
@@ -333,12 +336,12 @@ class RobotTags(object):
 
                 for option in qc_tags_options_set:
                     if option == 'test_set':
-                        test_set.set('path', data['d_%s' % i]['test_set'])
+                        test_set.set('path', test_data['test_set'])
                     else:
-                        if option in data['d_%s' % i].keys():
+                        if option in test_data:
                             elem = etree.Element('%s' % option)
                             test_set.append(elem)
-                            elem.text = data['d_%s' % i]['%s' % option]
+                            elem.text = test_data['%s' % option]
                             d = qc_tags[option]
                             for val in d.keys():
                                 elem.set(val, d[val])
@@ -347,16 +350,18 @@ class RobotTags(object):
                 test_cases = etree.Element('test_cases')
                 test_set.append(test_cases)
 
+                test_set_dict[(test_set_path, test_set_name)] = test_cases
+
             ''' *******************   define qc_test_case  ******************* '''
             test_case = etree.Element('qc_test_case')
             test_cases.append(test_case)
             for option in qc_tags_options_case:
                 if option == 'qc_test_case':
-                    test_case.set('path', data['d_%s' % i]['qc_test_case'])
+                    test_case.set('path', test_data['qc_test_case'])
                 elif option == 'test_case_products_concerned':
                     elem = etree.Element('%s' % option)
                     test_case.append(elem)
-                    d = data['d_%s' % i]['%s' % option]
+                    d = test_data['%s' % option]
                     for value in d:
                         val = etree.Element('value')
                         elem.append(val)
@@ -365,10 +370,10 @@ class RobotTags(object):
                     for val in d.keys():
                         elem.set(val, d[val])
                 else:
-                    if option in data['d_%s' % i].keys():
+                    if option in test_data:
                         elem = etree.Element('%s' % option)
                         test_case.append(elem)
-                        elem.text = data['d_%s' % i]['%s' % option]
+                        elem.text = test_data['%s' % option]
                         d = qc_tags[option]
                         for val in d.keys():
                             elem.set(val, d[val])
@@ -380,7 +385,7 @@ class RobotTags(object):
 
             # check number of qc_test_case step
             l = 1
-            while 'step_%s' % l in data['d_%s' % i].keys():
+            while 'step_%s' % l in test_data:
                 l += 1
             n_case_step = l - 1
             step_stat = 'Not Analyzed'
@@ -389,7 +394,7 @@ class RobotTags(object):
                 test_case_step = etree.Element('test_case_step')
                 test_case_steps.append(test_case_step)
 
-                if data['d_%s' % i]['step_%s' % k][3] != 'Passed':
+                if test_data['step_%s' % k][3] != 'Passed':
                     step_stat = 'Failed'
                 elif step_stat == 'Not Analyzed':
                     step_stat = 'Passed'
@@ -398,7 +403,7 @@ class RobotTags(object):
                 for step in qc_tags_options_steps:
                     elem = etree.Element('%s' % step)
                     test_case_step.append(elem)
-                    elem.text = data['d_%s' % i]['step_%s' % k][m]
+                    elem.text = test_data['step_%s' % k][m]
                     m += 1
                     d = qc_tags[step]
                     for val in d.keys():
@@ -409,11 +414,6 @@ class RobotTags(object):
             test_case_run = etree.Element('test_case_run')
             test_case.append(test_case_run)
 
-            tag = 'tags_' + system + '_test_case_run'
-
-            # read qc tags of test case
-            qc_tags_options_run = self.iniCo.read_all_values(tag)[0]
-
             for option in qc_tags_options_run:
                 d = qc_tags[option]
                 if option == 'test_case_run_status':
@@ -425,10 +425,10 @@ class RobotTags(object):
                         elem.text = step_stat
                     for val in d.keys():
                         elem.set(val, d[val])
-                if option in data['d_%s' % i].keys():
+                if option in test_data:
                     elem = etree.Element('%s' % option)
                     test_case_run.append(elem)
-                    elem.text = data['d_%s' % i]['%s' % option]
+                    elem.text = test_data['%s' % option]
                     for val in d.keys():
                         elem.set(val, d[val])
 
@@ -12,6 +12,7 @@ except:
 import itertools, time, argparse, sys
 
 from QCRest_hiT7300 import hiT7300_QC, ConnectionError, QCError
+from QCRest_hiT7300 import profileMain, addProfileArguments
 from QCRest_hiT7300 import gp_config_ini
 
 import logging
@@ -80,19 +81,16 @@ def jiraFaultReportToRequiredFunctionalityLinkCreation(qc_con, jira_con, data):
     jiraReqFuncFaultReportRelationList = qc_con.getJiraRFJiraFRRelationFromQC(data['jira_release'], reqIdQC, defIdQC,
                                                                               reqTypeQC)
 
-    # Check if the link to FR in the RF already exists our was previously updated and should or not be created
-    for jiraReqFuncFaultReportRelation in jiraReqFuncFaultReportRelationList:
+    # Create the links to FR in the RF that do not exist and were never created before
+    logger.info('jiraFaultReportToRequiredFunctionalityLinkCreation: Checking FR links of %d RF' %
+                len(jiraReqFuncFaultReportRelationList))
 
-        logger.info('jiraFaultReportToRequiredFunctionalityLinkCreation: Checking for RF %s if FR links exist!' %
-                    jiraReqFuncFaultReportRelation['jiraId'])
-        alreadyCreatedLinkList = jira_con.faultReportsLinkedToRequiredFunctionality(
-            jiraReqFuncFaultReportRelation['jiraId'], jiraReqFuncFaultReportRelation['faultReportJiraIdList'])
+    relationList = [(jiraReqFuncFaultReportRelation['jiraId'], jiraReqFuncFaultReportRelation['faultReportJiraIdList'])
+                    for jiraReqFuncFaultReportRelation in jiraReqFuncFaultReportRelationList]
 
-        for defId, alreadyCreatedLink in zip(
-                jiraReqFuncFaultReportRelation['faultReportJiraIdList'], alreadyCreatedLinkList):
+    createdLinkList, errorDict = jira_con.reconcileLinks(relationList, 'Relates')
 
-            if not alreadyCreatedLink:
-                jira_con.addLink(defId, 'Relates', jiraReqFuncFaultReportRelation['jiraId'])
+    return {'linksCreated': len(createdLinkList), 'linksFailed': len(errorDict)}
 
 
 def getDataFromIni(ini_file=r'qc_jira.ini'):
@@ -160,8 +158,10 @@ def getArgsParser():
     parser.add_argument('-u', '--user', help="Username for QC and JIRA.")
     parser.add_argument('-p', '--password', help="Password for QC and JIRA.")
 
+    addProfileArguments(parser)
+
     return parser
 
 
 if __name__ == '__main__':
-    main(sys.argv)
+    profileMain(main, sys.argv)
@@ -11,6 +11,7 @@ except:
 import itertools, time, argparse, sys
 
 from QCRest_hiT7300 import hiT7300_QC, ConnectionError, QCError
+from QCRest_hiT7300 import profileMain, addProfileArguments
 from QCRest_hiT7300 import  gp_config_ini
 
 def main(argv):
@@ -27,6 +28,8 @@ def main(argv):
     if args.password:
         data['qc_passwd'] = data['jira_passwd']= args.password
 
+    data['jira_incremental'] = args.incremental
+
     # Establish connection to QC and JIRA
     qc_con = hiT7300_QC(data['qc_server'], data['qc_project'], data['qc_domain'], release='5.50.xx')
     jira_con = JIRARest(data['jira_server'])
@@ -68,7 +71,8 @@ def qcJIRASyncProcess(qc_con, jira_con, data):
     # next function usage: getIssueDataFromIssueTypeProjectVersionKey(self, issueTypeList, projectList, fixVersionList, affectsVersionList, fieldNameList)
     jiraIssueDataList = jira_con.getIssueDataFromIssueTypeProjectVersionKey(
         ['Fault Report', 'Change Request'], [data['jira_project']], [], data['jira_release'], [],
-        ['assignee', 'description', 'priority', 'status', 'created', 'reporter', 'versions', 'resolution'])
+        ['assignee', 'description', 'priority', 'status', 'created', 'reporter', 'versions', 'resolution'],
+        incremental=data.get('jira_incremental', False))
 
     # QC Defect Name will be "<Key ID>-<Summary>
     # QCData mapping
@@ -82,13 +86,6 @@ def qcJIRASyncProcess(qc_con, jira_con, data):
 
     qcField_jiraKey = 'user-06'     # Field in QC that has the Jira key => Error Source
 
-    # Get release id to map it correctly to QC
-    # Just do this if the target release is not know yet
-    r = qc_con.Releases.getEntity('id,name')
-    xml = qc_con._getXmlFromRequestQueryList(r)
-    targetReleaseIdList = qc_con.Releases.getEntityDataCollectionFieldValueList(['name', 'id'], xml)
-    targetReleaseDict = dict(zip(targetReleaseIdList[0], targetReleaseIdList[1]))
-
     for jiraIssueData in jiraIssueDataList:
 
         # Additional fields necessary: Resolution Status
@@ -107,7 +104,7 @@ def qcJIRASyncProcess(qc_con, jira_con, data):
 
         # fixVersion can have multiple values - Save multiple values to release and last release for target release
         for version in jiraIssueData['versions']:
-            release.append(targetReleaseDict[version.name])
+            release.append(qc_con.getReleaseId(version.name))
 
         jiraLink = jira_con.url_server + '/browse/' + jiraIssueData['key']
 
@@ -123,7 +120,7 @@ def qcJIRASyncProcess(qc_con, jira_con, data):
             qcField_jiraKey: jiraIssueData['key'],
             'status': jiraIssueData['status'],
             # 'target-rel': release,
-            'target-rel': targetReleaseDict[data['jira_release'][0]],                          # Workaround because it is not possible to set more than one release in field target-rel
+            'target-rel': qc_con.getReleaseId(data['jira_release'][0]),                          # Workaround because it is not possible to set more than one release in field target-rel
             'attachmentUrl': {'data': '[InternetShortcut]\r\nURL=' + jiraLink, 'fileName': 'Jira Link.url',
                               'description':'Jira Link: ' + jiraLink},
         }
@@ -133,6 +130,8 @@ def qcJIRASyncProcess(qc_con, jira_con, data):
     # Now get all the requirements for a specific parent requirement ID
     qc_con.syncDefects(qcDefectDataList, qcField_jiraKey)
 
+    return {'jiraIssues': len(jiraIssueDataList)}
+
 def getDataFromIni(ini_file=r'qc_jira.ini'):
 
     data = {
@@ -198,8 +197,12 @@ def getArgsParser():
     parser = argparse.ArgumentParser(description='Sync QC Defects with Jira Fault Reports')
     parser.add_argument('-u', '--user', help="Username for QC and JIRA.")
     parser.add_argument('-p', '--password', help="Password for QC and JIRA.")
+    parser.add_argument('-i', '--incremental', action='store_true',
+                        help="Only get Jira issues updated since the last run (uses local snapshot).")
+
+    addProfileArguments(parser)
 
     return parser
 
 if __name__ == '__main__':
-    main(sys.argv)
+    profileMain(main, sys.argv)
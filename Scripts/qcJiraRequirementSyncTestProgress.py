@@ -1,6 +1,7 @@
 __author__ = 'anandrad'
 
 from JIRARest import JIRARest, logger
+from jira import JIRAError
 
 try:
     import lxml.etree as ET
@@ -11,6 +12,7 @@ except:
 import itertools, time, argparse, sys
 
 from QCRest_hiT7300 import hiT7300_QC, ConnectionError, QCError
+from QCRest_hiT7300 import profileMain, addProfileArguments
 from QCRest_hiT7300 import  gp_config_ini
 
 def main(argv):
@@ -53,6 +55,10 @@ def main(argv):
         print ('\nUps, an exception was raised: ' + e.expr + ' - ' + e.msg)
         exit(1)
 
+    except JIRAError as e:
+        print ('\nUps, an exception was raised: ' + e.text)
+        exit(1)
+
     finally:
 
         try:
@@ -154,7 +160,8 @@ def qcJIRASyncProcess(qc_con, jira_con, data):
                 if int(value['Total']) > 0:
 
                     logger.info('Updating issue status %s with: %s' % (issueKey, transitionStartAnalysis))
-                    jira_con.transitionJiraIssue( issueKey, transitionStartAnalysis)
+                    jira_con.queueJiraIssueTransition(issueKey, transitionStartAnalysis, None, 'Test Exec',
+                                                      dataJira[issueKey]['status'])
                     dataJira[issueKey]['status'] = statusInAnalysis
 
             if dataJira[issueKey]['status'] == statusInAnalysis:
@@ -162,10 +169,11 @@ def qcJIRASyncProcess(qc_con, jira_con, data):
                 if int(value['Total']) > 0:
 
                     logger.info('Updating issue status %s with: %s' % (issueKey, transitionStartDevelopment))
-                    jira_con.transitionJiraIssue(
+                    jira_con.queueJiraIssueTransition(
                             issueKey,
                             transitionStartDevelopment,
-                        'hiT7300 Automation: Status automatically changed to \'In Development\'because total number of tests is higher than zero.')
+                        'hiT7300 Automation: Status automatically changed to \'In Development\'because total number of tests is higher than zero.',
+                        'Test Exec', dataJira[issueKey]['status'])
                     dataJira[issueKey]['status'] = statusInDevelopment
 
             if dataJira[issueKey]['status'] == statusInDevelopment:
@@ -173,10 +181,11 @@ def qcJIRASyncProcess(qc_con, jira_con, data):
                 if int(value['Passed']) > 0 or int(value['Failed']) > 0:
 
                     logger.info('Updating issue status %s with: %s' % (issueKey, transitionStartValidation))
-                    jira_con.transitionJiraIssue(
+                    jira_con.queueJiraIssueTransition(
                             issueKey,
                             transitionStartValidation,
-                        'hiT7300 Automation: Status automatically changed to \'In Validation\' because number of executed tests is higher than zero.')
+                        'hiT7300 Automation: Status automatically changed to \'In Validation\' because number of executed tests is higher than zero.',
+                        'Test Exec', dataJira[issueKey]['status'])
                     dataJira[issueKey]['status'] = statusInValidation
 
             if dataJira[issueKey]['status'] == statusInValidation:
@@ -184,17 +193,30 @@ def qcJIRASyncProcess(qc_con, jira_con, data):
                 if int(value['Passed']) == 0 and int(value['Failed']) == 0:
 
                     logger.info('Updating issue status %s with: %s' % (issueKey, transitionStopValidation))
-                    jira_con.transitionJiraIssue(
+                    jira_con.queueJiraIssueTransition(
                             issueKey,
                             transitionStopValidation,
-                        'hiT7300 Automation: Status automatically changed to \'In Development\' because total number of executed tests is zero.')
+                        'hiT7300 Automation: Status automatically changed to \'In Development\' because total number of executed tests is zero.',
+                        'Test Exec', dataJira[issueKey]['status'])
                     dataJira[issueKey]['status'] = statusInDevelopment
 
         if len(dataForJira) > 0:
 
             # Update remaining fields
             logger.info('Updating issue %s with: %s' % (issueKey, str(dataForJira)))
-            jira_con.updateJiraIssueField(issueKey, dataForJira)
+            jira_con.queueJiraIssueFieldUpdate(issueKey, dataForJira)
+
+    # Push all queued updates / transitions to Jira
+    errorDict = jira_con.flushJiraIssueUpdates()
+
+    for issueKey, error in errorDict.iteritems():
+        logger.error('Update of issue %s failed: %s' % (issueKey, error))
+
+    # Updates of the other issues are done - the run still fails so that the failed issues are not missed
+    if len(errorDict) > 0:
+        raise JIRAError(None, 'Update of %d Jira issues failed: %s' % (len(errorDict), sorted(errorDict.keys())))
+
+    return {'qcRequirements': len(dataQc)}
 
 def getDataFromIni(ini_file=r'qc_jira.ini'):
 
@@ -262,7 +284,9 @@ def getArgsParser():
     parser.add_argument('-u', '--user', help="Username for QC and JIRA.")
     parser.add_argument('-p', '--password', help="Password for QC and JIRA.")
 
+    addProfileArguments(parser)
+
     return parser
 
 if __name__ == '__main__':
-    main(sys.argv)
+    profileMain(main, sys.argv)
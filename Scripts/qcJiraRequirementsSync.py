@@ -11,6 +11,7 @@ except:
 import itertools, time, argparse, sys
 
 from QCRest_hiT7300 import hiT7300_QC, ConnectionError, QCError
+from QCRest_hiT7300 import profileMain, addProfileArguments
 from QCRest_hiT7300 import  gp_config_ini
 
 def main(argv):
@@ -27,6 +28,8 @@ def main(argv):
     if args.password:
         data['qc_passwd'] = data['jira_passwd']= args.password
 
+    data['jira_incremental'] = args.incremental
+
     # Establish connection to QC and JIRA
     qc_con = hiT7300_QC(data['qc_server'], data['qc_project'], data['qc_domain'], release='5.50.xx')
     jira_con = JIRARest(data['jira_server'])
@@ -77,7 +80,8 @@ def qcJIRASyncProcess(qc_con, jira_con, data):
 
     jiraIssueDataList = jira_con.getIssueDataFromIssueTypeProjectVersionKey(
         ['Required Functionality'], [data['jira_project']], data['jira_release'], [], [],
-        ['assignee', 'description', 'priority', 'fixVersions', reqIdJIRA])
+        ['assignee', 'description', 'priority', 'fixVersions', reqIdJIRA],
+        incremental=data.get('jira_incremental', False))
 
     # QC RF Name will be "<JIRA Key>-<Summary>
     # QCData mapping
@@ -85,20 +89,13 @@ def qcJIRASyncProcess(qc_con, jira_con, data):
 
     pathGlobal = r'Requirements'
 
-    # Get release id to map it correctly to QC
-    # Just do this if the target release is not know yet
-    r = qc_con.Releases.getEntity('id,name')
-    xml = qc_con._getXmlFromRequestQueryList(r)
-    targetReleaseIdList = qc_con.Releases.getEntityDataCollectionFieldValueList(['name', 'id'], xml)
-    targetReleaseDict = dict(zip(targetReleaseIdList[0], targetReleaseIdList[1]))
-
     for jiraIssueData in jiraIssueDataList:
 
         release = []
 
         # fixVersion can have multiple values - Save multiple values to release and last release for target release
         for version in jiraIssueData['fixVersions']:
-            release.append(targetReleaseDict[version.name])
+            release.append(qc_con.getReleaseId(version.name))
 
         jiraLink = jira_con.url_server + '/browse/' + jiraIssueData['key']
 
@@ -119,6 +116,8 @@ def qcJIRASyncProcess(qc_con, jira_con, data):
     # Now get all the requirements for a specific parent requirement ID
     qc_con.syncRequirements(qcRequirementDataList, reqIdQC)
 
+    return {'jiraIssues': len(jiraIssueDataList)}
+
 def getDataFromIni(ini_file=r'qc_jira.ini'):
 
     data = {
@@ -185,8 +184,12 @@ def getArgsParser():
     parser = argparse.ArgumentParser(description='Sync QC Requirements with Jira Required Functionality')
     parser.add_argument('-u', '--user', help="Username for QC and JIRA.")
     parser.add_argument('-p', '--password', help="Password for QC and JIRA.")
+    parser.add_argument('-i', '--incremental', action='store_true',
+                        help="Only get Jira issues updated since the last run (uses local snapshot).")
+
+    addProfileArguments(parser)
 
     return parser
 
 if __name__ == '__main__':
-    main(sys.argv)
+    profileMain(main, sys.argv)
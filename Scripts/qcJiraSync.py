@@ -0,0 +1,481 @@
+'''
+qcJiraSync.py - Runs several QC / Jira sync processes (mappers) in a single process sharing the QC and Jira
+connections and their caches. Mappers that do not depend on each other run concurrently.
+'''
+
+__author__ = 'anandrad'
+
+from JIRARest import JIRARest
+
+import argparse, json, os, sys, time, traceback
+from multiprocessing.pool import ThreadPool
+
+from QCRest_hiT7300 import hiT7300_QC, ConnectionError, QCError, MetricsExporter
+from QCRest_hiT7300 import profileMain, addProfileArguments
+
+import qcJiraDefectsSync
+import qcJiraRequirementsSync
+import qcJiraRequirementSyncTestProgress
+import qcJiraDefToReqFuncLinkSync
+
+import logging
+
+logger = logging.getLogger('QCRest')
+
+# Available mappers: name -> (function(qc_con, jira_con, data), getDataFromIni function, list of mappers it depends on)
+mapperInfo = {
+    'defects': (qcJiraDefectsSync.qcJIRASyncProcess, qcJiraDefectsSync.getDataFromIni, []),
+    'requirements': (qcJiraRequirementsSync.qcJIRASyncProcess, qcJiraRequirementsSync.getDataFromIni, []),
+    'progress': (qcJiraRequirementSyncTestProgress.qcJIRASyncProcess,
+                 qcJiraRequirementSyncTestProgress.getDataFromIni, ['requirements']),
+    'links': (qcJiraDefToReqFuncLinkSync.jiraFaultReportToRequiredFunctionalityLinkCreation,
+              qcJiraDefToReqFuncLinkSync.getDataFromIni, ['defects', 'requirements']),
+}
+
+# Order used when no mapper is selected
+mapperOrder = ['defects', 'requirements', 'progress', 'links']
+
+
+class SyncEngine(object):
+    '''
+    Runs mappers (sync processes) sharing one QC and one Jira connection. Mappers are scheduled by dependencies:
+    all mappers whose dependencies are done run concurrently, mappers whose dependencies failed are skipped
+    '''
+
+    def __init__(self, qc_con, jira_con, maxWorkers=2, exporter=None):
+        '''
+        :param qc_con: logged in hiT7300_QC connection
+        :param jira_con: logged in JIRARest connection
+        :param maxWorkers: max number of mappers running at the same time
+        :param exporter: MetricsExporter fed with the mapper metrics (optional)
+        '''
+
+        self.qc_con = qc_con
+        self.jira_con = jira_con
+        self.maxWorkers = maxWorkers
+        self.exporter = exporter
+
+        if exporter is not None:
+            exporter.describe('qcsync_mapper_runs_total', 'counter', 'Mapper runs by status (done, failed, skipped).')
+            exporter.describe('qcsync_mapper_duration_seconds', 'gauge', 'Duration of the last run of the mapper.')
+            exporter.describe('qcsync_mapper_entities', 'gauge', 'Entities synced in the last run of the mapper.')
+            exporter.describe('qcsync_mapper_entities_total', 'counter', 'Entities synced by the mapper.')
+            exporter.describe('qcsync_engine_pending_mappers', 'gauge', 'Mappers waiting to run.')
+            exporter.describe('qcsync_engine_running_mappers', 'gauge', 'Mappers running.')
+            exporter.describe('qcsync_jira_update_queue_depth', 'gauge', 'Jira issue updates queued, not flushed yet.')
+
+            exporter.setFunction('qcsync_jira_update_queue_depth', jira_con.getIssueUpdateQueueSize)
+
+        # name -> (function, data, dependency list)
+        self._mapperDict = {}
+        self._mapperOrder = []
+
+    def addMapper(self, name, function, data, dependsOn=None):
+        '''
+        Add a mapper to the engine
+        :param name: mapper name
+        :param function: function(qc_con, jira_con, data)
+        :param data: data dict passed to the function
+        :param dependsOn: list of mapper names that need to run before
+        '''
+
+        self._mapperDict[name] = (function, data, list(dependsOn or []))
+        self._mapperOrder.append(name)
+
+    def run(self):
+        '''
+        Run all mappers
+        :return: dict mapper name -> {'status': 'done' / 'failed' / 'skipped', 'duration': seconds, 'error': msg}
+        '''
+
+        stats = {}
+
+        pending = list(self._mapperOrder)
+
+        pool = ThreadPool(max(1, self.maxWorkers))
+
+        try:
+            while len(pending) > 0:
+
+                # Skip mappers with failed or missing dependencies
+                for name in list(pending):
+
+                    for dependency in self._mapperDict[name][2]:
+
+                        if dependency in stats and stats[dependency]['status'] != 'done' or \
+                                dependency not in stats and dependency not in pending:
+
+                            logger.error('SyncEngine: Skipping \'%s\' - dependency \'%s\' not done' % (name, dependency))
+                            stats[name] = {'status': 'skipped', 'duration': 0.0, 'error': None}
+                            pending.remove(name)
+                            self._exportMapper(name, stats[name])
+                            break
+
+                # Mappers ready to run
+                readyList = [name for name in pending
+                             if all([dependency in stats for dependency in self._mapperDict[name][2]])]
+
+                if len(readyList) == 0:
+                    if len(pending) > 0:
+                        raise ValueError('SyncEngine: Dependency cycle in mappers %s' % pending)
+                    break
+
+                self._exportQueue(len(pending) - len(readyList), len(readyList))
+
+                for name, mapperStats in pool.map(self._runMapper, readyList):
+                    stats[name] = mapperStats
+                    pending.remove(name)
+
+        finally:
+            pool.close()
+            pool.join()
+
+            self._exportQueue(0, 0)
+
+        return stats
+
+    def _exportQueue(self, pendingCount, runningCount):
+
+        if self.exporter is not None:
+            self.exporter.set('qcsync_engine_pending_mappers', pendingCount)
+            self.exporter.set('qcsync_engine_running_mappers', runningCount)
+
+    def _exportMapper(self, name, mapperStats):
+
+        if self.exporter is None:
+            return
+
+        self.exporter.inc('qcsync_mapper_runs_total', mapper=name, status=mapperStats['status'])
+        self.exporter.set('qcsync_mapper_duration_seconds', mapperStats['duration'], mapper=name)
+
+        # Entity counts returned by the mapper e.g. {'jiraIssues': 10}
+        for kind, count in mapperStats.get('counts', {}).iteritems():
+            self.exporter.set('qcsync_mapper_entities', count, mapper=name, kind=kind)
+            self.exporter.inc('qcsync_mapper_entities_total', count, mapper=name, kind=kind)
+
+    def _runMapper(self, name):
+
+        function, data, dependsOn = self._mapperDict[name]
+
+        logger.info('SyncEngine: Running \'%s\'...' % name)
+
+        start_time = time.time()
+
+        try:
+            # Mappers can return a dict with entity counts
+            counts = function(self.qc_con, self.jira_con, data)
+
+        except Exception as e:
+            msg = getattr(e, 'msg', None) or str(e)
+            logger.error('SyncEngine: \'%s\' failed: %s\n%s' % (name, msg, traceback.format_exc()))
+            mapperStats = {'status': 'failed', 'duration': time.time() - start_time, 'error': msg}
+
+        else:
+            mapperStats = {'status': 'done', 'duration': time.time() - start_time, 'error': None,
+                           'counts': counts or {}}
+
+            logger.info('SyncEngine: \'%s\' done: %s seconds!' % (name, mapperStats['duration']))
+
+        self._exportMapper(name, mapperStats)
+
+        return name, mapperStats
+
+
+class SyncDaemon(object):
+    '''
+    Runs SyncEngine cycles on a schedule keeping the QC and Jira connections (and their caches) alive between cycles.
+    A cycle is also started on demand when the trigger file exists. Stats of the last cycles are kept in cycleStats
+    and written to statsFile
+    '''
+
+    def __init__(self, engine, qcLogin, interval=60, triggerFile=None, statsFile=None, maxCycles=None,
+                 keepStats=100):
+        '''
+        :param engine: SyncEngine to run
+        :param qcLogin: (user, passwd) used to login again in QC if the session expires
+        :param interval: minutes between the start of two cycles
+        :param triggerFile: if this file exists a cycle is started immediately (file is removed)
+        :param statsFile: json file where cycle stats are written after each cycle
+        :param maxCycles: stop after this number of cycles (None runs forever)
+        :param keepStats: number of cycles kept in cycleStats
+        '''
+
+        self.engine = engine
+        self.qcLogin = qcLogin
+        self.interval = interval
+        self.triggerFile = triggerFile
+        self.statsFile = statsFile
+        self.maxCycles = maxCycles
+        self.keepStats = keepStats
+
+        # List of dicts with the stats of the last cycles
+        self.cycleStats = []
+
+        self.cycleNumber = 0
+
+        exporter = self.engine.exporter
+
+        if exporter is not None:
+            exporter.describe('qcsync_cycle_duration_seconds', 'histogram', 'Duration of the sync cycles.',
+                              (30, 60, 120, 300, 600, 1200, 1800, 3600, 7200))
+            exporter.describe('qcsync_cycles_total', 'counter', 'Sync cycles run.')
+            exporter.describe('qcsync_cycle_errors_total', 'counter',
+                              'Sync cycles that failed (e.g. QC not reachable).')
+            exporter.describe('qcsync_last_cycle_timestamp_seconds', 'gauge', 'End time of the last sync cycle.')
+            exporter.describe('qcsync_qc_relogins_total', 'counter', 'Logins retried because the QC session expired.')
+
+    def run(self):
+        '''
+        Run cycles until maxCycles or KeyboardInterrupt
+        '''
+
+        try:
+            while self.maxCycles is None or self.cycleNumber < self.maxCycles:
+
+                nextTime = time.time() + self.interval * 60
+
+                self.runCycle()
+
+                if self.maxCycles is not None and self.cycleNumber >= self.maxCycles:
+                    break
+
+                self._waitNextCycle(nextTime)
+
+        except KeyboardInterrupt:
+            logger.info('SyncDaemon: Stopped after %d cycles' % self.cycleNumber)
+
+    def runCycle(self):
+        '''
+        Run a single sync cycle. Errors are logged and the cycle is recorded as failed, so a transient QC or Jira
+        outage does not stop the daemon - the next cycle tries again
+        :return: dict with the cycle stats
+        '''
+
+        self.cycleNumber += 1
+
+        logger.info('SyncDaemon: Starting cycle %d...' % self.cycleNumber)
+
+        start_time = time.time()
+
+        error = None
+        mapperStats = {}
+
+        try:
+            self._keepQCSession()
+
+            # Releases are cached in the connection - request them again so new releases are used in this cycle
+            self.engine.qc_con.getReleaseIdDict(forceUpdate=True)
+
+            mapperStats = self.engine.run()
+
+        except Exception as e:
+            error = getattr(e, 'msg', None) or str(e)
+            logger.error('SyncDaemon: Cycle %d failed: %s\n%s' % (self.cycleNumber, error, traceback.format_exc()))
+
+        cycleStats = {
+            'cycle': self.cycleNumber,
+            'start': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start_time)),
+            'duration': time.time() - start_time,
+            'status': 'failed' if error else 'done',
+            'error': error,
+            'mappers': mapperStats,
+        }
+
+        self.cycleStats.append(cycleStats)
+        del self.cycleStats[:-self.keepStats]
+
+        logger.info('SyncDaemon: Cycle %d %s: %s seconds!' % (self.cycleNumber, cycleStats['status'],
+                                                               cycleStats['duration']))
+
+        if self.statsFile:
+            with open(self.statsFile, 'w') as filen:
+                json.dump(self.cycleStats, filen, indent=1)
+
+        exporter = self.engine.exporter
+
+        if exporter is not None:
+            exporter.observe('qcsync_cycle_duration_seconds', cycleStats['duration'])
+            exporter.inc('qcsync_cycles_total')
+
+            if error:
+                exporter.inc('qcsync_cycle_errors_total')
+
+            exporter.set('qcsync_last_cycle_timestamp_seconds', time.time())
+
+            if exporter.fileName:
+                exporter.writeTextFile()
+
+        return cycleStats
+
+    def _keepQCSession(self):
+
+        qc_con = self.engine.qc_con
+
+        # Extend QC session or login again if it expired
+        try:
+            qc_con.extendedSession()
+
+        except ConnectionError:
+            logger.info('SyncDaemon: QC session expired - login again')
+
+            if self.engine.exporter is not None:
+                self.engine.exporter.inc('qcsync_qc_relogins_total')
+
+            qc_con.login(*self.qcLogin)
+
+    def _waitNextCycle(self, nextTime):
+
+        while time.time() < nextTime:
+
+            if self.triggerFile and os.path.isfile(self.triggerFile):
+                logger.info('SyncDaemon: Trigger file %s found - starting cycle' % self.triggerFile)
+                os.remove(self.triggerFile)
+                return
+
+            time.sleep(min(5, max(0, nextTime - time.time())))
+
+
+def main(argv):
+
+    args = getArgsParser().parse_args()
+
+    mapperList = args.mapper or mapperOrder
+
+    # Data of each mapper from its ini section - common data (servers, users) is taken from the first one
+    mapperData = {}
+
+    for name in mapperList:
+
+        data = mapperInfo[name][1](args.ini)
+
+        if args.user:
+            data['qc_username'] = data['jira_username'] = args.user
+
+        if args.password:
+            data['qc_passwd'] = data['jira_passwd'] = args.password
+
+        # Daemon cycles only get the Jira issues changed since the previous cycle
+        data['jira_incremental'] = args.incremental or args.daemon
+
+        mapperData[name] = data
+
+    data = mapperData[mapperList[0]]
+
+    # Establish connection to QC and JIRA - shared by all mappers
+    qc_con = hiT7300_QC(data['qc_server'], data['qc_project'], data['qc_domain'], release='5.50.xx')
+    jira_con = JIRARest(data['jira_server'])
+
+    # Prometheus metrics - written to a file (node exporter textfile collector) and / or served on a local port
+    exporter = None
+
+    if args.metrics_file or args.metrics_port is not None:
+        exporter = MetricsExporter(args.metrics_file)
+        exporter.install()
+
+        if args.metrics_port is not None:
+            print 'Metrics served on %s' % exporter.startHttpServer(args.metrics_port)
+
+    engine = SyncEngine(qc_con, jira_con, args.workers, exporter)
+
+    for name in mapperList:
+        # Dependencies not selected are ignored
+        dependsOn = [dependency for dependency in mapperInfo[name][2] if dependency in mapperList]
+        engine.addMapper(name, mapperInfo[name][0], mapperData[name], dependsOn)
+
+    # Start Time
+    start_time = time.time()
+
+    failed = False
+
+    try:
+        # Open connection to QC and JIRA
+        qc_con.login(data['qc_username'], data['qc_passwd'])
+        jira_con.login(data['jira_username'], data['jira_passwd'])
+
+        if args.daemon:
+
+            daemon = SyncDaemon(engine, (data['qc_username'], data['qc_passwd']), args.interval, args.trigger_file,
+                                args.stats_file, args.cycles)
+
+            daemon.run()
+
+            stats = daemon.cycleStats[-1]['mappers'] if daemon.cycleStats else {}
+
+            # Last cycle could not run the mappers
+            if daemon.cycleStats and daemon.cycleStats[-1]['status'] != 'done':
+                print 'Last cycle failed: %s' % daemon.cycleStats[-1]['error']
+                failed = True
+
+        else:
+
+            stats = engine.run()
+
+        for name in mapperList:
+
+            if name not in stats:
+                continue
+
+            print '%-15s %-8s %10.1f seconds %s' % (name, stats[name]['status'], stats[name]['duration'],
+                                                    stats[name].get('counts', ''))
+
+            if stats[name]['status'] != 'done':
+                failed = True
+
+        print '--- %s seconds ---' % (time.time() - start_time)
+
+    except (ConnectionError, QCError) as e:
+        print ('\nUps, an exception was raised: ' + e.expr + ' - ' + e.msg)
+        exit(1)
+
+    finally:
+
+        try:
+            qc_con.logout()
+
+        except (ConnectionError, QCError) as e:
+            print ('\nUps, an exception was raised: ' + e.expr + ' - ' + e.msg)
+            exit(1)
+
+        finally:
+
+            # Metrics of the last run - also when the sync fails
+            if exporter is not None:
+                if exporter.fileName:
+                    exporter.writeTextFile()
+
+                exporter.stopHttpServer()
+
+    if failed:
+        exit(1)
+
+    print ("Bye bye!")
+
+
+def getArgsParser():
+    parser = argparse.ArgumentParser(description='Run several QC / Jira sync processes sharing the connections')
+    parser.add_argument('-u', '--user', help="Username for QC and JIRA.")
+    parser.add_argument('-p', '--password', help="Password for QC and JIRA.")
+    parser.add_argument('-m', '--mapper', action='append', choices=mapperOrder,
+                        help="Sync process to run (can be repeated). Default: all.")
+    parser.add_argument('-i', '--incremental', action='store_true',
+                        help="Only get Jira issues updated since the last run (uses local snapshot).")
+    parser.add_argument('-w', '--workers', type=int, default=2, help="Max number of sync processes running at once.")
+    parser.add_argument('--ini', default='qc_jira.ini', help="Ini file.")
+    parser.add_argument('-d', '--daemon', action='store_true',
+                        help="Keep running and sync every --interval minutes (implies --incremental).")
+    parser.add_argument('--interval', type=float, default=60, help="Minutes between daemon cycles.")
+    parser.add_argument('--cycles', type=int, help="Stop the daemon after this number of cycles.")
+    parser.add_argument('--trigger-file', default='qc_jira_sync.trigger',
+                        help="Daemon starts a cycle immediately when this file exists.")
+    parser.add_argument('--stats-file', default='qc_jira_sync_stats.json', help="Daemon cycle stats (json).")
+    parser.add_argument('--metrics-file',
+                        help="Write Prometheus metrics to this file (e.g. for the node exporter textfile collector).")
+    parser.add_argument('--metrics-port', type=int, help="Serve Prometheus metrics on http://127.0.0.1:<port>/metrics.")
+
+    addProfileArguments(parser)
+
+    return parser
+
+
+if __name__ == '__main__':
+    profileMain(main, sys.argv)